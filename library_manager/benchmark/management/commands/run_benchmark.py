@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 30 minutes
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmark.runner import BenchmarkRunner, compare
+from benchmark.scenarios import SCENARIOS, BenchmarkSamples
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the latency percentiles, throughput and queries of every endpoint '
+        'and writes them as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Number of measured requests per endpoint',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Number of requests per endpoint sent before measuring',
+        )
+        parser.add_argument(
+            '--scenarios',
+            nargs='+',
+            choices=[scenario.name for scenario in SCENARIOS],
+            help='Only measures these scenarios',
+        )
+        parser.add_argument(
+            '--url',
+            help=(
+                'Base URL of a running server to send the requests to, for example '
+                'http://localhost:8000. Only the safe requests are sent and the '
+                'queries are not counted'
+            ),
+        )
+        parser.add_argument(
+            '--output',
+            help='File the JSON report is written to, the standard output by default',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON report of a previous run to compare the p95 latencies and queries with',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['warmup'] < 0:
+            raise CommandError('--repeat must be a positive number and --warmup can not be negative')
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        try:
+            samples = BenchmarkSamples()
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        try:
+            runner = BenchmarkRunner(
+                samples,
+                repeat=options['repeat'],
+                warmup=options['warmup'],
+                base_url=options['url'],
+                names=options['scenarios'],
+            )
+            report = runner.run(progress=self.stderr.write)
+        finally:
+            samples.close()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            for line in compare(baseline, report):
+                self.stderr.write(line)
+
+        failed = [name for name, measure in report['endpoints'].items() if measure['errors']]
+        if failed:
+            raise CommandError(f'Requests failed in {failed}')
+
+        over_budget = [
+            name for name, measure in report['endpoints'].items()
+            if measure['queries'] and measure['queries']['max'] > (measure['queries']['budget'] or 0)
+        ]
+        if over_budget:
+            raise CommandError(f'Queries over or without budget in {over_budget}')
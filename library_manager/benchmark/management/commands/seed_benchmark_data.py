@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 20 minutes
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmark.seed import LibrarySeeder
+
+
+class Command(BaseCommand):
+    help = 'Inserts a synthetic library of the given size to benchmark the API with'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=1000, help='Number of authors')
+        parser.add_argument('--categories', type=int, default=50, help='Number of categories')
+        parser.add_argument('--books', type=int, default=100000, help='Number of books')
+        parser.add_argument('--customers', type=int, default=10000, help='Number of customers')
+        parser.add_argument('--lendings', type=int, default=200000, help='Number of lendings')
+        parser.add_argument(
+            '--open-lendings',
+            type=int,
+            default=5000,
+            help='Number of the lendings not yet returned, one per book',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of rows inserted per query',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed, the same seed generates the same rows',
+        )
+
+    def handle(self, *args, **options):
+        counts = {
+            name: options[name]
+            for name in ('authors', 'categories', 'books', 'customers', 'lendings', 'open_lendings')
+        }
+        if any(count < 0 for count in counts.values()):
+            raise CommandError('The number of rows can not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive number')
+
+        seeder = LibrarySeeder(options['seed'], options['batch_size'], progress=self.stdout.write)
+        started = time.perf_counter()
+        try:
+            seeder.seed(**counts)
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {sum(counts.values()) - counts["open_lendings"]} rows '
+            f'in {time.perf_counter() - started:.1f} s'
+        ))
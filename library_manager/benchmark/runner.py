@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 2 horas
+
+Sends the requests of the scenarios and measures them. In process through
+the test client, where the queries of every request are counted and the
+writes are rolled back so every run sees the same data, or through HTTP to
+a running server, where only the safe requests are sent.
+"""
+
+import subprocess
+import time
+
+import requests
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from library.models import Author, Book, BookLending, Category, Customer
+
+from benchmark.scenarios import SCENARIOS, query_budget, uncovered_url_names
+
+
+def percentile(values, fraction):
+    """
+    Returns the value below which fraction of the sorted values fall
+    """
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def current_commit():
+    """
+    Returns the commit of the checked out code, None outside a git checkout
+    """
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+class TestClientTransport:
+    """
+    Sends the requests through the test client, within the process
+    """
+    counts_queries = True
+
+    def __init__(self, token):
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def send(self, method, path, query, data):
+        if method == 'GET':
+            response = self.client.get(path, query)
+        else:
+            response = getattr(self.client, method.lower())(path, data, format='json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code
+
+
+class HTTPTransport:
+    """
+    Sends the requests to a running server
+    """
+    counts_queries = False
+
+    def __init__(self, token, base_url):
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f'Bearer {token}'
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, method, path, query, data):
+        response = self.session.request(method, self.base_url + path, params=query, json=data)
+        return response.status_code
+
+
+class BenchmarkRunner:
+    """
+    Runs repeat requests of every scenario after warmup unmeasured ones, and
+    reports their latency percentiles, throughput and query counts
+    """
+
+    def __init__(self, samples, repeat=50, warmup=5, base_url=None, names=None):
+        self.samples = samples
+        self.repeat = repeat
+        self.warmup = warmup
+        self.base_url = base_url
+        if base_url:
+            self.transport = HTTPTransport(samples.token.token, base_url)
+        else:
+            self.transport = TestClientTransport(samples.token.token)
+        self.scenarios = [
+            scenario for scenario in SCENARIOS
+            if names is None or scenario.name in names
+        ]
+
+    def send(self, scenario):
+        """
+        Sends a request of the scenario, returns its status code, seconds
+        taken and number of queries, None if they can not be counted
+        """
+        request = scenario.build(self.samples)
+        if not self.transport.counts_queries:
+            started = time.perf_counter()
+            status_code = self.transport.send(scenario.method, *request)
+            return status_code, time.perf_counter() - started, None
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            status_code = self.transport.send(scenario.method, *request)
+            elapsed = time.perf_counter() - started
+        return status_code, elapsed, len(queries)
+
+    def request(self, scenario):
+        if scenario.is_safe or not self.transport.counts_queries:
+            return self.send(scenario)
+
+        # the writes are rolled back, with the rows their request is built from
+        with transaction.atomic():
+            result = self.send(scenario)
+            transaction.set_rollback(True)
+        return result
+
+    def measure(self, scenario):
+        for _ in range(self.warmup):
+            self.request(scenario)
+
+        timings, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(self.repeat):
+            status_code, elapsed, query_count = self.request(scenario)
+            timings.append(elapsed * 1000)
+            if query_count is not None:
+                queries.append(query_count)
+            if status_code >= 400:
+                errors += 1
+        wall = time.perf_counter() - started
+
+        timings.sort()
+        queries.sort()
+        return {
+            'url_name': scenario.url_name,
+            'method': scenario.method,
+            'requests': self.repeat,
+            'errors': errors,
+            'latency_ms': {
+                'p50': round(percentile(timings, 0.50), 3),
+                'p95': round(percentile(timings, 0.95), 3),
+                'p99': round(percentile(timings, 0.99), 3),
+                'mean': round(sum(timings) / len(timings), 3),
+                'max': round(timings[-1], 3),
+            },
+            'throughput_rps': round(self.repeat / wall, 2),
+            'queries': {
+                'p50': percentile(queries, 0.50),
+                'max': queries[-1],
+                'budget': query_budget(scenario),
+            } if queries else None,
+        }
+
+    def run(self, progress=None):
+        """
+        Returns the report of the run as a dict ready to dump as JSON
+        """
+        progress = progress or (lambda message: None)
+        # the token cache serves the access token to the measured requests
+        self.send(SCENARIOS[0])
+
+        endpoints, skipped = {}, []
+        for scenario in self.scenarios:
+            if self.base_url and not scenario.is_safe:
+                # the writes of a server can not be rolled back
+                skipped.append(scenario.name)
+                continue
+            progress(f'Measuring {scenario.name}')
+            endpoints[scenario.name] = self.measure(scenario)
+
+        return {
+            'commit': current_commit(),
+            'created_at': timezone.now().isoformat(),
+            'transport': 'http' if self.base_url else 'test client',
+            'repeat': self.repeat,
+            'rows': {
+                model._meta.model_name: model.objects.count()
+                for model in (Author, Category, Book, Customer, BookLending)
+            },
+            'endpoints': endpoints,
+            'skipped': skipped,
+            'uncovered': uncovered_url_names(),
+        }
+
+
+def compare(baseline, report):
+    """
+    Yields a line per endpoint measured in both reports, with the change of
+    its p95 latency and of its maximum number of queries
+    """
+    for name, measure in report['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            continue
+        before, after = previous['latency_ms']['p95'], measure['latency_ms']['p95']
+        change = (after - before) / before * 100 if before else 0.0
+        line = f'{name}: p95 {before:.2f} ms -> {after:.2f} ms ({change:+.1f}%)'
+        if previous['queries'] and measure['queries']:
+            line += f', queries {previous["queries"]["max"]} -> {measure["queries"]["max"]}'
+        yield line
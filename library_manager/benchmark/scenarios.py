@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 2 horas
+
+The requests the benchmark sends, one scenario per URL of library.urls and
+library_users.urls at least. The ids of the requests are drawn from a sample
+of the rows in the database, so they work on any seeded dataset.
+"""
+
+import itertools
+import os
+import random
+from datetime import date, timedelta
+from importlib import import_module
+
+from django.urls import reverse
+
+from library.management.commands.benchmark_search import WORDS
+from library.models import Author, Book, BookLending, Category, Customer
+from library.urls import urlpatterns as library_urlpatterns
+from library_users.applications import get_user_application
+from library_users.models import User
+from library_users.urls import urlpatterns as library_users_urlpatterns
+from library_users.views import generate_token_for_user
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# items of every request of the bulk endpoints
+BULK_ITEMS = 10
+
+
+class BenchmarkSamples:
+    """
+    Random ids of the rows in the database plus the benchmark user, what the
+    scenarios build their requests from
+    """
+
+    def __init__(self, size=100, seed=0):
+        self.randomizer = random.Random(seed)
+        self.authors = self.sample(Author.objects.all(), size)
+        self.categories = self.sample(Category.objects.all(), size)
+        self.books = self.sample(Book.objects.all(), size)
+        self.available_books = self.sample(Book.objects.filter(is_lent=False), size)
+        self.customers = self.sample(Customer.objects.all(), size)
+        self.lendings = self.sample(BookLending.objects.all(), size)
+        self.open_lendings = self.sample(BookLending.objects.open(), size)
+        self.returned_lendings = self.sample(BookLending.objects.filter(return_date__isnull=False), size)
+        self.lent_books = self.sample(BookLending.objects.open(), size, 'book_id')
+        if not (self.authors and self.categories and self.books and self.customers and self.lendings):
+            raise ValueError('The database has no rows to benchmark, seed it first')
+
+        self.counter = itertools.count()
+        self.user = User.objects.create_user(
+            username=f'benchmark_{os.getpid()}_{self.randomizer.getrandbits(32)}',
+            password=BENCHMARK_PASSWORD
+        )
+        self.application = get_user_application(self.user)
+        self.token = generate_token_for_user(self.user, self.application)
+
+    def sample(self, queryset, size, field='pk'):
+        """
+        Returns the values of field of up to size rows of queryset, taken
+        after random ids so the sample is spread over the whole table
+        """
+        ids = queryset.order_by('pk').values_list('pk', flat=True)
+        first, last = ids.first(), ids.last()
+        if first is None:
+            return []
+
+        values = set()
+        for _ in range(size):
+            start = self.randomizer.randint(first, last)
+            value = queryset.filter(pk__gte=start).order_by('pk').values_list(field, flat=True).first()
+            values.add(value)
+
+        return sorted(values)
+
+    def choice(self, values):
+        return self.randomizer.choice(values)
+
+    def unique_name(self):
+        return f'{self.user.username}_{next(self.counter)}'
+
+    def new_token(self):
+        return generate_token_for_user(self.user, self.application)
+
+    def close(self):
+        self.user.delete()
+
+
+class Scenario:
+    """
+    A request to the URL named url_name. kwargs, query and data are
+    functions of the samples returning the URL arguments, the query string
+    and the JSON body of every request
+    """
+
+    def __init__(self, name, url_name, method='GET', kwargs=None, query=None, data=None):
+        self.name = name
+        self.url_name = url_name
+        self.method = method
+        self.kwargs = kwargs
+        self.query = query
+        self.data = data
+
+    @property
+    def is_safe(self):
+        return self.method in ('GET', 'HEAD', 'OPTIONS')
+
+    def build(self, samples):
+        """
+        Returns the path, query and body of a request
+        """
+        kwargs = self.kwargs(samples) if self.kwargs else None
+        return (
+            reverse(self.url_name, kwargs=kwargs),
+            self.query(samples) if self.query else None,
+            self.data(samples) if self.data else None,
+        )
+
+
+def pk_of(attribute):
+    return lambda samples: {'pk': samples.choice(getattr(samples, attribute))}
+
+
+def new_author(samples):
+    return {'name': samples.unique_name(), 'surname': 'Benchmark', 'birth_date': '1950-01-01'}
+
+
+def new_book(samples):
+    return {
+        'title': samples.unique_name(),
+        'author': samples.choice(samples.authors),
+        'category': samples.choice(samples.categories),
+        'published_date': '2000-01-01',
+    }
+
+
+def new_customer(samples):
+    return {
+        'name': samples.unique_name(),
+        'surname': 'Benchmark',
+        'address': 'Benchmark street',
+        'phone_number': '111111111',
+        'email': 'benchmark@example.com',
+    }
+
+
+def new_lending(samples):
+    return {
+        'book': samples.choice(samples.available_books),
+        'customer': samples.choice(samples.customers),
+        'lending_date': date.today().isoformat(),
+    }
+
+
+def many(build):
+    return lambda samples: [build(samples) for _ in range(BULK_ITEMS)]
+
+
+def created(model, build):
+    """
+    Returns a function creating a row to delete, the writes of the
+    scenarios are rolled back so it only exists during the request
+    """
+    def kwargs(samples):
+        fields = build(samples)
+        for name in ('author', 'category', 'book', 'customer'):
+            if name in fields:
+                fields[f'{name}_id'] = fields.pop(name)
+        return {'pk': model.objects.create(**fields).pk}
+
+    return kwargs
+
+
+def lending_operations(samples):
+    operations = []
+    if samples.available_books:
+        operations.append({
+            'action': 'checkout',
+            'book': samples.choice(samples.available_books),
+            'customer': samples.choice(samples.customers),
+        })
+    if samples.lent_books:
+        operations.append({'action': 'return', 'book': samples.choice(samples.lent_books)})
+    return operations
+
+
+def last_month(samples):
+    return {'lending_date_after': (date.today() - timedelta(days=30)).isoformat()}
+
+
+SCENARIOS = [
+    Scenario('author-list', 'author-list'),
+    Scenario('author-create', 'author-list', 'POST', data=new_author),
+    Scenario('author-detail', 'author-detail', kwargs=pk_of('authors')),
+    Scenario(
+        'author-update', 'author-detail', 'PATCH',
+        kwargs=pk_of('authors'), data=lambda samples: {'surname': 'Benchmark'}
+    ),
+    Scenario('author-delete', 'author-detail', 'DELETE', kwargs=created(Author, new_author)),
+    Scenario('author-bulk', 'author-bulk', 'POST', data=many(new_author)),
+    Scenario('book-list', 'book-list'),
+    Scenario(
+        'book-list-search', 'book-list',
+        query=lambda samples: {'search': samples.randomizer.choice(WORDS)}
+    ),
+    Scenario('book-create', 'book-list', 'POST', data=new_book),
+    Scenario('book-detail', 'book-detail', kwargs=pk_of('books')),
+    Scenario(
+        'book-update', 'book-detail', 'PATCH',
+        kwargs=pk_of('books'), data=lambda samples: {'title': samples.unique_name()}
+    ),
+    Scenario('book-delete', 'book-detail', 'DELETE', kwargs=created(Book, new_book)),
+    Scenario('book-bulk', 'book-bulk', 'POST', data=many(new_book)),
+    Scenario('customer-list', 'customer-list'),
+    Scenario('customer-create', 'customer-list', 'POST', data=new_customer),
+    Scenario('customer-detail', 'customer-detail', kwargs=pk_of('customers')),
+    Scenario(
+        'customer-update', 'customer-detail', 'PATCH',
+        kwargs=pk_of('customers'), data=lambda samples: {'address': 'Benchmark avenue'}
+    ),
+    Scenario('customer-delete', 'customer-detail', 'DELETE', kwargs=created(Customer, new_customer)),
+    Scenario('customer-bulk', 'customer-bulk', 'POST', data=many(new_customer)),
+    Scenario('lending-list', 'lending-list'),
+    Scenario('lending-create', 'lending-list', 'POST', data=new_lending),
+    Scenario('lending-detail', 'lending-detail', kwargs=pk_of('lendings')),
+    Scenario(
+        'lending-update', 'lending-detail', 'PATCH',
+        kwargs=pk_of('open_lendings'), data=lambda samples: {'return_date': date.today().isoformat()}
+    ),
+    Scenario('lending-delete', 'lending-detail', 'DELETE', kwargs=pk_of('returned_lendings')),
+    Scenario('lending-export', 'lending-export', query=last_month),
+    Scenario('lending-batch', 'lending-batch', 'POST', data=lending_operations),
+    Scenario('lending-overdue', 'lending-overdue'),
+    Scenario('lending-statistics', 'lending-statistics'),
+    Scenario('async-author-list', 'async-author-list'),
+    Scenario('async-author-detail', 'async-author-detail', kwargs=pk_of('authors')),
+    Scenario('async-book-list', 'async-book-list'),
+    Scenario('async-book-detail', 'async-book-detail', kwargs=pk_of('books')),
+    Scenario('async-customer-list', 'async-customer-list'),
+    Scenario('async-customer-detail', 'async-customer-detail', kwargs=pk_of('customers')),
+    Scenario('async-lending-list', 'async-lending-list'),
+    Scenario('async-lending-detail', 'async-lending-detail', kwargs=pk_of('lendings')),
+    Scenario(
+        'register_user', 'register_user', 'POST',
+        data=lambda samples: {'username': samples.unique_name(), 'password': BENCHMARK_PASSWORD}
+    ),
+    Scenario(
+        'user_token', 'user_token', 'POST',
+        data=lambda samples: {'username': samples.user.username, 'password': BENCHMARK_PASSWORD}
+    ),
+    Scenario(
+        'user_refresh_token', 'user_refresh_token', 'POST',
+        data=lambda samples: {'refresh_token': samples.new_token().refresh_token.token}
+    ),
+    Scenario(
+        'user_revoke_token', 'user_revoke_token', 'POST',
+        data=lambda samples: {'token': samples.new_token().token}
+    ),
+]
+
+
+def url_views():
+    """
+    Returns the views of the URLs of the library apps by URL name
+    """
+    return {
+        pattern.name: pattern.callback
+        for pattern in library_urlpatterns + library_users_urlpatterns
+    }
+
+
+def query_budget(scenario):
+    """
+    Returns the queries a request of the scenario is allowed, declared by
+    query_budgets of the class based views and by QUERY_BUDGETS of the
+    module of the function based ones. None when not declared
+    """
+    view = url_views()[scenario.url_name]
+    view_class = view.view_class if hasattr(view, 'view_class') else view.cls
+    if hasattr(view_class, 'query_budgets'):
+        return view_class.query_budgets.get(scenario.method)
+
+    # the class of an @api_view is named and placed like its function
+    budgets = getattr(import_module(view_class.__module__), 'QUERY_BUDGETS', {})
+    return budgets.get(view_class.__name__)
+
+
+def uncovered_url_names():
+    """
+    Returns the names of the URLs of the library apps without a scenario
+    """
+    covered = {scenario.url_name for scenario in SCENARIOS}
+    return sorted(name for name in url_views() if name not in covered)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 1 hora
+
+Generation of a synthetic library to benchmark the API with. The rows are
+inserted with bulk_create in batches, every batch in its own transaction.
+"""
+
+import random
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from library.management.commands.benchmark_search import WORDS
+from library.models import Author, Book, BookLending, Category, Customer
+
+# oldest lending date of the generated lendings, in days before today
+LENDING_HISTORY_DAYS = 3 * 365
+
+
+def batches(amount, batch_size):
+    """
+    Yields the sizes of the batches amount rows are inserted in
+    """
+    for start in range(0, amount, batch_size):
+        yield min(batch_size, amount - start)
+
+
+def random_date(randomizer, start, end):
+    return start + timedelta(days=randomizer.randint(0, (end - start).days))
+
+
+class LibrarySeeder:
+    """
+    Inserts authors, categories, books, customers and lendings with random
+    but reproducible values, the same random seed generates the same rows.
+
+    At most one lending per book is left open, lent during the last two loan
+    periods so part of them are overdue. The rest are returned and spread
+    over the last three years.
+    """
+
+    def __init__(self, seed=0, batch_size=5000, progress=None):
+        self.randomizer = random.Random(seed)
+        self.batch_size = batch_size
+        self.progress = progress or (lambda message: None)
+        self.today = date.today()
+
+    def words(self, amount):
+        return ' '.join(self.randomizer.sample(WORDS, amount)).capitalize()
+
+    def insert(self, model, amount, build):
+        """
+        Inserts amount rows of model built by build(), returns their ids
+        """
+        ids = []
+        for size in batches(amount, self.batch_size):
+            with transaction.atomic():
+                created = model.objects.bulk_create([build() for _ in range(size)])
+            ids.extend(instance.pk for instance in created)
+            self.progress(f'Seeded {len(ids)} of {amount} {model._meta.verbose_name_plural}')
+
+        return ids
+
+    def seed_authors(self, amount):
+        def build():
+            birth_date = random_date(self.randomizer, date(1900, 1, 1), date(1990, 12, 31))
+            return Author(
+                name=self.words(1),
+                surname=self.words(1),
+                birth_date=birth_date,
+                death_date=birth_date + timedelta(days=80 * 365) if self.randomizer.random() < 0.3 else None,
+            )
+
+        return self.insert(Author, amount, build)
+
+    def seed_categories(self, amount):
+        return self.insert(Category, amount, lambda: Category(name=self.words(2)))
+
+    def seed_books(self, amount, authors, categories, lent):
+        """
+        Inserts the books, the lent ones at random positions, returns the
+        ids of all of them and of the lent ones
+        """
+        lent_positions = set(self.randomizer.sample(range(amount), min(lent, amount)))
+        positions = iter(range(amount))
+
+        def build():
+            return Book(
+                title=self.words(self.randomizer.randint(2, 5)),
+                author_id=self.randomizer.choice(authors),
+                category_id=self.randomizer.choice(categories),
+                published_date=random_date(self.randomizer, date(1950, 1, 1), self.today),
+                is_lent=next(positions) in lent_positions,
+            )
+
+        ids = self.insert(Book, amount, build)
+        return ids, [ids[position] for position in sorted(lent_positions)]
+
+    def seed_customers(self, amount):
+        def build():
+            name, surname = self.words(1), self.words(1)
+            return Customer(
+                name=name,
+                surname=surname,
+                address=f'{self.randomizer.randint(1, 999)} {self.words(2)} street',
+                phone_number=f'{self.randomizer.randint(100000000, 999999999)}',
+                email=f'{name}.{surname}.{self.randomizer.randint(1, 10 ** 6)}@example.com'.lower(),
+            )
+
+        return self.insert(Customer, amount, build)
+
+    def seed_lendings(self, amount, books, lent_books, customers):
+        loan_period = settings.LIBRARY_LOAN_PERIOD_DAYS
+        open_books = iter(lent_books)
+
+        def build():
+            book_id = next(open_books, None)
+            if book_id is not None:
+                lending_date = self.today - timedelta(days=self.randomizer.randint(0, 2 * loan_period))
+                return_date = None
+            else:
+                book_id = self.randomizer.choice(books)
+                lending_date = self.today - timedelta(
+                    days=self.randomizer.randint(2 * loan_period + 1, LENDING_HISTORY_DAYS)
+                )
+                return_date = lending_date + timedelta(days=self.randomizer.randint(1, 2 * loan_period))
+            lending = BookLending(
+                book_id=book_id,
+                customer_id=self.randomizer.choice(customers),
+                lending_date=lending_date,
+                return_date=return_date,
+            )
+            lending.set_due_date()
+            return lending
+
+        return self.insert(BookLending, amount, build)
+
+    def seed(self, authors, categories, books, customers, lendings, open_lendings):
+        """
+        Inserts the given number of rows of every model, open_lendings of
+        the lendings are left open and can not be more than the books
+        """
+        if open_lendings > min(books, lendings):
+            raise ValueError('There can not be more open lendings than books or lendings')
+        if books and not (authors and categories):
+            raise ValueError('Books need at least an author and a category')
+        if lendings and not (books and customers):
+            raise ValueError('Lendings need at least a book and a customer')
+
+        author_ids = self.seed_authors(authors)
+        category_ids = self.seed_categories(categories)
+        book_ids, lent_book_ids = self.seed_books(books, author_ids, category_ids, open_lendings)
+        customer_ids = self.seed_customers(customers)
+        self.seed_lendings(lendings, book_ids, lent_book_ids, customer_ids)
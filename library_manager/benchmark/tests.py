@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 30 minutes
+"""
+
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from library.models import Author, Book, BookLending, Category, Customer
+from library_users.models import User
+
+from benchmark.runner import BenchmarkRunner, percentile
+from benchmark.scenarios import SCENARIOS, BenchmarkSamples, query_budget, uncovered_url_names
+from benchmark.seed import LibrarySeeder
+
+
+class SeedTestCase(TestCase):
+    """
+    Test module for the synthetic library generator
+    """
+    def test_seed_inserts_the_requested_rows(self):
+        LibrarySeeder(seed=1, batch_size=7).seed(
+            authors=3, categories=2, books=20, customers=4, lendings=30, open_lendings=5
+        )
+
+        self.assertEqual(
+            [model.objects.count() for model in (Author, Category, Book, Customer, BookLending)],
+            [3, 2, 20, 4, 30]
+        )
+        self.assertEqual(BookLending.objects.open().count(), 5)
+        self.assertEqual(
+            set(Book.objects.filter(is_lent=True).values_list('id', flat=True)),
+            set(BookLending.objects.open().values_list('book_id', flat=True))
+        )
+        self.assertFalse(BookLending.objects.filter(due_date__isnull=True).exists())
+
+    def test_seed_rejects_more_open_lendings_than_books(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                'seed_benchmark_data', '--books', '2', '--lendings', '5', '--open-lendings', '3',
+                stdout=StringIO()
+            )
+
+
+class BenchmarkRunnerTestCase(TestCase):
+    """
+    Test module for the endpoint benchmark
+    """
+    def setUp(self):
+        LibrarySeeder(seed=1).seed(
+            authors=3, categories=2, books=10, customers=3, lendings=10, open_lendings=3
+        )
+
+    def test_every_url_has_a_scenario(self):
+        self.assertEqual(uncovered_url_names(), [])
+
+    def test_run_measures_every_scenario(self):
+        rows = [model.objects.count() for model in (Author, Book, Customer, BookLending, User)]
+        samples = BenchmarkSamples(size=5)
+        report = BenchmarkRunner(samples, repeat=1, warmup=0).run()
+        samples.close()
+
+        self.assertEqual(list(report['endpoints']), [scenario.name for scenario in SCENARIOS])
+        for name, measure in report['endpoints'].items():
+            self.assertEqual(measure['errors'], 0, name)
+            self.assertGreaterEqual(measure['queries']['max'], 1, name)
+            self.assertEqual(set(measure['latency_ms']), {'p50', 'p95', 'p99', 'mean', 'max'})
+        # the writes are rolled back and the benchmark user deleted
+        self.assertEqual(rows, [model.objects.count() for model in (Author, Book, Customer, BookLending, User)])
+
+    def test_run_benchmark_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            call_command(
+                'run_benchmark', '--repeat', '2', '--warmup', '0', '--scenarios', 'book-list',
+                '--output', path, stderr=StringIO()
+            )
+            with open(path) as baseline_file:
+                report = json.load(baseline_file)
+
+            stdout, stderr = StringIO(), StringIO()
+            call_command(
+                'run_benchmark', '--repeat', '2', '--warmup', '0', '--scenarios', 'book-list',
+                '--baseline', path, stdout=stdout, stderr=stderr
+            )
+
+        self.assertEqual(list(report['endpoints']), ['book-list'])
+        self.assertEqual(report['endpoints']['book-list']['requests'], 2)
+        self.assertEqual(report['rows']['book'], 10)
+        self.assertEqual(json.loads(stdout.getvalue())['uncovered'], [])
+        self.assertIn('book-list: p95', stderr.getvalue())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(
+            [percentile(values, fraction) for fraction in (0.5, 0.95, 0.99, 1)],
+            [51, 96, 100, 100]
+        )
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Test module for the query budgets of the views, every endpoint is
+    measured with a small and a larger library, all of it in a single page
+    """
+    def measure(self):
+        samples = BenchmarkSamples(size=5)
+        report = BenchmarkRunner(samples, repeat=3, warmup=0).run()
+        samples.close()
+        return {name: measure['queries']['max'] for name, measure in report['endpoints'].items()}
+
+    def test_queries_do_not_grow_with_rows_nor_exceed_budget(self):
+        LibrarySeeder(seed=1).seed(
+            authors=2, categories=2, books=5, customers=2, lendings=6, open_lendings=2
+        )
+        small = self.measure()
+        LibrarySeeder(seed=2).seed(
+            authors=10, categories=5, books=45, customers=10, lendings=60, open_lendings=10
+        )
+        large = self.measure()
+
+        for scenario in SCENARIOS:
+            with self.subTest(scenario.name):
+                budget = query_budget(scenario)
+                self.assertIsNotNone(budget, f'{scenario.name} declares no query budget')
+                self.assertEqual(large[scenario.name], small[scenario.name], 'queries grow with the rows')
+                self.assertLessEqual(large[scenario.name], budget)
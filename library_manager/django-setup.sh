@@ -14,4 +14,20 @@ python manage.py collectstatic --noinput
 
 echo "Start server"
 #python manage.py runserver 0.0.0.0:8000
-python -m gunicorn library_manager.wsgi --bind 0.0.0.0:8000 --workers 8 --threads 2 --timeout 60
+if [ "$METRICS" = "True" ]; then
+    # every worker writes its metrics to files in this directory, the ones
+    # of the previous run are removed
+    export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/library_metrics}
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+if [ "$SERVER_PROFILE" = "asgi" ]; then
+    # the requests of an ASGI worker share a pool of connections, Django
+    # does not reuse persistent connections between ASGI requests
+    export DB_DRIVER=${DB_DRIVER:-library_manager.postgresql_pool}
+    export PG_CONN_MAX_AGE=0
+    export PG_POOL_MAX_SIZE=${PG_POOL_MAX_SIZE:-20}
+    python -m gunicorn library_manager.asgi:application --config gunicorn.conf.py --bind 0.0.0.0:8000 --workers 8 --worker-class uvicorn.workers.UvicornWorker --timeout 60
+else
+    python -m gunicorn library_manager.wsgi --config gunicorn.conf.py --bind 0.0.0.0:8000 --workers 8 --threads 2 --timeout 60
+fi
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 10 minutes
+
+Gunicorn settings of both server profiles of django-setup.sh, the command
+line sets the rest
+"""
+
+import os
+
+
+def child_exit(server, worker):
+    """
+    Drops the in progress requests gauge of an exited worker from the
+    multiprocess metrics, its counters and histograms are kept
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
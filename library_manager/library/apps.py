@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class LibraryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'library'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from library.search import forget_trigram_enabled
+
+        connection_created.connect(
+            forget_trigram_enabled,
+            weak=False,
+            dispatch_uid='library_forget_trigram_enabled',
+        )
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 4 horas
+
+Async variants of the read endpoints. Served through ASGI every request
+awaits its queries instead of blocking a worker thread, so a worker serves
+many requests while their queries run.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
+
+from rest_framework.response import Response
+
+from library.mixins import set_conditional_headers
+from library.views import (AuthorDetail, AuthorList, BookDetail, BookLendingDetail,
+                           BookLendingList, BookList, CustomerDetail, CustomerList)
+
+
+class AsyncReadMixin:
+    """
+    Mixin for API views whose GET handler is a coroutine, the rest of the
+    methods of the view are not served
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        Same as APIView.dispatch, awaiting the handler
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # authentication may need to read the token from the database
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def get_filtered_queryset(self):
+        """
+        Builds the queryset of the request, the search and the filters may
+        check the database features the first time they are used
+        """
+        return await sync_to_async(
+            lambda: self.filter_queryset(self.get_queryset())
+        )()
+
+
+class AsyncConditionalListMixin(AsyncReadMixin):
+    """
+    Async GET of the views using ConditionalListMixin
+    """
+    async def get(self, request, *args, **kwargs):
+        queryset = await sync_to_async(self.get_list_queryset)()
+
+        if self.paginator is None:
+            serializer = self.get_serializer([obj async for obj in queryset], many=True)
+            return Response(serializer.data)
+
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        return self.get_page_response(request, page)
+
+
+class AsyncConditionalDetailMixin(AsyncReadMixin):
+    """
+    Async GET of the views using ConditionalDetailMixin
+    """
+    async def aget_object(self):
+        """
+        Same as GenericAPIView.get_object, with the async ORM
+        """
+        queryset = await self.get_filtered_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            instance = await queryset.aget(**filter_kwargs)
+        except (ObjectDoesNotExist, TypeError, ValueError, DjangoValidationError):
+            raise Http404
+
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    async def get(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        conditional_response = self.get_conditional_response(request, instance)
+        if conditional_response is not None:
+            return conditional_response
+
+        serializer = self.get_serializer(instance)
+        return set_conditional_headers(
+            Response(serializer.data), self.get_etag(instance), instance.updated_at
+        )
+
+
+class AsyncAuthorList(AsyncConditionalListMixin, AuthorList):
+    """
+    Async API view for listing authors
+    """
+
+
+class AsyncAuthorDetail(AsyncConditionalDetailMixin, AuthorDetail):
+    """
+    Async API view for retrieving authors
+    """
+
+
+class AsyncCustomerList(AsyncConditionalListMixin, CustomerList):
+    """
+    Async API view for listing customers
+    """
+
+
+class AsyncCustomerDetail(AsyncConditionalDetailMixin, CustomerDetail):
+    """
+    Async API view for retrieving customers
+    """
+
+
+class AsyncBookList(AsyncConditionalListMixin, BookList):
+    """
+    Async API view for listing books
+    """
+
+
+class AsyncBookDetail(AsyncConditionalDetailMixin, BookDetail):
+    """
+    Async API view for retrieving books
+    """
+
+
+class AsyncBookLendingList(AsyncConditionalListMixin, BookLendingList):
+    """
+    Async API view for listing book lendings
+    """
+
+
+class AsyncBookLendingDetail(AsyncConditionalDetailMixin, BookLendingDetail):
+    """
+    Async API view for retrieving book lendings
+    """
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 3 horas
+"""
+
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from rest_framework import fields, relations
+from rest_framework.settings import api_settings
+
+# fields whose representation is the database value itself
+PLAIN_FIELDS = (
+    fields.BooleanField,
+    fields.CharField,
+    fields.IntegerField,
+    relations.PrimaryKeyRelatedField,
+)
+
+
+def iso_date(value):
+    return value.isoformat()
+
+
+def iso_datetime(value, tzinfo):
+    value = value.astimezone(tzinfo).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class ValuesSerializer:
+    """
+    Serializes the rows of values_list() into the same data the model
+    serializer_class gives for the model instances, without building the
+    instances or running the serializer fields on every value.
+
+    Fields with a source other than a model field, like the
+    SerializerMethodFields, must be declared in the values_fields attribute
+    of the serializer as {name: (column, function of the column value)}
+    """
+    def __init__(self, serializer_class):
+        model = serializer_class.Meta.model
+        values_fields = getattr(serializer_class, 'values_fields', {})
+        self.mappers = []
+        columns = []
+
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+
+            if name in values_fields:
+                column, convert = values_fields[name]
+            elif field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(
+                    f'{serializer_class.__name__}.{name} has no model field as source, '
+                    f'declare it in values_fields'
+                )
+            else:
+                column = model._meta.get_field(field.source).attname
+                convert = self.get_converter(field)
+
+            if column not in columns:
+                columns.append(column)
+            self.mappers.append((name, columns.index(column), convert))
+
+        self.columns = tuple(columns)
+
+    def get_converter(self, field):
+        """
+        Returns the function turning a column value into the field
+        representation, None when the value is the representation
+        """
+        if isinstance(field, fields.DateTimeField):
+            if getattr(field, 'format', api_settings.DATETIME_FORMAT) == fields.ISO_8601:
+                return iso_datetime
+        elif isinstance(field, fields.DateField):
+            if getattr(field, 'format', api_settings.DATE_FORMAT) == fields.ISO_8601:
+                return iso_date
+        elif isinstance(field, PLAIN_FIELDS) and not getattr(field, 'pk_field', None):
+            return None
+
+        return field.to_representation
+
+    def values_list(self, queryset, *extra_columns):
+        """
+        Returns the rows of queryset with the serialized columns first and
+        then extra_columns, as named tuples
+        """
+        return queryset.values_list(*dict.fromkeys(self.columns + extra_columns), named=True)
+
+    def to_representation(self, rows):
+        tzinfo = timezone.get_current_timezone()
+        mappers = [
+            (name, index, (lambda value: iso_datetime(value, tzinfo)) if convert is iso_datetime else convert)
+            for name, index, convert in self.mappers
+        ]
+        plain = all(convert is None for _, _, convert in mappers)
+        if plain:
+            return [{name: row[index] for name, index, _ in mappers} for row in rows]
+
+        return [
+            {
+                name: row[index] if convert is None or row[index] is None else convert(row[index])
+                for name, index, convert in mappers
+            }
+            for row in rows
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_values_serializer(serializer_class):
+    return ValuesSerializer(serializer_class)
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 45 minutes
+"""
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+class InvertedBooleanField(serializers.BooleanField):
+    """
+    Boolean field whose validated value is the opposite of the input one
+    """
+    def to_internal_value(self, data):
+        return not super().to_internal_value(data)
+
+
+class MonthField(serializers.DateField):
+    """
+    Date field whose validated value is the first day of the month
+    """
+    def to_internal_value(self, data):
+        return super().to_internal_value(data).replace(day=1)
+
+
+class BookFilterSerializer(serializers.Serializer):
+    """
+    Query parameters for filtering books, each field source is the lookup
+    the parameter is applied with
+    """
+    author = serializers.IntegerField(
+        source='author_id',
+        required=False
+    )
+    category = serializers.IntegerField(
+        source='category_id',
+        required=False
+    )
+    published_after = serializers.DateField(
+        source='published_date__gte',
+        required=False,
+        help_text='Only books published on or after this date'
+    )
+    published_before = serializers.DateField(
+        source='published_date__lte',
+        required=False,
+        help_text='Only books published on or before this date'
+    )
+    available = InvertedBooleanField(
+        source='is_lent',
+        required=False,
+        help_text='Only books available or not for lending'
+    )
+
+
+class BookLendingFilterSerializer(serializers.Serializer):
+    """
+    Query parameters for filtering book lendings, each field source is the
+    lookup the parameter is applied with
+    """
+    customer = serializers.IntegerField(
+        source='customer_id',
+        required=False
+    )
+    book = serializers.IntegerField(
+        source='book_id',
+        required=False
+    )
+    open = serializers.BooleanField(
+        source='return_date__isnull',
+        required=False,
+        help_text='Only lendings not yet returned, or only returned ones'
+    )
+    lending_date_after = serializers.DateField(
+        source='lending_date__gte',
+        required=False,
+        help_text='Only lendings lent on or after this date'
+    )
+    lending_date_before = serializers.DateField(
+        source='lending_date__lte',
+        required=False,
+        help_text='Only lendings lent on or before this date'
+    )
+
+
+class LendingStatisticFilterSerializer(serializers.Serializer):
+    """
+    Query parameters for filtering lending statistics, each field source is
+    the lookup the parameter is applied with
+    """
+    category = serializers.IntegerField(
+        source='category_id',
+        required=False
+    )
+    author = serializers.IntegerField(
+        source='author_id',
+        required=False
+    )
+    month_after = MonthField(
+        source='month__gte',
+        required=False,
+        help_text='Only lendings lent in or after the month of this date'
+    )
+    month_before = MonthField(
+        source='month__lte',
+        required=False,
+        help_text='Only lendings lent in or before the month of this date'
+    )
+
+
+class QueryParameterFilter(BaseFilterBackend):
+    """
+    Filters the queryset with the query parameters declared by the
+    filter_serializer_class of the view
+    """
+    def get_filter_serializer(self, request, view):
+        filter_serializer_class = getattr(view, 'filter_serializer_class', None)
+        if filter_serializer_class is None:
+            return None
+
+        # a plain dict, for QueryDicts missing booleans would read as False
+        return filter_serializer_class(data=request.query_params.dict())
+
+    def filter_queryset(self, request, queryset, view):
+        serializer = self.get_filter_serializer(request, view)
+        if serializer is None:
+            return queryset
+
+        serializer.is_valid(raise_exception=True)
+
+        return queryset.filter(**serializer.validated_data)
+
+    def get_schema_operation_parameters(self, view):
+        filter_serializer_class = getattr(view, 'filter_serializer_class', None)
+        if filter_serializer_class is None:
+            return []
+
+        schema_types = {
+            serializers.IntegerField: 'integer',
+            serializers.BooleanField: 'boolean',
+        }
+        parameters = []
+        for name, field in filter_serializer_class().fields.items():
+            schema_type = next(
+                (value for key, value in schema_types.items() if isinstance(field, key)),
+                'string'
+            )
+            parameters.append({
+                'name': name,
+                'required': False,
+                'in': 'query',
+                'description': str(field.help_text or name),
+                'schema': {'type': schema_type},
+            })
+
+        return parameters
+
+
+class IndexedOrderingFilter(OrderingFilter):
+    """
+    Orders by one of the ordering_fields of the view, which must be backed
+    by an index, and rejects any other ordering instead of ignoring it so
+    clients never trigger a sort of the whole table.
+    """
+    def get_ordering(self, request, queryset, view):
+        param = request.query_params.get(self.ordering_param)
+        if not param:
+            return self.get_default_ordering(view)
+
+        allowed = getattr(view, 'ordering_fields', ())
+        field = param.strip()
+        if field.lstrip('-') not in allowed:
+            choices = ', '.join(allowed)
+            raise ValidationError({
+                self.ordering_param: f'Unsupported ordering {field!r}, use one of: {choices}'
+            })
+
+        if field.lstrip('-') == 'id':
+            return (field,)
+
+        # the primary key breaks ties so pages are deterministic
+        return (field, '-id' if field.startswith('-') else 'id')
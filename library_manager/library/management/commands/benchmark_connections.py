@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 1 hora
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+
+from oauth2_provider.models import get_application_model
+
+from library_users.models import User
+from library_users.views import generate_token_for_user
+
+# environment of every compared mode, the rest comes from the current one
+MODES = {
+    'connection per request': {
+        'DB_DRIVER': 'django.db.backends.postgresql',
+        'PG_CONN_MAX_AGE': '0',
+    },
+    'persistent connections': {
+        'DB_DRIVER': 'django.db.backends.postgresql',
+        'PG_CONN_MAX_AGE': '60',
+    },
+    'pooled connections': {
+        'DB_DRIVER': 'library_manager.postgresql_pool',
+        'PG_CONN_MAX_AGE': '0',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Compares the requests per second of the API with and without connection pooling'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=16,
+            help='Number of threads sending requests, like the threads of the gunicorn workers',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Number of requests sent by every thread',
+        )
+        parser.add_argument(
+            '--run',
+            action='store_true',
+            help='Measures only the database settings of the current environment',
+        )
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['requests'] < 1:
+            raise CommandError('--threads and --requests must be positive numbers')
+
+        if options['run']:
+            self.stdout.write(json.dumps(self.run(options['threads'], options['requests'])))
+            return
+
+        # every mode runs in its own process so its settings are loaded fresh
+        for mode, environment in MODES.items():
+            result = subprocess.run(
+                [
+                    sys.executable, '-m', 'django', 'benchmark_connections', '--run',
+                    '--threads', str(options['threads']),
+                    '--requests', str(options['requests']),
+                ],
+                env={**os.environ, **environment},
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode:
+                raise CommandError(f'{mode} failed:\n{result.stderr}')
+            measure = json.loads(result.stdout.splitlines()[-1])
+            self.stdout.write(
+                f'{mode}: {measure["requests"] / measure["seconds"]:.1f} requests/s, '
+                f'{measure["connections"]} server connections'
+            )
+
+    def run(self, threads, requests):
+        user = User.objects.create_user(username=f'benchmark_connections_{os.getpid()}')
+        Application = get_application_model()
+        application = Application.objects.create(
+            name=user.username + '_app',
+            user=user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+        )
+        token = generate_token_for_user(user, application).token
+        path = reverse('author-list')
+        connections.close_all()
+
+        # the real WSGI handler closes or recycles the connection at the end
+        # of every request, as gunicorn does
+        handler = WSGIHandler()
+        backend_pids = set()
+        failed = []
+
+        # connection_created is also sent for every connection taken from
+        # the pool, the server process tells the real connections apart
+        def count_connection(sender, connection, **kwargs):
+            backend_pids.add(connection.connection.info.backend_pid)
+
+        def start_response(status, headers):
+            if not status.startswith('200'):
+                failed.append(status)
+
+        connection_created.connect(count_connection)
+
+        def send_requests():
+            for _ in range(requests):
+                environ = {
+                    'PATH_INFO': path,
+                    'HTTP_HOST': 'localhost',
+                    'HTTP_AUTHORIZATION': f'Bearer {token}',
+                    'wsgi.input': BytesIO(),
+                }
+                setup_testing_defaults(environ)
+                response = handler(environ, start_response)
+                b''.join(response)
+                response.close()
+            connections.close_all()
+
+        workers = [threading.Thread(target=send_requests) for _ in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        connection_created.disconnect(count_connection)
+        user.delete()
+        if failed:
+            raise CommandError(f'{len(failed)} requests failed, the first with {failed[0]}')
+        return {'requests': threads * requests, 'seconds': elapsed, 'connections': len(backend_pids)}
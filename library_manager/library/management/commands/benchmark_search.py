@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 30 minutes
+"""
+
+import random
+import statistics
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from library.models import Author, Book, Category
+from library.search import search
+
+SYLLABLES = (
+    'ka', 'lo', 'mi', 'ra', 'te', 'su', 'no', 've', 'di', 'pa',
+    'ro', 'ne', 'shi', 'ta', 'gu', 'le', 'bo', 'fi', 'za', 'mu',
+)
+
+# titles are made of synthetic words so every word matches a realistic
+# fraction of the catalog instead of a tenth of it
+WORDS = tuple(
+    first + second + third
+    for first in SYLLABLES
+    for second in SYLLABLES
+    for third in SYLLABLES[:5]
+)
+
+
+class Command(BaseCommand):
+    help = 'Measures the latency of the book search, optionally seeding synthetic books first'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Number of synthetic books to insert before measuring',
+        )
+        parser.add_argument(
+            '--terms',
+            nargs='+',
+            default=['kalomi', 'kalomi rasute', 'kalomj', 'shitagu'],
+            help='Search terms to measure, misspellings exercise the trigram search',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of times every search is run',
+        )
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            default=50.0,
+            help='Fails if the p95 latency of any search exceeds this budget',
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Prints the query plan of every search',
+        )
+
+    def seed(self, amount, batch_size=5000):
+        author, _ = Author.objects.get_or_create(
+            name='Benchmark',
+            surname='Author',
+            birth_date=date(1900, 1, 1)
+        )
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        randomizer = random.Random(amount)
+
+        for start in range(0, amount, batch_size):
+            Book.objects.bulk_create([
+                Book(
+                    title=' '.join(randomizer.sample(WORDS, 4)).capitalize(),
+                    author=author,
+                    category=category,
+                    published_date=date(2000, 1, 1)
+                )
+                for _ in range(min(batch_size, amount - start))
+            ])
+            self.stdout.write(f'Seeded {min(start + batch_size, amount)} of {amount} books')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be a positive number')
+
+        if options['seed']:
+            self.seed(options['seed'])
+
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        self.stdout.write(f'Searching {Book.objects.count()} books, first page of {page_size}')
+
+        over_budget = []
+        for terms in options['terms']:
+            queryset = search(Book.objects.all(), terms, ['title']).order_by('-search_rank', 'id')
+            page = queryset[:page_size + 1]
+
+            if options['explain']:
+                self.stdout.write(page.explain(analyze=True))
+
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                # a new queryset every time so results are never cached
+                list(page.all())
+                timings.append((time.perf_counter() - started) * 1000)
+
+            timings.sort()
+            p50 = statistics.median(timings)
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f'{terms!r}: p50 {p50:.2f} ms, p95 {p95:.2f} ms, max {timings[-1]:.2f} ms'
+            )
+            if p95 > options['budget_ms']:
+                over_budget.append(terms)
+
+        if over_budget:
+            raise CommandError(f'Searches over the {options["budget_ms"]} ms budget: {over_budget}')
+        self.stdout.write(self.style.SUCCESS('Every search is within budget'))
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 30 minutes
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.renderers import JSONRenderer
+
+from library.fast_serializers import get_values_serializer
+from library.models import Author, Book, BookLending, Customer
+from library.renderers import FastJSONRenderer
+from library.serializers import (AuthorSerializer, BookLendingSerializer,
+                                 BookSerializer, CustomerSerializer)
+
+LIST_SERIALIZERS = {
+    'authors': (Author, AuthorSerializer),
+    'books': (Book, BookSerializer),
+    'customers': (Customer, CustomerSerializer),
+    'lendings': (BookLending, BookLendingSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the time to fetch, serialize and render rows with the model serializers '
+        'and with the fast serialization of the list endpoints'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Number of rows serialized of every model',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of times every serialization is run',
+        )
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            choices=sorted(LIST_SERIALIZERS),
+            default=sorted(LIST_SERIALIZERS),
+            help='Models to serialize',
+        )
+
+    def measure(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = function()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        return statistics.median(timings), output
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError('--rows and --repeat must be positive numbers')
+
+        mismatches = []
+        for name in options['models']:
+            model, serializer_class = LIST_SERIALIZERS[name]
+            queryset = model.objects.order_by('id')[:options['rows']]
+            values_serializer = get_values_serializer(serializer_class)
+
+            def serialize():
+                return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+            def fast_serialize():
+                rows = values_serializer.values_list(queryset.all(), 'pk', 'updated_at')
+                return FastJSONRenderer().render(values_serializer.to_representation(rows))
+
+            serializer_ms, output = self.measure(serialize, options['repeat'])
+            fast_ms, fast_output = self.measure(fast_serialize, options['repeat'])
+
+            rows = output.count(b'{"id":')
+            self.stdout.write(
+                f'{name}: {rows} rows, {len(output)} bytes, serializer {serializer_ms:.1f} ms, '
+                f'fast {fast_ms:.1f} ms, {serializer_ms / fast_ms:.1f}x'
+            )
+            if fast_output != output:
+                mismatches.append(name)
+
+        if mismatches:
+            raise CommandError(f'The fast serialization output differs for: {mismatches}')
+        self.stdout.write(self.style.SUCCESS('Both serializations give the same output'))
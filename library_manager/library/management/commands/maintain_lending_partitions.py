@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 30 minutes
+"""
+
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from library.partitions import archive_lendings, create_month_partitions, drop_empty_month_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates the monthly partitions of the lendings ahead, archives the old returned '
+        'lendings and drops the monthly partitions they leave empty'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.LIBRARY_LENDING_PARTITION_MONTHS_AHEAD,
+            help='Months after the current one that must have a partition',
+        )
+        parser.add_argument(
+            '--archive-after-days',
+            type=int,
+            default=settings.LIBRARY_LENDING_ARCHIVE_AFTER_DAYS,
+            help='Returned lendings lent more days ago than this are archived',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of lendings archived per transaction',
+        )
+
+    def handle(self, *args, **options):
+        if options['months_ahead'] < 0 or options['archive_after_days'] < 0:
+            raise CommandError('--months-ahead and --archive-after-days can not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive number')
+
+        created = create_month_partitions(options['months_ahead'])
+        for name in created:
+            self.stdout.write(f'Created partition {name}')
+
+        lent_before = date.today() - timedelta(days=options['archive_after_days'])
+        archived = archive_lendings(lent_before, options['batch_size'])
+        self.stdout.write(f'Archived {archived} lendings lent before {lent_before}')
+
+        for name in drop_empty_month_partitions(lent_before):
+            self.stdout.write(f'Dropped empty partition {name}')
+
+        self.stdout.write(self.style.SUCCESS('Lending partitions are up to date'))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 30 minutes
+"""
+
+import csv
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from library.models import BookLending
+
+COLUMNS = (
+    'lending', 'due_date', 'days_overdue', 'book', 'title',
+    'customer', 'name', 'surname', 'email', 'phone_number',
+)
+
+
+class Command(BaseCommand):
+    help = 'Writes the lendings not returned by their due date as CSV, the most overdue first'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--as-of',
+            type=date.fromisoformat,
+            default=None,
+            help='Date the lendings are overdue at, YYYY-MM-DD, today by default',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of lendings fetched per query',
+        )
+
+    def pages(self, as_of, batch_size):
+        """
+        Yields the overdue lendings a page at a time, every page continues
+        the overdue index scan after the last lending of the previous one
+        """
+        queryset = BookLending.objects.overdue(as_of)
+        last = None
+        while True:
+            page = queryset
+            if last is not None:
+                page = page.filter(
+                    Q(due_date__gt=last.due_date) | Q(id__gt=last.id),
+                    due_date__gte=last.due_date,
+                )
+            page = list(page[:batch_size])
+            if page:
+                yield page
+            if len(page) < batch_size:
+                return
+            last = page[-1]
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive number')
+
+        as_of = options['as_of'] or date.today()
+        writer = csv.writer(self.stdout)
+        writer.writerow(COLUMNS)
+
+        overdue = 0
+        for page in self.pages(as_of, options['batch_size']):
+            writer.writerows(
+                (
+                    lending.id, lending.due_date, (as_of - lending.due_date).days,
+                    lending.book.id, lending.book.title,
+                    lending.customer.id, lending.customer.name, lending.customer.surname,
+                    lending.customer.email, lending.customer.phone_number,
+                )
+                for lending in page
+            )
+            overdue += len(page)
+
+        self.stderr.write(f'{overdue} lendings overdue as of {as_of}')
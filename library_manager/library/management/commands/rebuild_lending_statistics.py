@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 20 minutes
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.models import LendingStatistic
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the lending statistics from the lendings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report the statistics out of sync, exits with error if any',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            out_of_sync = LendingStatistic.objects.count_out_of_sync()
+            if out_of_sync:
+                raise CommandError(f'{out_of_sync} lending statistics are out of sync')
+            self.stdout.write(self.style.SUCCESS('Every lending statistic is in sync'))
+            return
+
+        started = time.perf_counter()
+        rebuilt = LendingStatistic.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rebuilt} lending statistics in {time.perf_counter() - started:.2f} s'
+        ))
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 20 minutes
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+
+from library.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the is_lent flag of every book from its open lendings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report the books whose flag is out of sync, exits with error if any',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Number of books checked per transaction',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be a positive number')
+
+        out_of_sync = 0
+        last_pk = 0
+
+        while True:
+            batch_pks = list(
+                Book.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch_pks:
+                break
+            last_pk = batch_pks[-1]
+
+            with transaction.atomic():
+                mismatched = list(
+                    Book.objects.filter(pk__in=batch_pks)
+                    .with_availability()
+                    .exclude(is_lent=F('has_open_lending'))
+                    .select_for_update()
+                    .values_list('pk', flat=True)
+                )
+                out_of_sync += len(mismatched)
+
+                if mismatched and not options['check']:
+                    Book.objects.filter(pk__in=mismatched).sync_lent_state()
+
+        if options['check']:
+            if out_of_sync:
+                raise CommandError(f'{out_of_sync} books have an out of sync lent state')
+            self.stdout.write(self.style.SUCCESS('Every book lent state is in sync'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Fixed the lent state of {out_of_sync} books'))
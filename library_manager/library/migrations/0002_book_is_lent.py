@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:07
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def populate_is_lent(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    BookLending = apps.get_model('library', 'BookLending')
+
+    open_lendings = BookLending.objects.filter(
+        book=OuterRef('pk'),
+        return_date=None
+    )
+    Book.objects.using(schema_editor.connection.alias).update(
+        is_lent=Exists(open_lendings)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='is_lent',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(populate_is_lent, migrations.RunPython.noop),
+    ]
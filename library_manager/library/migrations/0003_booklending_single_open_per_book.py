@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0002_book_is_lent'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='booklending',
+            constraint=models.UniqueConstraint(condition=models.Q(('return_date__isnull', True)), fields=('book',), name='library_booklending_single_open_per_book'),
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:13
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_VECTOR_TRIGGERS = """
+CREATE FUNCTION library_book_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('simple', coalesce(NEW.title, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER library_book_search_vector
+    BEFORE INSERT OR UPDATE OF title ON library_book
+    FOR EACH ROW EXECUTE FUNCTION library_book_search_vector();
+
+CREATE FUNCTION library_author_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector(
+        'simple',
+        coalesce(NEW.name, '') || ' ' || coalesce(NEW.surname, '')
+    );
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER library_author_search_vector
+    BEFORE INSERT OR UPDATE OF name, surname ON library_author
+    FOR EACH ROW EXECUTE FUNCTION library_author_search_vector();
+
+UPDATE library_book SET title = title;
+UPDATE library_author SET name = name;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGERS = """
+DROP TRIGGER library_book_search_vector ON library_book;
+DROP FUNCTION library_book_search_vector();
+DROP TRIGGER library_author_search_vector ON library_author;
+DROP FUNCTION library_author_search_vector();
+"""
+
+TRIGRAM_INDEXES = {
+    'library_book_title_trgm': 'library_book USING gin (title gin_trgm_ops)',
+    'library_author_name_trgm': 'library_author USING gin (name gin_trgm_ops)',
+    'library_author_surname_trgm': 'library_author USING gin (surname gin_trgm_ops)',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Creates the trigram indexes used for typo tolerant search when the
+    server ships the pg_trgm extension, search works without them otherwise
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, definition in TRIGRAM_INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0003_booklending_single_open_per_book'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='library_author_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='library_book_search_gin'),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGERS, DROP_SEARCH_VECTOR_TRIGGERS),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['published_date', 'id'], name='library_book_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['author', 'published_date', 'id'], name='library_book_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['category', 'published_date', 'id'], name='library_book_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booklending',
+            index=models.Index(fields=['lending_date', 'id'], name='library_lending_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booklending',
+            index=models.Index(fields=['customer', 'lending_date', 'id'], name='library_lending_customer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booklending',
+            index=models.Index(fields=['book', 'lending_date', 'id'], name='library_lending_book_idx'),
+        ),
+    ]
@@ -0,0 +1,166 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def apply_changes(changes):
+    """
+    SQL adding to the statistics the changes selected by the changes query,
+    rows of (category_id, author_id, lending_date, return_date, sign) where
+    sign is 1 for a lending added and -1 for a lending removed
+    """
+    return f"""
+    INSERT INTO library_lendingstatistic AS statistic
+        (category_id, author_id, month, lendings, open_lendings, returned_lendings, loan_days)
+    SELECT
+        category_id,
+        author_id,
+        date_trunc('month', lending_date)::date,
+        sum(sign),
+        coalesce(sum(sign) FILTER (WHERE return_date IS NULL), 0),
+        coalesce(sum(sign) FILTER (WHERE return_date IS NOT NULL), 0),
+        coalesce(sum(sign * (return_date - lending_date)), 0)
+    FROM ({changes}) change
+    GROUP BY 1, 2, 3
+    -- updates that leave the statistic as it was, like a new updated_at
+    HAVING sum(sign) <> 0
+        OR sum(sign) FILTER (WHERE return_date IS NULL) <> 0
+        OR sum(sign * (return_date - lending_date)) <> 0
+    -- the same order in every transaction so concurrent ones never deadlock
+    ORDER BY 1, 2, 3
+    ON CONFLICT (category_id, author_id, month) DO UPDATE SET
+        lendings = statistic.lendings + EXCLUDED.lendings,
+        open_lendings = statistic.open_lendings + EXCLUDED.open_lendings,
+        returned_lendings = statistic.returned_lendings + EXCLUDED.returned_lendings,
+        loan_days = statistic.loan_days + EXCLUDED.loan_days;
+
+    DELETE FROM library_lendingstatistic WHERE lendings = 0;
+    """
+
+
+def lendings_of(table, sign):
+    return f"""
+        SELECT book.category_id, book.author_id, lending.lending_date, lending.return_date, {sign} AS sign
+        FROM {table} lending
+        JOIN library_book book ON book.id = lending.book_id
+    """
+
+
+def book_lendings(book, sign):
+    return f"""
+        SELECT {book}.category_id, {book}.author_id, lending.lending_date, lending.return_date, {sign} AS sign
+        FROM library_booklending lending
+        WHERE lending.book_id = {book}.id
+    """
+
+
+LENDING_STATISTICS_TRIGGERS = f"""
+CREATE FUNCTION library_lending_statistics_insert() RETURNS trigger AS $$
+BEGIN
+    {apply_changes(lendings_of('new_lendings', 1))}
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER library_lending_statistics_insert
+    AFTER INSERT ON library_booklending
+    REFERENCING NEW TABLE AS new_lendings
+    FOR EACH STATEMENT EXECUTE FUNCTION library_lending_statistics_insert();
+
+CREATE FUNCTION library_lending_statistics_update() RETURNS trigger AS $$
+BEGIN
+    {apply_changes(lendings_of('old_lendings', -1) + ' UNION ALL ' + lendings_of('new_lendings', 1))}
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER library_lending_statistics_update
+    AFTER UPDATE ON library_booklending
+    REFERENCING OLD TABLE AS old_lendings NEW TABLE AS new_lendings
+    FOR EACH STATEMENT EXECUTE FUNCTION library_lending_statistics_update();
+
+CREATE FUNCTION library_lending_statistics_delete() RETURNS trigger AS $$
+BEGIN
+    {apply_changes(lendings_of('old_lendings', -1))}
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER library_lending_statistics_delete
+    AFTER DELETE ON library_booklending
+    REFERENCING OLD TABLE AS old_lendings
+    FOR EACH STATEMENT EXECUTE FUNCTION library_lending_statistics_delete();
+
+CREATE FUNCTION library_book_lending_statistics() RETURNS trigger AS $$
+BEGIN
+    {apply_changes(book_lendings('OLD', -1) + ' UNION ALL ' + book_lendings('NEW', 1))}
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER library_book_lending_statistics
+    AFTER UPDATE OF author_id, category_id ON library_book
+    FOR EACH ROW
+    WHEN (OLD.author_id <> NEW.author_id OR OLD.category_id <> NEW.category_id)
+    EXECUTE FUNCTION library_book_lending_statistics();
+"""
+
+DROP_LENDING_STATISTICS_TRIGGERS = """
+DROP TRIGGER library_lending_statistics_insert ON library_booklending;
+DROP FUNCTION library_lending_statistics_insert();
+DROP TRIGGER library_lending_statistics_update ON library_booklending;
+DROP FUNCTION library_lending_statistics_update();
+DROP TRIGGER library_lending_statistics_delete ON library_booklending;
+DROP FUNCTION library_lending_statistics_delete();
+DROP TRIGGER library_book_lending_statistics ON library_book;
+DROP FUNCTION library_book_lending_statistics();
+"""
+
+POPULATE_LENDING_STATISTICS = """
+INSERT INTO library_lendingstatistic
+    (category_id, author_id, month, lendings, open_lendings, returned_lendings, loan_days)
+SELECT
+    book.category_id,
+    book.author_id,
+    date_trunc('month', lending.lending_date)::date,
+    count(*),
+    count(*) FILTER (WHERE lending.return_date IS NULL),
+    count(*) FILTER (WHERE lending.return_date IS NOT NULL),
+    coalesce(sum(lending.return_date - lending.lending_date), 0)
+FROM library_booklending lending
+JOIN library_book book ON book.id = lending.book_id
+GROUP BY 1, 2, 3;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LendingStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('lendings', models.IntegerField(default=0)),
+                ('open_lendings', models.IntegerField(default=0)),
+                ('returned_lendings', models.IntegerField(default=0)),
+                ('loan_days', models.BigIntegerField(default=0)),
+                ('author', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='library.author')),
+                ('category', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='library.category')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('lendings', 0)), fields=['id'], name='library_lendingstat_empty_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='lendingstatistic',
+            constraint=models.UniqueConstraint(fields=('category', 'author', 'month'), name='library_lendingstatistic_unique'),
+        ),
+        migrations.RunSQL(LENDING_STATISTICS_TRIGGERS, DROP_LENDING_STATISTICS_TRIGGERS),
+        migrations.RunSQL(POPULATE_LENDING_STATISTICS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:20
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_due_dates(apps, schema_editor):
+    """
+    Sets the due date of the existing lendings from the current loan period
+    """
+    BookLending = apps.get_model('library', 'BookLending')
+    BookLending.objects.using(schema_editor.connection.alias).update(
+        due_date=models.ExpressionWrapper(
+            models.F('lending_date') + datetime.timedelta(days=settings.LIBRARY_LOAN_PERIOD_DAYS),
+            output_field=models.DateField()
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0007_lending_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booklending',
+            name='due_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(set_due_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booklending',
+            name='due_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='booklending',
+            index=models.Index(condition=models.Q(('return_date__isnull', True)), fields=['due_date', 'id'], name='library_lending_overdue_idx'),
+        ),
+    ]
@@ -0,0 +1,190 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+# the columns of the lending table, in their order
+COLUMNS = 'id, lending_date, return_date, book_id, customer_id, updated_at, due_date, archived'
+
+CONSTRAINTS = {
+    'library_booklending_book_id_682396cf_fk_library_book_id':
+        'FOREIGN KEY (book_id) REFERENCES library_book (id) DEFERRABLE INITIALLY DEFERRED',
+    'library_booklending_customer_id_cb25720c_fk_library_customer_id':
+        'FOREIGN KEY (customer_id) REFERENCES library_customer (id) DEFERRABLE INITIALLY DEFERRED',
+}
+
+INDEXES = {
+    'library_booklending_book_id_682396cf': '(book_id)',
+    'library_booklending_customer_id_cb25720c': '(customer_id)',
+    'library_lending_date_idx': '(lending_date, id)',
+    'library_lending_customer_idx': '(customer_id, lending_date, id)',
+    'library_lending_book_idx': '(book_id, lending_date, id)',
+    'library_lending_overdue_idx': '(due_date, id) WHERE return_date IS NULL',
+}
+
+# the statistics triggers of migration 0007, dropped with the old table
+STATISTICS_TRIGGERS = """
+CREATE TRIGGER library_lending_statistics_insert
+    AFTER INSERT ON library_booklending
+    REFERENCING NEW TABLE AS new_lendings
+    FOR EACH STATEMENT EXECUTE FUNCTION library_lending_statistics_insert();
+
+CREATE TRIGGER library_lending_statistics_update
+    AFTER UPDATE ON library_booklending
+    REFERENCING OLD TABLE AS old_lendings NEW TABLE AS new_lendings
+    FOR EACH STATEMENT EXECUTE FUNCTION library_lending_statistics_update();
+
+CREATE TRIGGER library_lending_statistics_delete
+    AFTER DELETE ON library_booklending
+    REFERENCING OLD TABLE AS old_lendings
+    FOR EACH STATEMENT EXECUTE FUNCTION library_lending_statistics_delete();
+"""
+
+
+def table_objects_sql(primary_key):
+    constraints = ''.join(
+        f'ALTER TABLE library_booklending ADD CONSTRAINT {name} {definition};\n'
+        for name, definition in CONSTRAINTS.items()
+    )
+    indexes = ''.join(
+        f'CREATE INDEX {name} ON library_booklending {definition};\n'
+        for name, definition in INDEXES.items()
+    )
+    return (
+        f'ALTER TABLE library_booklending ADD CONSTRAINT library_booklending_pkey PRIMARY KEY ({primary_key});\n'
+        + constraints + indexes + STATISTICS_TRIGGERS
+    )
+
+
+# The lendings are partitioned by list of archived, the archived ones in a
+# single partition, and the rest by range of lending_date in monthly
+# partitions plus a default one, created from the month of the oldest
+# lending up to three months ahead. The identity of the id column becomes a
+# sequence default, partitioned tables do not support identity columns
+PARTITION_BOOKLENDING = f"""
+ALTER TABLE library_booklending RENAME TO library_booklending_unpartitioned;
+
+CREATE SEQUENCE library_booklending_partitioned_id_seq;
+
+CREATE TABLE library_booklending (
+    id bigint NOT NULL DEFAULT nextval('library_booklending_partitioned_id_seq'),
+    lending_date date NOT NULL,
+    return_date date NULL,
+    book_id bigint NOT NULL,
+    customer_id bigint NOT NULL,
+    updated_at timestamp with time zone NOT NULL,
+    due_date date NOT NULL,
+    archived boolean NOT NULL
+) PARTITION BY LIST (archived);
+
+ALTER SEQUENCE library_booklending_partitioned_id_seq OWNED BY library_booklending.id;
+
+CREATE TABLE library_booklending_archive
+    PARTITION OF library_booklending FOR VALUES IN (true);
+
+CREATE TABLE library_booklending_hot
+    PARTITION OF library_booklending FOR VALUES IN (false)
+    PARTITION BY RANGE (lending_date);
+
+CREATE TABLE library_booklending_hot_default
+    PARTITION OF library_booklending_hot DEFAULT;
+
+DO $$
+DECLARE
+    month date;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', least(
+                (SELECT min(lending_date) FROM library_booklending_unpartitioned),
+                current_date
+            )),
+            date_trunc('month', current_date) + interval '3 months',
+            interval '1 month'
+        )::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF library_booklending_hot FOR VALUES FROM (%L) TO (%L)',
+            'library_booklending_' || to_char(month, '"y"YYYY"m"MM'),
+            month,
+            (month + interval '1 month')::date
+        );
+    END LOOP;
+END
+$$;
+
+INSERT INTO library_booklending ({COLUMNS})
+SELECT {COLUMNS} FROM library_booklending_unpartitioned;
+
+SELECT setval('library_booklending_partitioned_id_seq', coalesce(max(id), 0) + 1, false)
+FROM library_booklending;
+
+DROP TABLE library_booklending_unpartitioned;
+
+ALTER SEQUENCE library_booklending_partitioned_id_seq RENAME TO library_booklending_id_seq;
+
+{table_objects_sql('id, lending_date, archived')}
+
+CREATE FUNCTION library_booklending_single_open() RETURNS trigger AS $$
+BEGIN
+    -- lendings of the same book wait for each other here, so the one
+    -- checking last sees the lending of the other
+    PERFORM 1 FROM library_book WHERE id = NEW.book_id FOR NO KEY UPDATE;
+    IF EXISTS (
+        SELECT 1 FROM library_booklending
+        WHERE book_id = NEW.book_id
+            AND return_date IS NULL
+            AND NOT archived
+            AND id <> NEW.id
+    ) THEN
+        RAISE unique_violation USING
+            MESSAGE = format('Book %s already has a lending not yet returned', NEW.book_id),
+            CONSTRAINT = 'library_booklending_single_open_per_book';
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER library_booklending_single_open
+    BEFORE INSERT OR UPDATE OF book_id, return_date ON library_booklending
+    FOR EACH ROW
+    WHEN (NEW.return_date IS NULL)
+    EXECUTE FUNCTION library_booklending_single_open();
+"""
+
+UNPARTITION_BOOKLENDING = f"""
+DROP TRIGGER library_booklending_single_open ON library_booklending;
+DROP FUNCTION library_booklending_single_open();
+
+CREATE TABLE library_booklending_unpartitioned (LIKE library_booklending INCLUDING DEFAULTS);
+
+INSERT INTO library_booklending_unpartitioned ({COLUMNS})
+SELECT {COLUMNS} FROM library_booklending;
+
+ALTER SEQUENCE library_booklending_id_seq OWNED BY library_booklending_unpartitioned.id;
+
+DROP TABLE library_booklending;
+
+ALTER TABLE library_booklending_unpartitioned RENAME TO library_booklending;
+
+{table_objects_sql('id')}
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0008_booklending_due_date'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='booklending',
+            name='library_booklending_single_open_per_book',
+        ),
+        migrations.AddField(
+            model_name='booklending',
+            name='archived',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunSQL(PARTITION_BOOKLENDING, UNPARTITION_BOOKLENDING),
+    ]
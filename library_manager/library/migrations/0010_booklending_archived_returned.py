@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0009_partition_booklending'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='booklending',
+            constraint=models.CheckConstraint(check=models.Q(('archived', False), ('return_date__isnull', False), _connector='OR'), name='library_booklending_archived_returned'),
+        ),
+    ]
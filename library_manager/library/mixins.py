@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 1 hour
+"""
+
+import hashlib
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from rest_framework.renderers import JSONRenderer
+
+from library.fast_serializers import get_values_serializer
+from library.renderers import FastJSONRenderer
+
+
+def compute_etag(*parts):
+    """
+    Returns a strong, quoted ETag identifying the given version parts
+    """
+    digest = hashlib.md5(
+        '|'.join(str(part) for part in parts).encode(),
+        usedforsecurity=False
+    )
+    return quote_etag(digest.hexdigest())
+
+
+def set_conditional_headers(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+
+    return response
+
+
+class ConditionalDetailMixin:
+    """
+    Mixin for detail views of models with an updated_at timestamp.
+
+    GET answers 304 Not Modified, without serializing the object, when the
+    client already has its current version, and PUT/PATCH answer 412
+    Precondition Failed when the If-Match version is not the current one.
+    The object is locked while it is updated, so the version checked is the
+    one that gets replaced.
+    """
+    lock_object = False
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.lock_object:
+            queryset = queryset.select_for_update(of=('self',))
+
+        return queryset
+
+    def get_object(self):
+        # fetched once per request, the precondition checks need it too. An
+        # object read without the lock is read again once it is required
+        if getattr(self, '_conditional_object_locked', None) is not self.lock_object:
+            self._conditional_object = super().get_object()
+            self._conditional_object_locked = self.lock_object
+
+        return self._conditional_object
+
+    @contextmanager
+    def locked_object(self):
+        """
+        Runs the block in a transaction where get_object() locks the object,
+        views reading the object before updating it open it themselves
+        """
+        if self.lock_object:
+            yield
+            return
+
+        with transaction.atomic():
+            self.lock_object = True
+            yield
+
+    def get_etag(self, instance):
+        return compute_etag(instance._meta.label, instance.pk, instance.updated_at.isoformat())
+
+    def get_conditional_response(self, request, instance):
+        """
+        Returns the 304 or 412 response for the request preconditions
+        against the current version of instance, None if they pass
+        """
+        etag = self.get_etag(instance)
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(instance.updated_at.timestamp())
+        )
+        if response is not None:
+            set_conditional_headers(response, etag, instance.updated_at)
+
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        conditional_response = self.get_conditional_response(request, instance)
+        if conditional_response is not None:
+            return conditional_response
+
+        response = super().retrieve(request, *args, **kwargs)
+
+        return set_conditional_headers(response, self.get_etag(instance), instance.updated_at)
+
+    def update(self, request, *args, **kwargs):
+        with self.locked_object():
+            instance = self.get_object()
+            conditional_response = self.get_conditional_response(request, instance)
+            if conditional_response is not None:
+                return conditional_response
+
+            response = super().update(request, *args, **kwargs)
+
+        if response.status_code == 200:
+            set_conditional_headers(response, self.get_etag(instance), instance.updated_at)
+
+        return response
+
+
+class ConditionalListMixin:
+    """
+    Mixin for list views of models with an updated_at timestamp.
+
+    The ETag of a page is computed from the ids and versions of its rows and
+    its links, so an unchanged page answers 304 Not Modified without being
+    serialized.
+    """
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_list_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return super().list(request, *args, **kwargs)
+
+        return self.get_page_response(request, page)
+
+    def get_list_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def serialize_page(self, page):
+        return self.get_serializer(page, many=True).data
+
+    def get_page_response(self, request, page):
+        """
+        Returns the response of a fetched page, 304 Not Modified if the
+        client already has it
+        """
+        etag = compute_etag(
+            self.paginator.get_next_link(),
+            self.paginator.get_previous_link(),
+            *((obj.pk, obj.updated_at.isoformat()) for obj in page)
+        )
+        last_modified = max((obj.updated_at for obj in page), default=None)
+
+        # a page also changes when one of its rows is deleted, which its
+        # last modification date does not show, so only its ETag is checked
+        conditional_response = get_conditional_response(request, etag=etag)
+        if conditional_response is not None:
+            return set_conditional_headers(conditional_response, etag, last_modified)
+
+        response = self.get_paginated_response(self.serialize_page(page))
+
+        return set_conditional_headers(response, etag, last_modified)
+
+
+class FastListMixin:
+    """
+    Mixin for the list views using ConditionalListMixin, enabled with
+    LIBRARY_FAST_LIST_SERIALIZATION.
+
+    Pages are fetched as values_list() rows and serialized by the
+    ValuesSerializer of the serializer class, without building the model
+    instances, then rendered with orjson. The JSON is the same the
+    serializer class gives.
+    """
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if not settings.LIBRARY_FAST_LIST_SERIALIZATION:
+            return renderers
+
+        return [
+            FastJSONRenderer() if type(renderer) is JSONRenderer else renderer
+            for renderer in renderers
+        ]
+
+    def get_list_queryset(self):
+        queryset = super().get_list_queryset()
+        if not settings.LIBRARY_FAST_LIST_SERIALIZATION or self.paginator is None:
+            return queryset
+
+        # the page ETag and the pagination cursor read these from the rows
+        ordering = self.paginator.get_ordering(self.request, queryset, self)
+        columns = ('pk', 'updated_at') + tuple(field.lstrip('-') for field in ordering)
+
+        return get_values_serializer(self.get_serializer_class()).values_list(queryset, *columns)
+
+    def serialize_page(self, page):
+        if not settings.LIBRARY_FAST_LIST_SERIALIZATION:
+            return super().serialize_page(page)
+
+        return get_values_serializer(self.get_serializer_class()).to_representation(page)
@@ -5,7 +5,14 @@ github: @thriskel
 time taken: 15 minutes
 """
 
-from django.db import models
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models, transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.db.models.functions import Now
 
 
 class Author(models.Model):
@@ -24,6 +31,19 @@ class Author(models.Model):
         null=True,
         blank=True
     )
+    updated_at = models.DateTimeField(
+        auto_now=True
+    )
+    # maintained by a database trigger from name and surname
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='library_author_search_gin'),
+        ]
 
     def is_alive(self):
         """If the author is alive, returns True, False otherwise"""
@@ -50,6 +70,25 @@ class Category(models.Model):
         return f'Category: ({self.name})'
 
 
+class BookQuerySet(models.QuerySet):
+    def with_availability(self):
+        """
+        Annotates every book with whether it has a lending not yet returned,
+        so availability is resolved in the same query as the books
+        """
+        open_lendings = BookLending.objects.open().filter(book=OuterRef('pk'))
+        return self.annotate(has_open_lending=Exists(open_lendings))
+
+    def sync_lent_state(self):
+        """
+        Recomputes the denormalized is_lent flag of the books from their
+        lendings in a single UPDATE, returns the number of rows updated
+        """
+        open_lendings = BookLending.objects.open().filter(book=OuterRef('pk'))
+        # the availability is part of the book representation
+        return self.update(is_lent=Exists(open_lendings), updated_at=Now())
+
+
 class Book(models.Model):
     title = models.CharField(
         max_length=50
@@ -67,18 +106,51 @@ class Book(models.Model):
         null=False,
         blank=False
     )
+    is_lent = models.BooleanField(
+        default=False,
+        editable=False
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True
+    )
+    # maintained by a database trigger from title
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
 
-    def is_available(self):
+    objects = BookQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='library_book_search_gin'),
+            # filters of the book list, all of them ordered by date
+            models.Index(fields=['published_date', 'id'], name='library_book_published_idx'),
+            models.Index(fields=['author', 'published_date', 'id'], name='library_book_author_idx'),
+            models.Index(fields=['category', 'published_date', 'id'], name='library_book_category_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
         """
-        Returns True if the book is available for lending, False otherwise
+        Saves the book without writing is_lent, which is only updated from
+        the lendings so a stale instance can never overwrite it
         """
-        is_available = True
-        not_returned = self.booklending_set.filter(return_date=None)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name != 'is_lent'
+                and field.attname not in deferred
+            ]
 
-        if not_returned:
-            is_available = False
+        super().save(*args, **kwargs)
 
-        return is_available
+    def is_available(self):
+        """
+        Returns True if the book is available for lending, False otherwise
+        """
+        return not self.is_lent
 
     def __str__(self):
         return f'{self.title} - {self.author}'
@@ -103,6 +175,9 @@ class Customer(models.Model):
     email = models.EmailField(
         max_length=100
     )
+    updated_at = models.DateTimeField(
+        auto_now=True
+    )
 
     def __str__(self):
         return f'{self.name} {self.surname}'
@@ -113,6 +188,27 @@ class Customer(models.Model):
         return f'Customer: ({customer_name} {customer_contact})'
 
 
+class BookLendingQuerySet(models.QuerySet):
+    def open(self):
+        """
+        Lendings not yet returned, which are never archived so only the
+        partitions of the recent lendings are read
+        """
+        return self.filter(return_date=None, archived=False)
+
+    def overdue(self, as_of=None):
+        """
+        Lendings not yet returned whose due date is before as_of, today by
+        default, the most overdue first and with their book and customer
+        """
+        return (
+            self.open()
+            .filter(due_date__lt=as_of or date.today())
+            .select_related('book', 'customer')
+            .order_by('due_date', 'id')
+        )
+
+
 class BookLending(models.Model):
     book = models.ForeignKey(
         Book,
@@ -132,9 +228,236 @@ class BookLending(models.Model):
         null=True,
         blank=True
     )
+    # LIBRARY_LOAN_PERIOD_DAYS after the lending date when the book is lent
+    due_date = models.DateField(
+        editable=False
+    )
+    # set by maintain_lending_partitions on the old returned lendings, which
+    # moves them to the archive partition
+    archived = models.BooleanField(
+        default=False,
+        editable=False
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True
+    )
+
+    objects = BookLendingQuerySet.as_manager()
+
+    class Meta:
+        # the table is partitioned by archived and lending_date, see
+        # library.partitions. A book can only have one lending not yet
+        # returned, which a trigger checks since the unique indexes of a
+        # partitioned table must include the partition keys
+        indexes = [
+            # filters of the book lending list, all of them ordered by date
+            models.Index(fields=['lending_date', 'id'], name='library_lending_date_idx'),
+            models.Index(fields=['customer', 'lending_date', 'id'], name='library_lending_customer_idx'),
+            models.Index(fields=['book', 'lending_date', 'id'], name='library_lending_book_idx'),
+            # overdue lendings, only the open ones are indexed
+            models.Index(
+                fields=['due_date', 'id'],
+                condition=Q(return_date__isnull=True),
+                name='library_lending_overdue_idx'
+            ),
+        ]
+        constraints = [
+            # the open lendings are only looked for outside the archive
+            models.CheckConstraint(
+                check=Q(archived=False) | Q(return_date__isnull=False),
+                name='library_booklending_archived_returned'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # keep the loaded book to resync it if the lending changes of book
+        instance._loaded_book_id = instance.__dict__.get('book_id')
+        instance._loaded_lending_date = instance.__dict__.get('lending_date')
+        return instance
+
+    def set_due_date(self):
+        """
+        Sets the due date from the lending date and the loan period, the
+        paths creating lendings without save must call it
+        """
+        self.due_date = self.lending_date + timedelta(days=settings.LIBRARY_LOAN_PERIOD_DAYS)
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the lending and updates the lent state of its book
+        in the same transaction
+        """
+        if self.due_date is None or self.lending_date != getattr(self, '_loaded_lending_date', self.lending_date):
+            self.set_due_date()
+
+        # a reopened lending leaves the archive, where it would not count
+        # as the open lending of its book
+        if self.return_date is None and self.archived:
+            self.archived = False
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'archived'}
+
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            self._sync_books_lent_state()
+            self._loaded_book_id = self.book_id
+            self._loaded_lending_date = self.lending_date
+
+    def delete(self, *args, **kwargs):
+        """
+        Deletes the lending and updates the lent state of its book
+        in the same transaction
+        """
+        with transaction.atomic(using=kwargs.get('using')):
+            deleted = super().delete(*args, **kwargs)
+            self._sync_books_lent_state()
+
+        return deleted
+
+    def _sync_books_lent_state(self):
+        book_ids = {self.book_id, getattr(self, '_loaded_book_id', None)}
+        book_ids.discard(None)
+        Book.objects.using(self._state.db).filter(pk__in=book_ids).sync_lent_state()
 
     def __str__(self):
         return f'{self.book} - {self.customer}'
 
     def __repr__(self):
         return f'Book lending: ({self.book} {self.customer} {self.lending_date} {self.return_date})'
+
+
+class LendingStatisticQuerySet(models.QuerySet):
+    def summarize(self, *fields):
+        """
+        Returns the lendings, open lendings and average loan days of the
+        statistics, grouped by fields if any
+        """
+        totals = {
+            'total_lendings': Sum('lendings', default=0),
+            'total_open_lendings': Sum('open_lendings', default=0),
+            'total_returned_lendings': Sum('returned_lendings', default=0),
+            'total_loan_days': Sum('loan_days', default=0),
+        }
+        if fields:
+            rows = self.values(*fields).order_by(*fields).annotate(**totals).filter(total_lendings__gt=0)
+        else:
+            rows = [self.aggregate(**totals)]
+
+        return [
+            {
+                **{field: row[field] for field in fields},
+                'lendings': row['total_lendings'],
+                'open_lendings': row['total_open_lendings'],
+                'average_loan_days': (
+                    round(row['total_loan_days'] / row['total_returned_lendings'], 2)
+                    if row['total_returned_lendings'] else None
+                ),
+            }
+            for row in rows
+        ]
+
+    def rebuild(self):
+        """
+        Recomputes every statistic from the lendings, blocking the writes of
+        lendings meanwhile. Returns the number of statistics
+        """
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute('LOCK TABLE library_booklending IN SHARE MODE')
+                cursor.execute('DELETE FROM library_lendingstatistic')
+                cursor.execute(f"""
+                    INSERT INTO library_lendingstatistic ({STATISTIC_COLUMNS})
+                    {LENDING_STATISTICS}
+                """)
+                return cursor.rowcount
+
+    def count_out_of_sync(self):
+        """
+        Returns the number of statistics that differ from the ones computed
+        from the lendings, missing ones included
+        """
+        stored = f'SELECT {STATISTIC_COLUMNS} FROM library_lendingstatistic'
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(f"""
+                SELECT count(*) FROM (
+                    ({stored} EXCEPT {LENDING_STATISTICS})
+                    UNION ALL
+                    ({LENDING_STATISTICS} EXCEPT {stored})
+                ) difference
+            """)
+            return cursor.fetchone()[0]
+
+
+STATISTIC_COLUMNS = 'category_id, author_id, month, lendings, open_lendings, returned_lendings, loan_days'
+
+# the statistics of every category, author and month computed from all the
+# lendings, the triggers of migration 0007 keep them up to date
+LENDING_STATISTICS = """
+    SELECT
+        book.category_id,
+        book.author_id,
+        date_trunc('month', lending.lending_date)::date,
+        count(*),
+        count(*) FILTER (WHERE lending.return_date IS NULL),
+        count(*) FILTER (WHERE lending.return_date IS NOT NULL),
+        coalesce(sum(lending.return_date - lending.lending_date), 0)
+    FROM library_booklending lending
+    JOIN library_book book ON book.id = lending.book_id
+    GROUP BY 1, 2, 3
+"""
+
+
+class LendingStatistic(models.Model):
+    """
+    Lendings of the books of a category and author lent in a month, kept up
+    to date by database triggers on the lendings and the books, so every
+    write path of the lendings updates them in its transaction
+    """
+    # statistics go away with their last lending, which the deletion of a
+    # category or author deletes before, so no constraint is needed
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    author = models.ForeignKey(
+        Author,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    # first day of the month
+    month = models.DateField()
+    lendings = models.IntegerField(
+        default=0
+    )
+    open_lendings = models.IntegerField(
+        default=0
+    )
+    returned_lendings = models.IntegerField(
+        default=0
+    )
+    # days the returned lendings were lent in total
+    loan_days = models.BigIntegerField(
+        default=0
+    )
+
+    objects = LendingStatisticQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category', 'author', 'month'],
+                name='library_lendingstatistic_unique'
+            ),
+        ]
+        indexes = [
+            # the triggers delete the statistics left without lendings
+            models.Index(fields=['id'], condition=Q(lendings=0), name='library_lendingstat_empty_idx'),
+        ]
+
+    def __repr__(self):
+        return f'Lending statistic: ({self.category_id} {self.author_id} {self.month} {self.lendings})'
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 15 minutes
+"""
+
+from django.conf import settings
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.settings import api_settings
+
+
+class LibraryCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the library list endpoints.
+
+    Pages are fetched with a `WHERE <ordering field> > <position>` filter
+    over an index of the ordering, `id` unless the view orders otherwise,
+    and search results are ordered by their rank. The cost of a page does
+    not depend on how deep it is, and rows inserted while a client is paging
+    never shift the pages.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.LIBRARY_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Search results are paged from the best ranked match down, asking
+        them in another order is rejected instead of ignored
+        """
+        if 'search_rank' in queryset.query.annotations:
+            if request.query_params.get(api_settings.ORDERING_PARAM):
+                raise ValidationError({
+                    api_settings.ORDERING_PARAM: 'Search results are ordered by relevance, '
+                                                 'the ordering can not be combined with a search'
+                })
+            return ('-search_rank', 'id')
+
+        return super().get_ordering(request, queryset, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async copy of CursorPagination.paginate_queryset of DRF 3.14 that
+        fetches the page with the async ORM. It must follow the changes of
+        that method when DRF is upgraded
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (self.offset, self.reverse, self.current_position) = (0, False, None)
+        else:
+            (self.offset, self.reverse, self.current_position) = self.cursor
+
+        if self.reverse:
+            queryset = queryset.order_by(*reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + '__lt': self.current_position}
+            else:
+                kwargs = {order_attr + '__gt': self.current_position}
+
+            queryset = queryset.filter(**kwargs)
+
+        # the only change, the page and the row telling if another follows
+        # are fetched with the async ORM
+        results = [obj async for obj in queryset[self.offset:self.offset + self.page_size + 1]]
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if self.reverse:
+            self.page = list(reversed(self.page))
+
+            self.has_next = (self.current_position is not None) or (self.offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = self.current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (self.current_position is not None) or (self.offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = self.current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+def reverse_ordering(ordering):
+    """
+    Returns the ordering fields with their direction flipped
+    """
+    return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+
+
+class OverduePagination(LibraryCursorPagination):
+    """
+    Pages the overdue lendings over the index of the open lendings by due
+    date, the most overdue first
+    """
+    ordering = ('due_date', 'id')
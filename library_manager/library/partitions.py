@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 4 horas
+
+Maintenance of the partitions of the lending table, created by migration
+0009:
+
+* library_booklending_archive: the archived lendings
+* library_booklending_hot: the rest, partitioned by month of lending_date
+  in library_booklending_yYYYYmMM partitions, plus the default partition
+  library_booklending_hot_default for the months without one
+
+Queries filtering by lending_date only read the partitions of their months,
+and the open lendings are never archived so their queries skip the archive.
+"""
+
+from datetime import date
+
+from django.db import connection, transaction
+
+from library.models import BookLending
+
+HOT_PARTITION = 'library_booklending_hot'
+DEFAULT_PARTITION = 'library_booklending_hot_default'
+
+
+def add_months(month, months):
+    months += month.month - 1
+    return date(month.year + months // 12, months % 12 + 1, 1)
+
+
+def month_partition_name(month):
+    return f'library_booklending_y{month:%Y}m{month:%m}'
+
+
+def month_partitions():
+    """
+    Returns the monthly partitions as a {first day of the month: name} dict
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            """,
+            [HOT_PARTITION]
+        )
+        names = [name for name, in cursor.fetchall() if name != DEFAULT_PARTITION]
+
+    return {date(int(name[-7:-3]), int(name[-2:]), 1): name for name in names}
+
+
+def create_month_partition(month):
+    """
+    Creates the partition of the month, moving to it the lendings of the
+    month stored in the default partition meanwhile
+    """
+    name = month_partition_name(month)
+    bounds = (month, add_months(month, 1))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} '
+            f'WHERE lending_date >= %s AND lending_date < %s)',
+            bounds
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f'CREATE TABLE {name} PARTITION OF {HOT_PARTITION} FOR VALUES FROM (%s) TO (%s)',
+                bounds
+            )
+            return
+
+        # the default partition can not hold rows of a new partition
+        cursor.execute(f'ALTER TABLE {HOT_PARTITION} DETACH PARTITION {DEFAULT_PARTITION}')
+        cursor.execute(
+            f'CREATE TABLE {name} PARTITION OF {HOT_PARTITION} FOR VALUES FROM (%s) TO (%s)',
+            bounds
+        )
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE lending_date >= %s AND lending_date < %s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            bounds
+        )
+        cursor.execute(f'ALTER TABLE {HOT_PARTITION} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT')
+
+
+def create_month_partitions(months_ahead, today=None):
+    """
+    Creates the missing partitions from the current month up to months_ahead
+    months later, returns the names of the partitions created
+    """
+    current_month = (today or date.today()).replace(day=1)
+    existing = month_partitions()
+    created = []
+    for months in range(months_ahead + 1):
+        month = add_months(current_month, months)
+        if month not in existing:
+            create_month_partition(month)
+            created.append(month_partition_name(month))
+
+    return created
+
+
+def archive_lendings(lent_before, batch_size):
+    """
+    Archives the returned lendings lent before lent_before, batch_size at a
+    time, every batch in its own transaction. The update moves them to the
+    archive partition. Returns the number of lendings archived
+    """
+    archivable = BookLending.objects.filter(
+        archived=False,
+        return_date__isnull=False,
+        lending_date__lt=lent_before
+    )
+    archived = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                archivable
+                .select_for_update(skip_locked=True)
+                .order_by('lending_date', 'id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if ids:
+                archivable.filter(id__in=ids).update(archived=True)
+        archived += len(ids)
+        if len(ids) < batch_size:
+            return archived
+
+
+def drop_empty_month_partitions(before):
+    """
+    Drops the partitions of the months ended by the date before that the
+    archival left without lendings, returns their names
+    """
+    dropped = []
+    for month, name in sorted(month_partitions().items()):
+        if add_months(month, 1) > before:
+            break
+        with transaction.atomic(), connection.cursor() as cursor:
+            # the lock keeps new lendings out of the partition until it is dropped
+            cursor.execute(f'LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {name})')
+            if not cursor.fetchone()[0]:
+                # checks the deferred foreign keys of the lendings moved out,
+                # a table with trigger events pending can not be dropped
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+                cursor.execute(f'ALTER TABLE {HOT_PARTITION} DETACH PARTITION {name}')
+                cursor.execute(f'DROP TABLE {name}')
+                dropped.append(name)
+
+    return dropped
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 40 minutes
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Greatest
+
+# text search configuration used by the search vector triggers
+SEARCH_CONFIG = 'simple'
+
+
+def trigram_enabled(alias):
+    """
+    Returns True if the pg_trgm extension is installed in the database. The
+    result is cached on the connection and forgotten by forget_trigram_enabled
+    when it reconnects, so the next connections see the extension installed
+    or dropped
+    """
+    connection = connections[alias]
+    enabled = getattr(connection, 'trigram_enabled', None)
+    if enabled is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            enabled = connection.trigram_enabled = cursor.fetchone() is not None
+
+    return enabled
+
+
+def forget_trigram_enabled(sender, connection, **kwargs):
+    """
+    Receiver of connection_created, a new connection checks pg_trgm again
+    """
+    connection.trigram_enabled = None
+
+
+def search(queryset, terms, similarity_fields):
+    """
+    Filters queryset to the rows whose search vector matches terms, or
+    with a similarity_fields value close to them to tolerate typos, and
+    annotates each row with its search_rank
+    """
+    query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+    condition = Q(search_vector=query)
+    rank = SearchRank(F('search_vector'), query)
+
+    if trigram_enabled(queryset.db):
+        similarities = []
+        for field in similarity_fields:
+            condition |= Q(**{f'{field}__trigram_word_similar': terms})
+            similarities.append(TrigramWordSimilarity(terms, field))
+
+        if len(similarities) > 1:
+            rank += Greatest(*similarities)
+        else:
+            rank += similarities[0]
+
+    # ranks are real numbers, as double precision they survive being
+    # written into the pagination cursor and compared again
+    return queryset.filter(condition).annotate(
+        search_rank=Cast(rank, output_field=FloatField())
+    )
@@ -5,6 +5,12 @@ github: @thriskel
 time taken: 2 minutes
 """
 
+import operator
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+
 from library_users.models import User
 
 from rest_framework import serializers
@@ -12,6 +18,73 @@ from rest_framework import serializers
 from .models import Author, Category, Book, Customer, BookLending
 
 
+class PrefetchedRelatedObjects:
+    """
+    Stands in for the queryset of a related field, serving the lookups
+    of the field from objects fetched beforehand in a single query
+    """
+    def __init__(self, model, objects):
+        self.model = model
+        self.objects = objects
+
+    def get(self, pk):
+        try:
+            pk = self.model._meta.pk.to_python(pk)
+        except DjangoValidationError:
+            raise ValueError(pk)
+
+        try:
+            return self.objects[pk]
+        except KeyError:
+            raise self.model.DoesNotExist
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    List serializer that validates many items fetching their related
+    objects once and creates them with bulk inserts in a transaction
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.prefetch_related_objects(data)
+
+        return super().to_internal_value(data)
+
+    def prefetch_related_objects(self, data):
+        """
+        Replaces the queryset of the primary key related fields of the child
+        with the objects referenced by data, fetched in one query per field
+        """
+        for field in self.child.fields.values():
+            if field.read_only or not isinstance(field, serializers.PrimaryKeyRelatedField):
+                continue
+
+            model = field.queryset.model
+            pks = set()
+            for item in data:
+                if not isinstance(item, dict):
+                    continue
+                try:
+                    pks.add(model._meta.pk.to_python(item.get(field.field_name)))
+                except (DjangoValidationError, TypeError):
+                    continue
+            pks.discard(None)
+
+            field.queryset = PrefetchedRelatedObjects(
+                model,
+                field.queryset.in_bulk(pks)
+            )
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+
+        with transaction.atomic():
+            return model.objects.bulk_create(
+                [model(**attrs) for attrs in validated_data],
+                batch_size=settings.LIBRARY_BULK_BATCH_SIZE
+            )
+
+
 class UserSerializer(serializers.ModelSerializer):
     """
     User serializer for the library app
@@ -27,7 +100,7 @@ class AuthorSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Author
-        fields = '__all__'
+        exclude = ('search_vector',)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -46,6 +119,12 @@ class BookSerializer(serializers.ModelSerializer):
 
     available = serializers.SerializerMethodField()
 
+    # columns of the fields that are not model fields, for the list views
+    # serializing values_list() rows
+    values_fields = {
+        'available': ('is_lent', operator.not_),
+    }
+
     class Meta:
         model = Book
         fields = ('id', 'title', 'author', 'category', 'published_date', 'available')
@@ -72,4 +151,145 @@ class BookLendingSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = BookLending
-        fields = '__all__'
+        exclude = ('archived',)
+
+
+class OverdueBookSerializer(serializers.ModelSerializer):
+    """
+    Book of an overdue lending
+    """
+    class Meta:
+        model = Book
+        fields = ('id', 'title')
+
+
+class OverdueCustomerSerializer(serializers.ModelSerializer):
+    """
+    Customer of an overdue lending, with the contact details
+    """
+    class Meta:
+        model = Customer
+        fields = ('id', 'name', 'surname', 'email', 'phone_number')
+
+
+class OverdueBookLendingSerializer(serializers.ModelSerializer):
+    """
+    Overdue lending with its book and customer, the days overdue are
+    counted up to the as_of date of the context
+    """
+    book = OverdueBookSerializer()
+    customer = OverdueCustomerSerializer()
+    days_overdue = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BookLending
+        fields = ('id', 'book', 'customer', 'lending_date', 'due_date', 'days_overdue')
+
+    def get_days_overdue(self, obj):
+        return (self.context['as_of'] - obj.due_date).days
+
+
+class OverdueReportSerializer(serializers.Serializer):
+    """
+    Query parameters of the overdue lendings report
+    """
+    as_of = serializers.DateField(
+        required=False,
+        help_text='Date the lendings are overdue at, today by default'
+    )
+    customer = serializers.IntegerField(
+        required=False,
+        help_text='Only the lendings of this customer'
+    )
+
+
+class LendingSummarySerializer(serializers.Serializer):
+    """
+    Totals of a group of lending statistics
+    """
+    lendings = serializers.IntegerField()
+    open_lendings = serializers.IntegerField()
+    average_loan_days = serializers.FloatField(
+        allow_null=True,
+        help_text='Average days the returned lendings were lent'
+    )
+
+
+class CategoryLendingSummarySerializer(LendingSummarySerializer):
+    category = serializers.IntegerField()
+
+
+class AuthorLendingSummarySerializer(LendingSummarySerializer):
+    author = serializers.IntegerField()
+
+
+class MonthLendingSummarySerializer(LendingSummarySerializer):
+    month = serializers.DateField()
+
+
+class LendingStatisticsSerializer(LendingSummarySerializer):
+    """
+    Lending statistics in total and per category, author and month
+    """
+    by_category = CategoryLendingSummarySerializer(many=True)
+    by_author = AuthorLendingSummarySerializer(many=True)
+    by_month = MonthLendingSummarySerializer(many=True)
+
+
+class BookLendingExportSerializer(serializers.Serializer):
+    """
+    Query parameters of the book lendings export
+    """
+    export_format = serializers.ChoiceField(
+        choices=('ndjson', 'csv'),
+        default='ndjson'
+    )
+    lending_date_after = serializers.DateField(
+        required=False,
+        help_text='Only lendings lent on or after this date'
+    )
+    lending_date_before = serializers.DateField(
+        required=False,
+        help_text='Only lendings lent on or before this date'
+    )
+
+    def validate(self, attrs):
+        after = attrs.get('lending_date_after')
+        before = attrs.get('lending_date_before')
+        if after and before and after > before:
+            raise serializers.ValidationError(
+                'lending_date_after must be less than lending_date_before'
+            )
+        return attrs
+
+
+class BookLendingOperationSerializer(serializers.Serializer):
+    """
+    Checkout or return of a book in a batch of lending operations
+    """
+    CHECKOUT = 'checkout'
+    RETURN = 'return'
+
+    action = serializers.ChoiceField(
+        choices=(CHECKOUT, RETURN)
+    )
+    book = serializers.IntegerField()
+    customer = serializers.IntegerField(
+        required=False,
+        help_text='Customer borrowing the book, required for checkouts'
+    )
+    lending_date = serializers.DateField(
+        required=False,
+        help_text='Date of lending of a checkout, today by default'
+    )
+    return_date = serializers.DateField(
+        required=False,
+        help_text='Date of return of a return, today by default'
+    )
+
+    def validate(self, attrs):
+        if attrs['action'] == self.CHECKOUT and 'customer' not in attrs:
+            raise serializers.ValidationError({
+                'customer': 'This field is required for checkouts.'
+            })
+        return attrs
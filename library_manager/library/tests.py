@@ -5,17 +5,101 @@ github: @thriskel
 time taken: 20 minutes
 """
 
-from datetime import date
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.backends.signals import connection_created
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from library.models import Author, Book, Category, Customer, BookLending
+from oauth2_provider.models import get_access_token_model, get_application_model
+from psycopg2.pool import PoolError
+
+from library.models import Author, Book, Category, Customer, BookLending, LendingStatistic
+from library.pagination import LibraryCursorPagination
+from library.partitions import archive_lendings, create_month_partitions, drop_empty_month_partitions
+from library.search import trigram_enabled
+from library.serializers import BookSerializer
+from library.views import book_borrowed_on_conflict
+from library_manager.db_routers import ReplicaRouter, replica_health, replica_reads
+from library_manager.middleware import MetricsMiddleware, ReplicaRoutingMiddleware, ServerTimingMiddleware
+from library_manager.postgresql_pool.base import BlockingConnectionPool
+from library_users.models import User
+from library_users.views import generate_token_for_user
 
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 
+class AuthenticatedAPITestCase(APITestCase):
+    """
+    Base test case whose client sends a valid read/write bearer token
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='librarian',
+            password='1234abcd'
+        )
+        Application = get_application_model()
+        application = Application.objects.create(
+            name='librarian_app',
+            user=self.user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type='password',
+        )
+        access_token = generate_token_for_user(self.user, application)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token.token}')
+
+    def create_books(self, amount, lent=0):
+        """
+        Creates amount books, the first lent of them with an open lending
+        """
+        author, _ = Author.objects.get_or_create(
+            name='Author 1',
+            surname='Surname 1',
+            birth_date=date(2023, 1, 1)
+        )
+        category, _ = Category.objects.get_or_create(
+            name='Aventuras'
+        )
+        customer, _ = Customer.objects.get_or_create(
+            name='Customer 1',
+            surname='Surname 1',
+            address='Address 1',
+            phone_number='111111111',
+        )
+        books = []
+        for number in range(amount):
+            book = Book.objects.create(
+                title=f'Book {number}',
+                author=author,
+                category=category,
+                published_date=date(2023, 1, 1)
+            )
+            if number < lent:
+                BookLending.objects.create(
+                    book=book,
+                    customer=customer,
+                    lending_date=date(2023, 1, 1)
+                )
+            books.append(book)
+
+        return books
+
+
 class AuthorTests(TestCase):
     """
     Test module for Author model
@@ -302,3 +386,1245 @@ class BookLendingDetailTestCase(APITestCase):
         self.book_lending.save()
         response = self.client.delete(self.url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class BookListTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for BookList view
+    """
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('book-list')
+
+    def test_list_books_availability(self):
+        lent_book, available_book = self.create_books(2, lent=1)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        availability = {book['id']: book['available'] for book in response.data['results']}
+        self.assertEqual(availability[lent_book.id], False)
+        self.assertEqual(availability[available_book.id], True)
+
+    def test_list_books_query_count_does_not_grow(self):
+        self.create_books(2, lent=1)
+        # the first request caches the token, so only the page query is left
+        self.client.get(self.url)
+        with self.assertNumQueries(1) as small_page:
+            self.client.get(self.url)
+
+        self.create_books(20, lent=10)
+        with self.assertNumQueries(1) as large_page:
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(small_page.captured_queries), len(large_page.captured_queries))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class BookLentStateTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the denormalized lent state of the books
+    """
+    def setUp(self):
+        super().setUp()
+        self.book, = self.create_books(1)
+        self.customer = Customer.objects.get()
+
+    def test_lending_create_and_return_sync_book(self):
+        response = self.client.post(reverse('lending-list'), {
+            'book': self.book.id,
+            'customer': self.customer.id,
+            'lending_date': '2023-01-01',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.is_lent, True)
+
+        response = self.client.post(reverse('lending-list'), {
+            'book': self.book.id,
+            'customer': self.customer.id,
+            'lending_date': '2023-01-02',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        lending = BookLending.objects.get(book=self.book)
+        lending.return_date = date(2023, 1, 2)
+        lending.save()
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.is_lent, False)
+
+    def test_lending_delete_syncs_book(self):
+        lending = BookLending.objects.create(
+            book=self.book,
+            customer=self.customer,
+            lending_date=date(2023, 1, 1)
+        )
+        lending.delete()
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.is_lent, False)
+
+    def test_saving_a_stale_book_keeps_is_lent(self):
+        BookLending.objects.create(
+            book=self.book,
+            customer=self.customer,
+            lending_date=date(2023, 1, 1)
+        )
+        # self.book still has the is_lent read before the lending
+        self.book.title = 'Renamed'
+        self.book.save()
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.title, self.book.is_lent), ('Renamed', True))
+
+    def test_sync_book_availability_command(self):
+        BookLending.objects.create(
+            book=self.book,
+            customer=self.customer,
+            lending_date=date(2023, 1, 1)
+        )
+        Book.objects.update(is_lent=False)
+
+        with self.assertRaises(CommandError):
+            call_command('sync_book_availability', '--check', stdout=StringIO())
+
+        call_command('sync_book_availability', stdout=StringIO())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.is_lent, True)
+        call_command('sync_book_availability', '--check', stdout=StringIO())
+
+
+class ListPaginationTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the cursor pagination of the list views
+    """
+    def test_pages_are_stable_under_inserts(self):
+        books = self.create_books(5)
+        url = reverse('book-list')
+
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        seen = [book['id'] for book in response.data['results']]
+        self.assertEqual(seen, [books[0].id, books[1].id])
+
+        # rows inserted while paging must not shift or repeat the next pages
+        self.create_books(3)
+        next_url = response.data['next']
+        while next_url:
+            response = self.client.get(next_url)
+            seen += [book['id'] for book in response.data['results']]
+            next_url = response.data['next']
+
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), 8)
+
+    def test_page_size_is_capped(self):
+        self.create_books(3)
+        with mock.patch.object(LibraryCursorPagination, 'max_page_size', 2):
+            response = self.client.get(reverse('book-list'), {'page_size': 50})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('lending-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookLendingExportTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for BookLendingExport view
+    """
+    def setUp(self):
+        super().setUp()
+        books = self.create_books(3)
+        customer = Customer.objects.get()
+        for day, book in enumerate(books, start=1):
+            BookLending.objects.create(
+                book=book,
+                customer=customer,
+                lending_date=date(2023, 1, day),
+                return_date=date(2023, 2, 1)
+            )
+        self.url = reverse('lending-export')
+
+    def get_content(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        content = self.get_content({'lending_date_after': '2023-01-02'})
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['lending_date'] for row in rows], ['2023-01-02', '2023-01-03'])
+        self.assertEqual(rows[0]['return_date'], '2023-02-01')
+
+    def test_export_csv(self):
+        content = self.get_content({
+            'export_format': 'csv',
+            'lending_date_before': '2023-01-01'
+        })
+        lines = content.splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'book', 'customer'])
+        self.assertEqual(len(lines), 2)
+
+    def test_export_invalid_range(self):
+        response = self.client.get(self.url, {
+            'lending_date_after': '2023-01-03',
+            'lending_date_before': '2023-01-01'
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkCreateTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the bulk create views
+    """
+    def setUp(self):
+        super().setUp()
+        self.author = Author.objects.create(
+            name='Author 1',
+            surname='Surname 1',
+            birth_date=date(2023, 1, 1)
+        )
+        self.category = Category.objects.create(
+            name='Aventuras'
+        )
+
+    def book_data(self, number, author=None):
+        return {
+            'title': f'Book {number}',
+            'author': author or self.author.id,
+            'category': self.category.id,
+            'published_date': '2023-01-01'
+        }
+
+    def test_bulk_create_books(self):
+        data = [self.book_data(number) for number in range(50)]
+        # token lookup, one query per related field and the insert in a savepoint
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse('book-bulk'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 50)
+        self.assertEqual(Book.objects.count(), 50)
+
+    def test_bulk_create_ndjson(self):
+        lines = [
+            json.dumps({'name': f'Customer {number}', 'surname': 'Surname',
+                        'address': 'Address', 'phone_number': '111111111',
+                        'email': 'customer@library.com'})
+            for number in range(3)
+        ]
+        response = self.client.post(
+            reverse('customer-bulk'),
+            '\n'.join(lines),
+            content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Customer.objects.count(), 3)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        data = [
+            self.book_data(0),
+            self.book_data(1, author=self.author.id + 100),
+            self.book_data(2, author='not an id'),
+        ]
+        response = self.client.post(reverse('book-bulk'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertEqual(response.data['errors'][0]['errors']['author'][0].code, 'does_not_exist')
+        self.assertEqual(response.data['errors'][1]['errors']['author'][0].code, 'incorrect_type')
+        self.assertEqual(Book.objects.count(), 0)
+
+    def test_bulk_create_requires_a_list(self):
+        response = self.client.post(reverse('author-bulk'), {'name': 'Author'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookLendingBatchTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for BookLendingBatch view
+    """
+    def setUp(self):
+        super().setUp()
+        self.books = self.create_books(4, lent=1)
+        self.customer = Customer.objects.get()
+        self.url = reverse('lending-batch')
+
+    def test_batch_checkouts_and_returns(self):
+        lent_book, book_1, book_2, book_3 = self.books
+        operations = [
+            {'action': 'return', 'book': lent_book.id, 'return_date': '2023-01-05'},
+            {'action': 'checkout', 'book': lent_book.id, 'customer': self.customer.id},
+            {'action': 'checkout', 'book': book_1.id, 'customer': self.customer.id},
+            {'action': 'checkout', 'book': book_1.id, 'customer': self.customer.id},
+            {'action': 'return', 'book': book_2.id},
+            {'action': 'checkout', 'book': book_3.id},
+        ]
+        response = self.client.post(self.url, operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, ['ok', 'ok', 'ok', 'error', 'error', 'error'])
+        self.assertEqual(
+            BookLending.objects.filter(book=lent_book, return_date=None).get().id,
+            response.data['results'][1]['lending']
+        )
+
+        lent = dict(Book.objects.values_list('id', 'is_lent'))
+        self.assertEqual(lent, {lent_book.id: True, book_1.id: True, book_2.id: False, book_3.id: False})
+
+    def test_batch_query_count_does_not_grow(self):
+        lent_books = self.create_books(5, lent=5)
+        available_books = self.create_books(5)
+
+        def operations(start, end):
+            return [
+                {'action': 'return', 'book': book.id} for book in lent_books[start:end]
+            ] + [
+                {'action': 'checkout', 'book': book.id, 'customer': self.customer.id}
+                for book in available_books[start:end]
+            ]
+
+        # the token is cached by the first request, keep it out of the counts
+        self.client.get(reverse('book-list'))
+        with CaptureQueriesContext(connection) as small_batch:
+            self.client.post(self.url, operations(0, 1), format='json')
+        with CaptureQueriesContext(connection) as large_batch:
+            response = self.client.post(self.url, operations(1, 5), format='json')
+
+        self.assertEqual(len(small_batch.captured_queries), len(large_batch.captured_queries))
+        self.assertEqual(
+            {result['status'] for result in response.data['results']}, {'ok'}
+        )
+
+
+class LendingStatisticsTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the lending statistics and their endpoint
+    """
+    def setUp(self):
+        super().setUp()
+        self.lent_book, self.book = self.create_books(2, lent=1)
+        self.customer = Customer.objects.get()
+        self.url = reverse('lending-statistics')
+
+    def assertInSync(self):
+        self.assertEqual(LendingStatistic.objects.count_out_of_sync(), 0)
+
+    def test_lending_writes_update_the_statistics(self):
+        lending = BookLending.objects.create(
+            book=self.book,
+            customer=self.customer,
+            lending_date=date(2023, 2, 10)
+        )
+        self.assertInSync()
+
+        lending.return_date = date(2023, 2, 14)
+        lending.save()
+        self.assertInSync()
+
+        response = self.client.post(reverse('lending-batch'), [
+            {'action': 'return', 'book': self.lent_book.id, 'return_date': '2023-01-03'},
+            {'action': 'checkout', 'book': self.book.id, 'customer': self.customer.id,
+             'lending_date': '2023-02-20'},
+        ], format='json')
+        self.assertEqual({result['status'] for result in response.data['results']}, {'ok'})
+        self.assertInSync()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['lendings'], 3)
+        self.assertEqual(response.data['open_lendings'], 1)
+        self.assertEqual(response.data['average_loan_days'], 3.0)
+        self.assertEqual(
+            [(month['month'], month['lendings']) for month in response.data['by_month']],
+            [('2023-01-01', 1), ('2023-02-01', 2)]
+        )
+        self.assertEqual(response.data['by_category'][0]['category'], self.book.category_id)
+
+        lending.delete()
+        self.assertInSync()
+
+    def test_book_changes_and_deletions_update_the_statistics(self):
+        author = Author.objects.create(name='Other', surname='Author', birth_date=date(1950, 1, 1))
+        self.lent_book.author = author
+        self.lent_book.save()
+        self.assertInSync()
+        self.assertEqual(LendingStatistic.objects.get().author, author)
+
+        author.delete()
+        self.assertInSync()
+        self.assertFalse(LendingStatistic.objects.exists())
+
+    def test_filters(self):
+        BookLending.objects.create(book=self.book, customer=self.customer, lending_date=date(2023, 3, 1))
+
+        response = self.client.get(self.url, {'month_after': '2023-02-15'})
+        self.assertEqual(response.data['lendings'], 1)
+        self.assertEqual(response.data['average_loan_days'], None)
+
+        response = self.client.get(self.url, {'author': self.book.author_id + 1})
+        self.assertEqual(response.data['lendings'], 0)
+        self.assertEqual(response.data['by_author'], [])
+
+        response = self.client.get(self.url, {'month_before': 'march'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command(self):
+        LendingStatistic.objects.update(lendings=5)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_lending_statistics', '--check', stdout=StringIO())
+
+        call_command('rebuild_lending_statistics', stdout=StringIO())
+        self.assertInSync()
+        self.assertEqual(LendingStatistic.objects.get().lendings, 1)
+
+
+class OverdueLendingTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the due dates and the overdue lendings report
+    """
+    def setUp(self):
+        super().setUp()
+        self.books = self.create_books(4, lent=3)
+        self.customer = Customer.objects.get()
+        self.lendings = list(BookLending.objects.order_by('id'))
+        for days, lending in zip((10, 0, 20), self.lendings):
+            lending.lending_date = date(2023, 1, 1) + timedelta(days=days)
+            lending.save()
+        self.url = reverse('lending-overdue')
+
+    def test_due_date_follows_the_lending_date(self):
+        self.assertEqual(
+            [lending.due_date for lending in BookLending.objects.order_by('id')],
+            [date(2023, 1, 25), date(2023, 1, 15), date(2023, 2, 4)]
+        )
+
+        with override_settings(LIBRARY_LOAN_PERIOD_DAYS=7):
+            response = self.client.post(reverse('lending-batch'), [
+                {'action': 'checkout', 'book': self.books[3].id, 'customer': self.customer.id,
+                 'lending_date': '2023-03-01'},
+            ], format='json')
+        lending = BookLending.objects.get(pk=response.data['results'][0]['lending'])
+        self.assertEqual(lending.due_date, date(2023, 3, 8))
+
+    def test_overdue_report(self):
+        response = self.client.get(self.url, {'as_of': '2023-01-26', 'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        overdue = response.data['results']
+        # the first request caches the token, so only the page query is left
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data['next'])
+        overdue += response.data['results']
+
+        self.assertIsNone(response.data['next'])
+        self.assertEqual([lending['id'] for lending in overdue], [self.lendings[1].id, self.lendings[0].id])
+        self.assertEqual([lending['days_overdue'] for lending in overdue], [11, 1])
+        self.assertEqual(overdue[0]['customer']['phone_number'], '111111111')
+        self.assertEqual(overdue[0]['book']['title'], self.books[1].title)
+
+        response = self.client.get(self.url, {'as_of': '2023-01-26', 'customer': self.customer.id + 1})
+        self.assertEqual(response.data['results'], [])
+
+        response = self.client.get(self.url, {'as_of': 'tomorrow'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_returned_lendings_are_not_overdue(self):
+        self.lendings[1].return_date = date(2023, 2, 1)
+        self.lendings[1].save()
+        response = self.client.get(self.url, {'as_of': '2023-01-26'})
+        self.assertEqual([lending['id'] for lending in response.data['results']], [self.lendings[0].id])
+
+    def test_overdue_report_command(self):
+        stdout = StringIO()
+        call_command('overdue_report', '--as-of', '2023-02-10', '--batch-size', '1', stdout=stdout, stderr=StringIO())
+        rows = stdout.getvalue().splitlines()
+
+        self.assertEqual(rows[0].split(',')[:3], ['lending', 'due_date', 'days_overdue'])
+        self.assertEqual(
+            [row.split(',')[:3] for row in rows[1:]],
+            [[str(self.lendings[1].id), '2023-01-15', '26'],
+             [str(self.lendings[0].id), '2023-01-25', '16'],
+             [str(self.lendings[2].id), '2023-02-04', '6']]
+        )
+
+
+class SingleOpenLendingTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the single open lending per book constraint
+    """
+    def setUp(self):
+        super().setUp()
+        self.book, = self.create_books(1, lent=1)
+        self.customer = Customer.objects.get()
+
+    def test_second_open_lending_is_rejected_by_database(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BookLending.objects.create(
+                book=self.book,
+                customer=self.customer,
+                lending_date=date(2023, 1, 2)
+            )
+
+    def test_concurrent_lending_returns_validation_error(self):
+        # the book was seen available by a request racing with the lending
+        Book.objects.update(is_lent=False)
+        response = self.client.post(reverse('lending-list'), {
+            'book': self.book.id,
+            'customer': self.customer.id,
+            'lending_date': '2023-01-02',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(BookLending.objects.filter(book=self.book).count(), 1)
+
+    def test_reopening_lending_returns_validation_error(self):
+        BookLending.objects.update(return_date=date(2023, 1, 2))
+        BookLending.objects.create(
+            book=self.book,
+            customer=self.customer,
+            lending_date=date(2023, 1, 3)
+        )
+        returned = BookLending.objects.exclude(return_date=None).get()
+        response = self.client.patch(
+            reverse('lending-detail', args=(returned.id,)),
+            {'return_date': None},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_integrity_errors_are_not_reported_as_borrowed(self):
+        with self.assertRaises(IntegrityError), book_borrowed_on_conflict(), transaction.atomic():
+            BookLending.objects.create(
+                book_id=self.book.id + 1000,
+                customer=self.customer,
+                lending_date=date(2023, 1, 2),
+                return_date=date(2023, 1, 3)
+            )
+            connection.check_constraints()
+
+
+class LendingPartitionTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the partitions of the lendings and their archival
+    """
+    def setUp(self):
+        super().setUp()
+        self.books = self.create_books(3, lent=3)
+        self.lendings = list(BookLending.objects.order_by('id'))
+
+    def partitions(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id, tableoid::regclass::text FROM library_booklending')
+            return dict(cursor.fetchall())
+
+    def return_lendings(self, *lendings):
+        for lending in lendings:
+            lending.return_date = date(2023, 1, 10)
+            lending.save()
+
+    def test_archive_moves_old_returned_lendings(self):
+        self.return_lendings(*self.lendings[:2])
+
+        self.assertEqual(archive_lendings(date(2023, 2, 1), batch_size=1), 2)
+        self.assertEqual(archive_lendings(date(2023, 2, 1), batch_size=1), 0)
+        self.assertEqual(self.partitions(), {
+            self.lendings[0].id: 'library_booklending_archive',
+            self.lendings[1].id: 'library_booklending_archive',
+            self.lendings[2].id: 'library_booklending_hot_default',
+        })
+        self.assertEqual(list(BookLending.objects.open().values_list('id', flat=True)), [self.lendings[2].id])
+
+        # the archived lendings are still served
+        response = self.client.get(reverse('lending-detail', args=(self.lendings[0].id,)))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('archived', response.data)
+        response = self.client.get(reverse('lending-list'))
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_reopened_lending_leaves_the_archive(self):
+        self.return_lendings(self.lendings[0])
+        archive_lendings(date(2023, 2, 1), batch_size=10)
+        url = reverse('lending-detail', args=(self.lendings[0].id,))
+
+        response = self.client.patch(url, {'return_date': None}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.partitions()[self.lendings[0].id], 'library_booklending_hot_default')
+        self.assertTrue(Book.objects.get(pk=self.books[0].pk).is_lent)
+
+        # the reopened lending is the open lending of its book again
+        response = self.client.post(reverse('lending-list'), {
+            'book': self.books[0].id,
+            'customer': self.lendings[0].customer_id,
+            'lending_date': '2023-01-20',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(BookLending.objects.open().filter(book=self.books[0]).count(), 1)
+
+    def test_archived_lendings_can_not_be_reopened_in_database(self):
+        self.return_lendings(self.lendings[0])
+        archive_lendings(date(2023, 2, 1), batch_size=10)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BookLending.objects.filter(pk=self.lendings[0].pk).update(return_date=None)
+
+    def test_new_month_partition_takes_its_rows_from_default(self):
+        self.assertEqual(
+            create_month_partitions(1, today=date(2022, 12, 20)),
+            ['library_booklending_y2022m12', 'library_booklending_y2023m01']
+        )
+        self.assertEqual(create_month_partitions(1, today=date(2022, 12, 20)), [])
+        self.assertEqual(set(self.partitions().values()), {'library_booklending_y2023m01'})
+
+        # the lendings of the month go to its partition from now on
+        self.return_lendings(self.lendings[0])
+        lending = BookLending.objects.create(
+            book=self.books[0],
+            customer=self.lendings[0].customer,
+            lending_date=date(2023, 1, 20)
+        )
+        self.assertEqual(self.partitions()[lending.id], 'library_booklending_y2023m01')
+
+    def test_drop_empty_month_partitions(self):
+        create_month_partitions(0, today=date(2023, 1, 1))
+        self.return_lendings(*self.lendings)
+        archive_lendings(date(2023, 2, 1), batch_size=10)
+
+        self.assertEqual(drop_empty_month_partitions(date(2023, 1, 31)), [])
+        self.assertEqual(drop_empty_month_partitions(date(2023, 2, 1)), ['library_booklending_y2023m01'])
+        self.assertEqual(BookLending.objects.count(), 3)
+
+    def test_partitions_with_lendings_are_kept(self):
+        create_month_partitions(0, today=date(2023, 1, 1))
+        self.return_lendings(*self.lendings[:2])
+        archive_lendings(date(2023, 2, 1), batch_size=10)
+
+        self.assertEqual(drop_empty_month_partitions(date(2023, 2, 1)), [])
+
+    def test_maintain_lending_partitions_command(self):
+        self.return_lendings(self.lendings[0])
+        stdout = StringIO()
+        call_command('maintain_lending_partitions', '--archive-after-days', '30', stdout=stdout)
+
+        self.assertIn('Archived 1 lendings', stdout.getvalue())
+        self.assertEqual(self.partitions()[self.lendings[0].id], 'library_booklending_archive')
+        with self.assertRaises(CommandError):
+            call_command('maintain_lending_partitions', '--batch-size', '0', stdout=StringIO())
+
+
+class SearchTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the search of the BookList and AuthorList views
+    """
+    def setUp(self):
+        super().setUp()
+        self.books = self.create_books(3)
+        titles = ['The shadow of the wind', 'Shadow and bone', 'Winter garden']
+        for book, title in zip(self.books, titles):
+            book.title = title
+            book.save()
+
+    def test_search_books(self):
+        response = self.client.get(reverse('book-list'), {'q': 'shadow wind'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [book['id'] for book in response.data['results']],
+            [self.books[0].id]
+        )
+
+    def test_search_books_ranked_and_paginated(self):
+        Book.objects.filter(pk=self.books[1].pk).update(title='Shadow shadow shadow')
+        url = reverse('book-list')
+        response = self.client.get(url, {'q': 'shadow', 'page_size': 1})
+        found = [book['id'] for book in response.data['results']]
+        response = self.client.get(response.data['next'])
+        found += [book['id'] for book in response.data['results']]
+
+        self.assertEqual(found, [self.books[1].id, self.books[0].id])
+        self.assertIsNone(response.data['next'])
+
+    def test_search_with_ordering_is_rejected(self):
+        for url_name in ('book-list', 'async-book-list'):
+            response = self.client.get(reverse(url_name), {'q': 'shadow', 'ordering': 'published_date'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('ordering', response.data)
+
+    def test_trigram_check_is_cached_per_connection(self):
+        enabled = trigram_enabled(connection.alias)
+        with self.assertNumQueries(0):
+            self.assertEqual(trigram_enabled(connection.alias), enabled)
+
+        # a new connection checks the extension again
+        connection_created.send(sender=connection.__class__, connection=connection)
+        with self.assertNumQueries(1):
+            self.assertEqual(trigram_enabled(connection.alias), enabled)
+
+    def test_search_authors(self):
+        Author.objects.create(
+            name='Carlos',
+            surname='Ruiz Zafon',
+            birth_date=date(1964, 9, 25)
+        )
+        response = self.client.get(reverse('author-list'), {'q': 'zafon'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([author['surname'] for author in response.data['results']], ['Ruiz Zafon'])
+        self.assertNotIn('search_vector', response.data['results'][0])
+
+
+class ListFilterTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the filters and orderings of the list views
+    """
+    def setUp(self):
+        super().setUp()
+        self.books = self.create_books(4, lent=2)
+        for year, book in zip((2020, 2023, 2021, 2022), self.books):
+            book.published_date = date(year, 1, 1)
+            book.save()
+
+    def test_filter_books(self):
+        url = reverse('book-list')
+        response = self.client.get(url, {'available': 'true', 'published_after': '2022-01-01'})
+        self.assertEqual([book['id'] for book in response.data['results']], [self.books[3].id])
+
+        response = self.client.get(url, {'available': 'false'})
+        self.assertEqual(
+            [book['id'] for book in response.data['results']],
+            [self.books[0].id, self.books[1].id]
+        )
+
+        response = self.client.get(url, {'author': 'not an id'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_order_books_by_published_date(self):
+        response = self.client.get(reverse('book-list'), {'ordering': '-published_date', 'page_size': 3})
+        found = [book['id'] for book in response.data['results']]
+        response = self.client.get(response.data['next'])
+        found += [book['id'] for book in response.data['results']]
+
+        books = self.books
+        self.assertEqual(found, [books[1].id, books[3].id, books[2].id, books[0].id])
+
+    def test_unsupported_ordering_is_rejected(self):
+        response = self.client.get(reverse('book-list'), {'ordering': 'title'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('lending-list'), {'ordering': 'return_date'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_lendings(self):
+        BookLending.objects.filter(book=self.books[0]).update(return_date=date(2023, 2, 1))
+        url = reverse('lending-list')
+
+        response = self.client.get(url, {'open': 'true'})
+        self.assertEqual([lending['book'] for lending in response.data['results']], [self.books[1].id])
+
+        response = self.client.get(url, {'open': 'false', 'book': self.books[0].id})
+        self.assertEqual([lending['book'] for lending in response.data['results']], [self.books[0].id])
+
+        response = self.client.get(url, {'lending_date_after': '2023-01-02'})
+        self.assertEqual(response.data['results'], [])
+
+
+class ConditionalRequestTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the ETag and Last-Modified support of the views
+    """
+    def setUp(self):
+        super().setUp()
+        self.book, = self.create_books(1)
+        self.url = reverse('book-detail', args=(self.book.id,))
+
+    def test_detail_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with mock.patch.object(BookSerializer, 'to_representation') as to_representation:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        to_representation.assert_not_called()
+
+        # lending the book changes its availability and so its version
+        BookLending.objects.create(
+            book=self.book,
+            customer=Customer.objects.get(),
+            lending_date=date(2023, 1, 1)
+        )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_update_if_match(self):
+        etag = self.client.get(self.url)['ETag']
+        data = {
+            'title': 'Book 2',
+            'author': self.book.author_id,
+            'category': self.book.category_id,
+            'published_date': '2023-01-01'
+        }
+        response = self.client.put(self.url, data, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # the first update changed the version the client had
+        response = self.client.patch(self.url, {'title': 'Book 3'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, 'Book 2')
+
+    def test_update_locks_the_checked_version(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'title': 'Book 2'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the version compared with If-Match is read with a row lock
+        book_reads = [query['sql'] for query in queries if query['sql'].startswith('SELECT') and '"library_book"' in query['sql']]
+        self.assertIn('FOR UPDATE OF', book_reads[0])
+
+    def test_lending_update_locks_the_checked_version(self):
+        lending = BookLending.objects.create(
+            book=self.book,
+            customer=Customer.objects.get(),
+            lending_date=date(2023, 1, 1)
+        )
+        url = reverse('lending-detail', args=(lending.id,))
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, {'return_date': '2023-01-05'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the lending is validated and compared with If-Match once, locked
+        lending_reads = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "library_booklending"' in query['sql']
+        ]
+        self.assertEqual(len(lending_reads), 1)
+        self.assertIn('FOR UPDATE OF', lending_reads[0])
+
+    def test_list_not_modified(self):
+        url = reverse('customer-list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Customer.objects.create(
+            name='Customer 2',
+            surname='Surname 2',
+            address='Address 2',
+            phone_number='222222222',
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class FastListSerializationTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the fast serialization of the list views
+    """
+    def setUp(self):
+        super().setUp()
+        books = self.create_books(3, lent=2)
+        Author.objects.create(
+            name='Gabriel Garc\u00eda',
+            surname='M\u00e1rquez \u2028\u2029 "\\ \U0001f4da',
+            birth_date=date(1927, 3, 6),
+            death_date=date(2014, 4, 17)
+        )
+        lending = BookLending.objects.get(book=books[1])
+        lending.return_date = date(2023, 2, 1)
+        lending.save()
+
+    def test_same_output_as_the_serializers(self):
+        for url_name in ('book-list', 'author-list', 'customer-list', 'lending-list'):
+            url = reverse(url_name)
+            response = self.client.get(url)
+            with override_settings(LIBRARY_FAST_LIST_SERIALIZATION=True):
+                fast_response = self.client.get(url)
+
+            self.assertEqual(fast_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast_response.content, response.content)
+            self.assertEqual(fast_response['ETag'], response['ETag'])
+
+    @override_settings(LIBRARY_FAST_LIST_SERIALIZATION=True)
+    def test_pages_orderings_and_searches(self):
+        url = reverse('book-list')
+        response = self.client.get(url, {'page_size': 2, 'ordering': '-published_date'})
+        ids = [book['id'] for book in response.data['results']]
+        response = self.client.get(response.data['next'])
+        ids += [book['id'] for book in response.data['results']]
+
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(sorted(ids), list(Book.objects.order_by('id').values_list('id', flat=True)))
+
+        response = self.client.get(url, {'q': 'book', 'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=self.client.get(url)['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class AsyncReadTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the async read endpoints
+    """
+    def test_list_matches_the_sync_list(self):
+        self.create_books(3, lent=1)
+        for url_name in ('book-list', 'author-list', 'customer-list', 'lending-list'):
+            sync_response = self.client.get(reverse(url_name), {'page_size': 2})
+            async_response = self.client.get(reverse(f'async-{url_name}'), {'page_size': 2})
+
+            self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(async_response.data['results'], sync_response.data['results'])
+            # the ETags differ since the links of the pages do
+            self.assertIn('ETag', async_response)
+
+    def test_list_pages_and_filters(self):
+        books = self.create_books(5, lent=2)
+        url = reverse('async-book-list')
+
+        response = self.client.get(url, {'page_size': 2, 'available': 'true'})
+        ids = [book['id'] for book in response.data['results']]
+        response = self.client.get(response.data['next'])
+        ids += [book['id'] for book in response.data['results']]
+
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(ids, [book.id for book in books[2:]])
+
+        response = self.client.get(url, {'ordering': 'title'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_previous_pages_match_the_sync_list(self):
+        self.create_books(5)
+        for url_name in ('book-list', 'async-book-list'):
+            response = self.client.get(reverse(url_name), {'page_size': 2})
+            response = self.client.get(response.data['next'])
+            response = self.client.get(response.data['next'])
+            response = self.client.get(response.data['previous'])
+            if url_name == 'book-list':
+                expected = response.data['results']
+        self.assertEqual(response.data['results'], expected)
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_detail(self):
+        book, = self.create_books(1)
+        url = reverse('async-book-detail', args=(book.id,))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, BookSerializer(book).data)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(reverse('async-book-detail', args=(book.id + 1,)))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_only_reads_are_served(self):
+        response = self.client.post(reverse('async-book-list'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        self.client.credentials()
+        response = self.client.get(reverse('async-book-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_asgi_request(self):
+        authorization = self.client._credentials['HTTP_AUTHORIZATION']
+        response = await self.async_client.get(
+            reverse('async-author-list'),
+            headers={'authorization': authorization}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), 0)
+
+class BlockingConnectionPoolTestCase(TestCase):
+    """
+    Test module for the pool of the pooled PostgreSQL backend
+    """
+    def setUp(self):
+        self.pool = BlockingConnectionPool(1, 1, 0.1, **connection.get_connection_params())
+        self.addCleanup(self.pool.closeall)
+
+    def test_connections_are_reused(self):
+        pooled_connection = self.pool.getconn()
+        self.pool.putconn(pooled_connection)
+        self.assertIs(self.pool.getconn(), pooled_connection)
+
+    def test_waits_for_a_free_connection(self):
+        pooled_connection = self.pool.getconn()
+        with self.assertRaises(PoolError):
+            self.pool.getconn()
+
+        self.pool.putconn(pooled_connection)
+        self.assertIs(self.pool.getconn(), pooled_connection)
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaRoutingTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the routing of the reads to the replicas, the primary
+    stands in for the replica
+    """
+    def setUp(self):
+        super().setUp()
+        replica_health.reset()
+        self.addCleanup(replica_health.reset)
+        self.reads = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def recording_db_for_read(router, model, **hints):
+            self.reads.append((model, replica_reads.get()))
+            return db_for_read(router, model, **hints)
+
+        patcher = mock.patch.object(ReplicaRouter, 'db_for_read', recording_db_for_read)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def replica_models(self):
+        return {model for model, from_replica in self.reads if from_replica}
+
+    def test_safe_requests_read_from_the_replicas(self):
+        self.create_books(1)
+        response = self.client.get(reverse('book-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(Book, self.replica_models())
+        # the access token is always read from the primary
+        self.assertNotIn(get_access_token_model(), self.replica_models())
+        self.assertNotIn('primary_pin', response.cookies)
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        response = self.client.post(reverse('author-list'), {
+            'name': 'Isabel',
+            'surname': 'Allende',
+            'birth_date': '1942-08-02'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.cookies['primary_pin']['max-age'], 5)
+        self.assertEqual(self.replica_models(), set())
+
+        response = self.client.get(reverse('author-list'))
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(self.replica_models(), set())
+
+    def test_writes_pin_the_token_to_the_primary(self):
+        response = self.client.post(reverse('author-list'), {
+            'name': 'Isabel',
+            'surname': 'Allende',
+            'birth_date': '1942-08-02'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # bearer token clients usually drop the cookie
+        self.client.cookies.clear()
+        response = self.client.get(reverse('author-list'))
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(self.replica_models(), set())
+
+        with override_settings(DATABASE_REPLICA_PIN_CACHE=''):
+            self.client.get(reverse('author-list'))
+        self.assertIn(Author, self.replica_models())
+
+    async def test_asgi_requests_read_from_the_replicas(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(iscoroutinefunction(ReplicaRoutingMiddleware(get_response)))
+
+        response = await self.async_client.get(
+            reverse('async-author-list'),
+            headers={'authorization': self.client._credentials['HTTP_AUTHORIZATION']}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(Author, self.replica_models())
+
+    def test_unhealthy_replicas_fall_back_to_the_primary(self):
+        router = ReplicaRouter()
+        token = replica_reads.set(True)
+        self.addCleanup(replica_reads.reset, token)
+
+        with override_settings(DATABASE_REPLICAS=['replica1', 'replica2']):
+            with mock.patch.object(replica_health, 'is_healthy', lambda alias: alias == 'replica2'):
+                self.assertEqual(router.db_for_read(Book), 'replica2')
+                self.assertEqual(router.db_for_write(Book), 'default')
+            with mock.patch.object(replica_health, 'is_healthy', return_value=False):
+                self.assertEqual(router.db_for_read(Book), 'default')
+
+            self.assertFalse(router.allow_migrate('replica1', 'library'))
+
+    def test_health_check(self):
+        self.assertTrue(replica_health.is_healthy('default'))
+
+        failure = OperationalError('connection refused')
+        with mock.patch.object(connection, 'ensure_connection', side_effect=failure), \
+                mock.patch.object(connection, 'close') as close:
+            # the last result is kept for the health check interval
+            self.assertTrue(replica_health.is_healthy('default'))
+            replica_health.reset()
+            with self.assertLogs('library_manager.db_routers', 'WARNING'):
+                self.assertFalse(replica_health.is_healthy('default'))
+            close.assert_called_once()
+
+
+@override_settings(SERVER_TIMING=True)
+class ServerTimingTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the Server-Timing header and log line of the requests
+    """
+    def metrics(self, response):
+        return dict(
+            metric.split(';', 1) for metric in response['Server-Timing'].split(', ')
+        )
+
+    def test_requests_report_their_timings(self):
+        self.create_books(3, lent=1)
+        with CaptureQueriesContext(connection) as queries, \
+                self.assertLogs('library_manager.server_timing', 'INFO') as logs:
+            response = self.client.get(reverse('book-list'))
+
+        metrics = self.metrics(response)
+        self.assertEqual(set(metrics), {'auth', 'db', 'serialize', 'render', 'queries', 'total'})
+        self.assertEqual(metrics['queries'], f'desc="{len(queries)} queries"')
+        self.assertTrue(metrics['render'].startswith('dur='))
+
+        record, = logs.records
+        self.assertIn('path=/books/ status=200', record.getMessage())
+        self.assertEqual(record.server_timing['queries'], len(queries))
+        self.assertGreater(record.server_timing['total_ms'], record.server_timing['serialize_ms'])
+
+    def test_fast_list_serialization_is_timed(self):
+        self.create_books(3)
+        with override_settings(LIBRARY_FAST_LIST_SERIALIZATION=True):
+            response = self.client.get(reverse('book-list'))
+
+        self.assertIn('serialize', self.metrics(response))
+
+    async def test_asgi_requests_report_their_timings(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(iscoroutinefunction(ServerTimingMiddleware(get_response)))
+
+        with self.assertLogs('library_manager.server_timing', 'INFO') as logs:
+            response = await self.async_client.get(
+                reverse('async-author-list'),
+                headers={'authorization': self.client._credentials['HTTP_AUTHORIZATION']}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('auth', self.metrics(response))
+        record, = logs.records
+        self.assertGreater(record.server_timing['queries'], 0)
+
+    def test_disabled_by_default(self):
+        with override_settings(SERVER_TIMING=False):
+            client = self.client_class()
+            client.credentials(**self.client._credentials)
+            response = client.get(reverse('book-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', response)
+
+
+# increments the request counter of a worker and prints the metrics of all
+METRICS_WORKER = """
+import django
+django.setup()
+from django.test import RequestFactory
+from library_manager import metrics
+metrics.REQUESTS.labels('book-list', 'GET', '200').inc()
+print(metrics.metrics_view(RequestFactory().get('/metrics')).content.decode())
+"""
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsTestCase(AuthenticatedAPITestCase):
+    """
+    Test module for the Prometheus metrics of the requests
+    """
+    def sample(self, name, **labels):
+        from prometheus_client import REGISTRY
+
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_recorded_by_view(self):
+        self.create_books(2)
+        labels = {'view': 'book-list', 'method': 'GET'}
+        requests = self.sample('library_requests_total', status='200', **labels)
+        queries = self.sample('library_db_queries_total', view='book-list')
+        hits = self.sample('library_cache_lookups_total', cache='access_token', result='hit')
+
+        self.client.get(reverse('book-list'))
+        self.client.get(reverse('book-list'))
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'library_request_duration_seconds_bucket{', response.content)
+        self.assertEqual(self.sample('library_requests_total', status='200', **labels), requests + 2)
+        self.assertGreater(self.sample('library_request_duration_seconds_count', **labels), 0)
+        self.assertGreater(self.sample('library_db_queries_total', view='book-list'), queries)
+        self.assertGreater(self.sample('library_cache_lookups_total', cache='access_token', result='hit'), hits)
+        self.assertEqual(self.sample('library_requests_in_progress'), 0)
+
+    async def test_asgi_requests_are_recorded_without_thread_switch(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(iscoroutinefunction(MetricsMiddleware(get_response)))
+
+        labels = {'view': 'async-author-list', 'method': 'GET', 'status': '200'}
+        requests = self.sample('library_requests_total', **labels)
+        queries = self.sample('library_db_queries_total', view='async-author-list')
+        response = await self.async_client.get(
+            reverse('async-author-list'),
+            headers={'authorization': self.client._credentials['HTTP_AUTHORIZATION']}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.sample('library_requests_total', **labels), requests + 1)
+        self.assertGreater(self.sample('library_db_queries_total', view='async-author-list'), queries)
+
+    def test_metrics_endpoint_is_not_found_when_disabled(self):
+        with override_settings(METRICS_ENABLED=False):
+            response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'], METRICS_TOKEN='scraper')
+    def test_metrics_endpoint_is_restricted(self):
+        url = reverse('metrics')
+        response = self.client.get(url, REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.get(url, REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer scraper')
+        response = self.client.get(url, REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer other')
+        response = self.client.get(url, REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_are_added_up_across_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            environment = {
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': 'library_manager.settings',
+                'METRICS': 'True',
+                'PROMETHEUS_MULTIPROC_DIR': directory,
+            }
+            for _ in range(2):
+                result = subprocess.run(
+                    [sys.executable, '-c', METRICS_WORKER],
+                    env=environment,
+                    cwd=settings.BASE_DIR,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+
+        self.assertIn(
+            'library_requests_total{method="GET",status="200",view="book-list"} 2.0',
+            result.stdout
+        )
@@ -8,16 +8,37 @@ time taken: 1 minute
 from django.urls import path
 
 from library.views import (AuthorList, AuthorDetail, BookList, BookDetail,
-                    CustomerList, CustomerDetail, BookLendingList, BookLendingDetail)
+                    CustomerList, CustomerDetail, BookLendingList, BookLendingDetail,
+                    BookLendingExport, BookLendingBatch, AuthorBulkCreate, BookBulkCreate,
+                    CustomerBulkCreate, BookLendingStatistics, OverdueBookLendingList)
+from library.async_views import (AsyncAuthorList, AsyncAuthorDetail, AsyncBookList,
+                    AsyncBookDetail, AsyncCustomerList, AsyncCustomerDetail,
+                    AsyncBookLendingList, AsyncBookLendingDetail)
 
 
 urlpatterns = [
     path('authors/', AuthorList.as_view(), name='author-list'),
     path('authors/<int:pk>/', AuthorDetail.as_view(), name='author-detail'),
+    path('authors/bulk/', AuthorBulkCreate.as_view(), name='author-bulk'),
     path('books/', BookList.as_view(), name='book-list'),
     path('books/<int:pk>/', BookDetail.as_view(), name='book-detail'),
+    path('books/bulk/', BookBulkCreate.as_view(), name='book-bulk'),
     path('customers/', CustomerList.as_view(), name='customer-list'), 
     path('customers/<int:pk>/', CustomerDetail.as_view(), name='customer-detail'),
+    path('customers/bulk/', CustomerBulkCreate.as_view(), name='customer-bulk'),
     path('lendings/', BookLendingList.as_view(), name='lending-list'),
-    path('lendings/<int:pk>/', BookLendingDetail.as_view(), name='lending-detail')
+    path('lendings/<int:pk>/', BookLendingDetail.as_view(), name='lending-detail'),
+    path('lendings/export/', BookLendingExport.as_view(), name='lending-export'),
+    path('lendings/batch/', BookLendingBatch.as_view(), name='lending-batch'),
+    path('lendings/overdue/', OverdueBookLendingList.as_view(), name='lending-overdue'),
+    path('lendings/statistics/', BookLendingStatistics.as_view(), name='lending-statistics'),
+    # read only endpoints served with the async ORM, meant for the ASGI server
+    path('async/authors/', AsyncAuthorList.as_view(), name='async-author-list'),
+    path('async/authors/<int:pk>/', AsyncAuthorDetail.as_view(), name='async-author-detail'),
+    path('async/books/', AsyncBookList.as_view(), name='async-book-list'),
+    path('async/books/<int:pk>/', AsyncBookDetail.as_view(), name='async-book-detail'),
+    path('async/customers/', AsyncCustomerList.as_view(), name='async-customer-list'),
+    path('async/customers/<int:pk>/', AsyncCustomerDetail.as_view(), name='async-customer-detail'),
+    path('async/lendings/', AsyncBookLendingList.as_view(), name='async-lending-list'),
+    path('async/lendings/<int:pk>/', AsyncBookLendingDetail.as_view(), name='async-lending-detail'),
 ]
@@ -5,35 +5,95 @@ github: @thriskel
 time taken: 1 hour
 """
 
+import csv
+from contextlib import contextmanager
 from datetime import date
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 
 from oauth2_provider.contrib.rest_framework import TokenHasReadWriteScope
 
 from rest_framework import generics, permissions, status
 from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from library.models import Author, Book, Customer, BookLending
+from library.filters import (BookFilterSerializer, BookLendingFilterSerializer,
+                             IndexedOrderingFilter, LendingStatisticFilterSerializer,
+                             QueryParameterFilter)
+from library.mixins import ConditionalDetailMixin, ConditionalListMixin, FastListMixin
+from library.models import Author, Book, Customer, BookLending, LendingStatistic
+from library.pagination import OverduePagination
+from library.parsers import NDJSONParser
+from library.search import search
 from library.serializers import (AuthorSerializer, BookSerializer,
-                                  CustomerSerializer, BookLendingSerializer)
+                                  CustomerSerializer, BookLendingSerializer,
+                                  BookLendingExportSerializer, BulkCreateListSerializer,
+                                  BookLendingOperationSerializer, LendingStatisticsSerializer,
+                                  OverdueBookLendingSerializer, OverdueReportSerializer)
 
 
-class AuthorList(generics.ListCreateAPIView):
+BOOK_BORROWED_ERROR = 'This book is currently borrowed by a customer'
+SINGLE_OPEN_LENDING_CONSTRAINT = 'library_booklending_single_open_per_book'
+
+search_parameter = openapi.Parameter(
+    'q',
+    openapi.IN_QUERY,
+    description='Search terms, results are ranked by relevance',
+    type=openapi.TYPE_STRING
+)
+
+
+@contextmanager
+def book_borrowed_on_conflict():
+    """
+    Turns a violation of the single open lending per book constraint, that
+    happens when the same book is lent concurrently, into the validation
+    error returned for borrowed books. Any other integrity error is raised
+    as it is
+    """
+    try:
+        yield
+    except IntegrityError as exc:
+        diag = getattr(exc.__cause__, 'diag', None)
+        if getattr(diag, 'constraint_name', None) != SINGLE_OPEN_LENDING_CONSTRAINT:
+            raise
+        raise ValidationError(BOOK_BORROWED_ERROR)
+
+
+class AuthorList(FastListMixin, ConditionalListMixin, generics.ListCreateAPIView):
     """
     API view for listing and creating authors
     """
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
+    # queries of a request per method, the benchmark tests fail above them
+    query_budgets = {'GET': 1, 'POST': 1}
     permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
 
+    def get_queryset(self):
+        """
+        Overriding the get_queryset method to search by name and surname
+        """
+        queryset = super().get_queryset()
+        terms = self.request.query_params.get('q')
+        if terms:
+            queryset = search(queryset, terms, ['name', 'surname'])
+
+        return queryset
+
     @swagger_auto_schema(
         operation_description="List of authors",
+        manual_parameters=[search_parameter],
         responses={
             200: openapi.Response(
                 description="List of authors",
@@ -50,12 +110,13 @@ class AuthorList(generics.ListCreateAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class AuthorDetail(generics.RetrieveUpdateDestroyAPIView):
+class AuthorDetail(ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API view for retrieving, updating and deleting authors
     """
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
+    query_budgets = {'GET': 1, 'PATCH': 4, 'DELETE': 4}
     permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
 
     def destroy(self, request, *args, **kwargs):
@@ -64,9 +125,8 @@ class AuthorDetail(generics.RetrieveUpdateDestroyAPIView):
         """
         instance = self.get_object()
 
-        author_books_borrowed = BookLending.objects.filter(
-            book__author=instance,
-            return_date=None
+        author_books_borrowed = BookLending.objects.open().filter(
+            book__author=instance
         )
 
         if author_books_borrowed:
@@ -162,12 +222,13 @@ class AuthorDetail(generics.RetrieveUpdateDestroyAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class CustomerList(generics.ListCreateAPIView):
+class CustomerList(FastListMixin, ConditionalListMixin, generics.ListCreateAPIView):
     """
     API view for listing and creating customers
     """
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
+    query_budgets = {'GET': 1, 'POST': 1}
     permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
 
     @swagger_auto_schema(
@@ -188,12 +249,13 @@ class CustomerList(generics.ListCreateAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class CustomerDetail(generics.RetrieveUpdateDestroyAPIView):
+class CustomerDetail(ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API view for retrieving, updating and deleting customers
     """
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
+    query_budgets = {'GET': 1, 'PATCH': 4, 'DELETE': 4}
     permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
 
     def destroy(self, request, *args, **kwargs):
@@ -202,9 +264,7 @@ class CustomerDetail(generics.RetrieveUpdateDestroyAPIView):
         """
         instance = self.get_object()
 
-        customer_books_borrowed = instance.booklending_set.filter(
-            return_date=None
-        )
+        customer_books_borrowed = instance.booklending_set.open()
 
         if customer_books_borrowed:
             partial = kwargs.pop('partial', False)
@@ -299,16 +359,34 @@ class CustomerDetail(generics.RetrieveUpdateDestroyAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class BookList(generics.ListCreateAPIView):
+class BookList(FastListMixin, ConditionalListMixin, generics.ListCreateAPIView):
     """
     API view for listing and creating books
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    query_budgets = {'GET': 1, 'POST': 3}
     permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
+    filter_backends = [QueryParameterFilter, IndexedOrderingFilter]
+    filter_serializer_class = BookFilterSerializer
+    # every ordering must be served by an index of the book model
+    ordering_fields = ('id', 'published_date')
+    ordering = ('id',)
+
+    def get_queryset(self):
+        """
+        Overriding the get_queryset method to search by title
+        """
+        queryset = super().get_queryset()
+        terms = self.request.query_params.get('q')
+        if terms:
+            queryset = search(queryset, terms, ['title'])
+
+        return queryset
 
     @swagger_auto_schema(
         operation_description="List of books",
+        manual_parameters=[search_parameter],
         responses={
             200: openapi.Response(
                 description="List of books",
@@ -325,12 +403,13 @@ class BookList(generics.ListCreateAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class BookDetail(generics.RetrieveUpdateDestroyAPIView):
+class BookDetail(ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API view for retrieving, updating and deleting books
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    query_budgets = {'GET': 1, 'PATCH': 4, 'DELETE': 3}
     permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
 
     def destroy(self, request, *args, **kwargs):
@@ -343,7 +422,7 @@ class BookDetail(generics.RetrieveUpdateDestroyAPIView):
             partial = kwargs.pop('partial', False)
             serializer = self.get_serializer(instance, data=request.data, partial=partial)
             serializer.is_valid(raise_exception=True)
-            raise ValidationError('This book is currently borrowed by a customer')
+            raise ValidationError(BOOK_BORROWED_ERROR)
 
         super().destroy(request, *args, **kwargs)
 
@@ -432,13 +511,48 @@ class BookDetail(generics.RetrieveUpdateDestroyAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class BookLendingList(generics.ListAPIView):
+class BookLendingList(FastListMixin, ConditionalListMixin, generics.ListCreateAPIView):
     """
-    API view for listing book lendings
+    API view for listing and creating book lendings
     """
     queryset = BookLending.objects.all()
     serializer_class = BookLendingSerializer
+    query_budgets = {'GET': 1, 'POST': 6}
     permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
+    filter_backends = [QueryParameterFilter, IndexedOrderingFilter]
+    filter_serializer_class = BookLendingFilterSerializer
+    # every ordering must be served by an index of the book lending model
+    ordering_fields = ('id', 'lending_date')
+    ordering = ('id',)
+
+    def create(self, request, *args, **kwargs):
+        """
+        Overriding the create method to make validations
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lending_date = serializer.validated_data['lending_date']
+        return_date = serializer.validated_data.get('return_date')
+        error_text = ''
+
+        if return_date:
+            if return_date > date.today():
+                error_text = 'Return date must be less than today'
+            elif return_date < lending_date:
+                error_text = 'Return date must be greater than lending date'
+        elif not serializer.validated_data['book'].is_available():
+            error_text = BOOK_BORROWED_ERROR
+
+        if error_text:
+            raise ValidationError(error_text)
+
+        # the database rejects a second open lending of a book lent meanwhile
+        with book_borrowed_on_conflict():
+            self.perform_create(serializer)
+
+        headers = self.get_success_headers(serializer.data)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     @swagger_auto_schema(
         operation_description="List of book lendings",
@@ -457,66 +571,58 @@ class BookLendingList(generics.ListAPIView):
         """
         return super().get(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        operation_description="Create a book lending",
+        responses={
+            201: openapi.Response(
+                description="Create a book lending",
+                schema=BookLendingSerializer()
+            ),
+            400: "Bad request",
+            401: "Unauthorized"
+        },
+    )
+    def post(self, request, *args, **kwargs):
+        """
+        Overriding the post method to add swagger documentation
+        """
+        return super().post(request, *args, **kwargs)
+
 
-class BookLendingDetail(generics.RetrieveUpdateDestroyAPIView):
+class BookLendingDetail(ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API view for retrieving, updating and deleting book lendings
     """
     queryset = BookLending.objects.all()
     serializer_class = BookLendingSerializer
+    query_budgets = {'GET': 1, 'PATCH': 7, 'DELETE': 5}
     permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
 
-    def create(self, request, *args, **kwargs):
-        """
-        Overriding the perform_update method to make validations
-        """
-        book = request.data['book']
-        lending_date = request.data['lending_date']
-        return_date = request.data['return_date']
-        error_text = ''
-
-        if return_date:
-            if return_date > date.today():
-                error_text = 'Return date must be less than today'
-            elif return_date < lending_date:
-                error_text = 'Return date must be greater than lending date'
-        elif not book.is_available():
-            error_text = 'This book is currently borrowed by a customer'
-
-        if error_text:
-            partial = kwargs.pop('partial', False)
-            serializer = self.get_serializer(data=request.data, partial=partial)
-            serializer.is_valid(raise_exception=True)
-            raise ValidationError(error_text)
-
-        super().update(request, *args, **kwargs)
-
-        return Response(status=status.HTTP_200_OK)
-
     def update(self, request, *args, **kwargs):
         """
         Overriding the perform_update method to make validations
         """
-        instance = self.get_object()
-        lending_date = instance.lending_date
-        return_date = instance.return_date
-        error_text = ''
-
-        if return_date:
-            if return_date < lending_date:
-                error_text = 'Return date must be greater than lending date'
-            if return_date > date.today():
-                error_text = 'Return date must be less than today'
-
-        if error_text:
-            partial = kwargs.pop('partial', False)
-            serializer = self.get_serializer(instance, data=request.data, partial=partial)
-            serializer.is_valid(raise_exception=True)
-            raise ValidationError(error_text)
-
-        super().update(request, *args, **kwargs)
-
-        return Response(status=status.HTTP_200_OK)
+        # the lending is locked before it is validated, the response of a
+        # failed If-Match precondition is passed through
+        with book_borrowed_on_conflict(), self.locked_object():
+            instance = self.get_object()
+            lending_date = instance.lending_date
+            return_date = instance.return_date
+            error_text = ''
+
+            if return_date:
+                if return_date < lending_date:
+                    error_text = 'Return date must be greater than lending date'
+                if return_date > date.today():
+                    error_text = 'Return date must be less than today'
+
+            if error_text:
+                partial = kwargs.pop('partial', False)
+                serializer = self.get_serializer(instance, data=request.data, partial=partial)
+                serializer.is_valid(raise_exception=True)
+                raise ValidationError(error_text)
+
+            return super().update(request, *args, **kwargs)
 
     def destroy(self, request, *args, **kwargs):
         """
@@ -599,19 +705,486 @@ class BookLendingDetail(generics.RetrieveUpdateDestroyAPIView):
         """
         return super().delete(request, *args, **kwargs)
 
+
+class EchoBuffer:
+    """
+    File-like object that returns what is written to it, so csv.writer
+    can produce rows for a streaming response without buffering them
+    """
+    def write(self, value):
+        return value
+
+
+class BookLendingExport(generics.GenericAPIView):
+    """
+    API view for streaming every book lending as NDJSON or CSV
+    """
+    queryset = BookLending.objects.all()
+    serializer_class = BookLendingExportSerializer
+    query_budgets = {'GET': 1}
+    permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
+    pagination_class = None
+
+    content_types = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+
+    def get_export_fields(self):
+        """
+        Returns the (column, output name) pairs of the exported rows
+        """
+        return [
+            (field.attname, field.name)
+            for field in BookLending._meta.concrete_fields
+        ]
+
+    def get_rows(self, params):
+        """
+        Returns an iterator over the filtered lendings as tuples, fetched
+        in chunks through a server-side cursor
+        """
+        queryset = self.get_queryset()
+        if 'lending_date_after' in params:
+            queryset = queryset.filter(lending_date__gte=params['lending_date_after'])
+        if 'lending_date_before' in params:
+            queryset = queryset.filter(lending_date__lte=params['lending_date_before'])
+
+        columns = [column for column, _ in self.get_export_fields()]
+
+        return queryset.order_by('id').values_list(*columns).iterator(
+            chunk_size=settings.LIBRARY_EXPORT_CHUNK_SIZE
+        )
+
+    def stream_ndjson(self, rows, names):
+        encoder = DjangoJSONEncoder(separators=(',', ':'))
+        chunk = []
+        for row in rows:
+            chunk.append(encoder.encode(dict(zip(names, row))))
+            if len(chunk) == settings.LIBRARY_EXPORT_CHUNK_SIZE:
+                yield '\n'.join(chunk) + '\n'
+                chunk = []
+        if chunk:
+            yield '\n'.join(chunk) + '\n'
+
+    def stream_csv(self, rows, names):
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(names)
+        chunk = []
+        for row in rows:
+            chunk.append(writer.writerow(row))
+            if len(chunk) == settings.LIBRARY_EXPORT_CHUNK_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
     @swagger_auto_schema(
-        operation_description="Create a book lending",
+        operation_description="Export of book lendings as NDJSON or CSV",
+        query_serializer=BookLendingExportSerializer(),
         responses={
-            201: openapi.Response(
-                description="Create a book lending",
-                schema=BookLendingSerializer()
-            ),
+            200: "Stream of book lendings",
+            400: "Bad request",
+            401: "Unauthorized"
+        },
+        tags=['book lendings']
+    )
+    def get(self, request, *args, **kwargs):
+        """
+        Streams the lendings, memory usage does not depend on their number
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        export_format = params['export_format']
+
+        names = [name for _, name in self.get_export_fields()]
+        rows = self.get_rows(params)
+        if export_format == 'csv':
+            content = self.stream_csv(rows, names)
+        else:
+            content = self.stream_ndjson(rows, names)
+
+        response = StreamingHttpResponse(
+            content,
+            content_type=self.content_types[export_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="lendings.{export_format}"'
+
+        return response
+
+
+class BookLendingStatistics(generics.GenericAPIView):
+    """
+    API view for the lending statistics per category, author and month
+    """
+    queryset = LendingStatistic.objects.all()
+    serializer_class = LendingStatisticsSerializer
+    query_budgets = {'GET': 4}
+    permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
+    filter_backends = [QueryParameterFilter]
+    filter_serializer_class = LendingStatisticFilterSerializer
+    pagination_class = None
+
+    @swagger_auto_schema(
+        operation_description="Lendings, open lendings and average loan days in total, "
+                              "per category, per author and per month",
+        responses={
+            200: LendingStatisticsSerializer(),
             400: "Bad request",
             401: "Unauthorized"
         },
+        tags=['book lendings']
+    )
+    def get(self, request, *args, **kwargs):
+        """
+        Reads the statistics kept up to date by the lendings, never the
+        lendings themselves
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        totals, = queryset.summarize()
+        serializer = self.get_serializer({
+            **totals,
+            'by_category': queryset.summarize('category'),
+            'by_author': queryset.summarize('author'),
+            'by_month': queryset.summarize('month'),
+        })
+
+        return Response(serializer.data)
+
+
+class OverdueBookLendingList(generics.ListAPIView):
+    """
+    API view for listing the lendings not returned by their due date
+    """
+    queryset = BookLending.objects.all()
+    serializer_class = OverdueBookLendingSerializer
+    query_budgets = {'GET': 1}
+    permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
+    pagination_class = OverduePagination
+
+    def get_report_params(self):
+        if not hasattr(self, '_report_params'):
+            serializer = OverdueReportSerializer(data=self.request.query_params)
+            serializer.is_valid(raise_exception=True)
+            self._report_params = serializer.validated_data
+
+        return self._report_params
+
+    def get_as_of(self):
+        return self.get_report_params().get('as_of') or date.today()
+
+    def get_queryset(self):
+        """
+        Overdue lendings with their book and customer joined, in the order
+        of the overdue index
+        """
+        queryset = super().get_queryset().overdue(self.get_as_of())
+        customer = self.get_report_params().get('customer')
+        if customer is not None:
+            queryset = queryset.filter(customer_id=customer)
+
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['as_of'] = self.get_as_of()
+        return context
+
+    @swagger_auto_schema(
+        operation_description="Lendings not returned by their due date, the most overdue first",
+        query_serializer=OverdueReportSerializer(),
+        responses={
+            200: OverdueBookLendingSerializer(many=True),
+            400: "Bad request",
+            401: "Unauthorized"
+        },
+        tags=['book lendings']
+    )
+    def get(self, request, *args, **kwargs):
+        """
+        Overriding the get method to add swagger documentation
+        """
+        return super().get(request, *args, **kwargs)
+
+
+class BulkCreateAPIView(generics.GenericAPIView):
+    """
+    Base API view for creating many objects of a model in one request.
+
+    Accepts a JSON array or a NDJSON body, validates every item and creates
+    all of them in one transaction or none if any item is invalid.
+    """
+    parser_classes = [JSONParser, NDJSONParser]
+    permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
+
+    def get_serializer(self, *args, **kwargs):
+        """
+        Returns a bulk list serializer with the view serializer as child
+        """
+        child = self.get_serializer_class()(context=self.get_serializer_context())
+
+        return BulkCreateListSerializer(
+            *args,
+            child=child,
+            max_length=settings.LIBRARY_BULK_MAX_ITEMS,
+            allow_empty=False,
+            **kwargs
+        )
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, list):
+                errors = {
+                    'errors': [
+                        {'index': index, 'errors': item_errors}
+                        for index, item_errors in enumerate(errors)
+                        if item_errors
+                    ]
+                }
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        created = serializer.save()
+
+        return Response(
+            {'created': len(created), 'ids': [obj.pk for obj in created]},
+            status=status.HTTP_201_CREATED
+        )
+
+    def post(self, request, *args, **kwargs):
+        return self.create(request, *args, **kwargs)
+
+
+class AuthorBulkCreate(BulkCreateAPIView):
+    """
+    API view for creating many authors
+    """
+    queryset = Author.objects.all()
+    serializer_class = AuthorSerializer
+    query_budgets = {'POST': 3}
+
+    @swagger_auto_schema(
+        operation_description="Create many authors from a JSON array or NDJSON",
+        request_body=AuthorSerializer(many=True),
+        responses={
+            201: "Number and ids of the created authors",
+            400: "Bad request, with the errors of every invalid item",
+            401: "Unauthorized"
+        },
+        tags=['authors']
+    )
+    def post(self, request, *args, **kwargs):
+        """
+        Overriding the post method to add swagger documentation
+        """
+        return super().post(request, *args, **kwargs)
+
+
+class BookBulkCreate(BulkCreateAPIView):
+    """
+    API view for creating many books
+    """
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    query_budgets = {'POST': 5}
+
+    @swagger_auto_schema(
+        operation_description="Create many books from a JSON array or NDJSON",
+        request_body=BookSerializer(many=True),
+        responses={
+            201: "Number and ids of the created books",
+            400: "Bad request, with the errors of every invalid item",
+            401: "Unauthorized"
+        },
+        tags=['books']
+    )
+    def post(self, request, *args, **kwargs):
+        """
+        Overriding the post method to add swagger documentation
+        """
+        return super().post(request, *args, **kwargs)
+
+
+class CustomerBulkCreate(BulkCreateAPIView):
+    """
+    API view for creating many customers
+    """
+    queryset = Customer.objects.all()
+    serializer_class = CustomerSerializer
+    query_budgets = {'POST': 3}
+
+    @swagger_auto_schema(
+        operation_description="Create many customers from a JSON array or NDJSON",
+        request_body=CustomerSerializer(many=True),
+        responses={
+            201: "Number and ids of the created customers",
+            400: "Bad request, with the errors of every invalid item",
+            401: "Unauthorized"
+        },
+        tags=['customers']
     )
     def post(self, request, *args, **kwargs):
         """
         Overriding the post method to add swagger documentation
         """
         return super().post(request, *args, **kwargs)
+
+
+class BookLendingBatch(generics.GenericAPIView):
+    """
+    API view for applying many checkouts and returns in one request.
+
+    The books of the batch are locked with a single SELECT ... FOR UPDATE,
+    the operations are checked in memory in the order they were sent and
+    the valid ones are written with bulk updates and inserts.
+    """
+    queryset = BookLending.objects.all()
+    serializer_class = BookLendingOperationSerializer
+    query_budgets = {'POST': 8}
+    permission_classes = [permissions.IsAuthenticated, TokenHasReadWriteScope]
+
+    def validate_operations(self, data):
+        """
+        Returns the validated operations and the errors of the invalid
+        ones, both as lists indexed like data
+        """
+        if not isinstance(data, list):
+            raise ValidationError('Expected a list of lending operations')
+        if len(data) > settings.LIBRARY_BULK_MAX_ITEMS:
+            raise ValidationError(
+                f'Ensure there are no more than {settings.LIBRARY_BULK_MAX_ITEMS} operations'
+            )
+
+        serializer = self.get_serializer()
+        operations = []
+        errors = []
+        for item in data:
+            try:
+                operations.append(serializer.run_validation(item))
+                errors.append(None)
+            except ValidationError as exc:
+                operations.append(None)
+                errors.append(exc.detail)
+
+        return operations, errors
+
+    def apply_operations(self, operations, errors):
+        """
+        Checks the operations against the locked books and writes the valid
+        ones, returns the lending of every operation indexed like operations
+        """
+        today = date.today()
+        now = timezone.now()
+        book_ids = {operation['book'] for operation in operations if operation}
+        customer_ids = {
+            operation['customer'] for operation in operations
+            if operation and operation['action'] == BookLendingOperationSerializer.CHECKOUT
+        }
+
+        books = {
+            book.pk: book for book in
+            Book.objects.select_for_update().filter(pk__in=book_ids).order_by('pk')
+        }
+        customer_ids = set(
+            Customer.objects.filter(pk__in=customer_ids).values_list('pk', flat=True)
+        )
+        open_lendings = {
+            lending.book_id: lending for lending in
+            BookLending.objects.open().filter(book_id__in=books)
+        }
+
+        lendings = [None] * len(operations)
+        returned = {}
+        created = []
+
+        for index, operation in enumerate(operations):
+            if operation is None:
+                continue
+
+            book_id = operation['book']
+            if book_id not in books:
+                errors[index] = {'book': f'Book {book_id} does not exist'}
+                continue
+
+            if operation['action'] == BookLendingOperationSerializer.CHECKOUT:
+                lending_date = operation.get('lending_date', today)
+                if operation['customer'] not in customer_ids:
+                    errors[index] = {'customer': f'Customer {operation["customer"]} does not exist'}
+                elif book_id in open_lendings:
+                    errors[index] = BOOK_BORROWED_ERROR
+                elif lending_date > today:
+                    errors[index] = 'Lending date must be less than today'
+                else:
+                    lending = BookLending(
+                        book_id=book_id,
+                        customer_id=operation['customer'],
+                        lending_date=lending_date
+                    )
+                    lending.set_due_date()
+                    open_lendings[book_id] = lending
+                    created.append(lending)
+                    lendings[index] = lending
+            else:
+                return_date = operation.get('return_date', today)
+                lending = open_lendings.get(book_id)
+                if lending is None:
+                    errors[index] = 'This book is not currently borrowed'
+                elif return_date > today:
+                    errors[index] = 'Return date must be less than today'
+                elif return_date < lending.lending_date:
+                    errors[index] = 'Return date must be greater than lending date'
+                else:
+                    lending.return_date = return_date
+                    lending.updated_at = now
+                    del open_lendings[book_id]
+                    if lending.pk is not None:
+                        returned[lending.pk] = lending
+                    lendings[index] = lending
+
+        # returns go first so the books are free again for the new lendings
+        BookLending.objects.bulk_update(
+            returned.values(),
+            ['return_date', 'updated_at'],
+            batch_size=settings.LIBRARY_BULK_BATCH_SIZE
+        )
+        BookLending.objects.bulk_create(
+            created,
+            batch_size=settings.LIBRARY_BULK_BATCH_SIZE
+        )
+        Book.objects.filter(pk__in=books).sync_lent_state()
+
+        return lendings
+
+    @swagger_auto_schema(
+        operation_description="Apply many book checkouts and returns",
+        request_body=BookLendingOperationSerializer(many=True),
+        responses={
+            200: "Result of every operation, in the order they were sent",
+            400: "Bad request",
+            401: "Unauthorized"
+        },
+        tags=['book lendings']
+    )
+    def post(self, request, *args, **kwargs):
+        """
+        Applies the valid operations and reports the result of each one
+        """
+        operations, errors = self.validate_operations(request.data)
+
+        # a checkout of the batch may race with a lending created by the
+        # single lending endpoint, which does not lock the books
+        with book_borrowed_on_conflict(), transaction.atomic():
+            lendings = self.apply_operations(operations, errors)
+
+        results = []
+        for index, (lending, error) in enumerate(zip(lendings, errors)):
+            if error is not None:
+                results.append({'index': index, 'status': 'error', 'errors': error})
+            else:
+                results.append({'index': index, 'status': 'ok', 'lending': lending.pk})
+
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 3 horas
+
+Routing of the reads to the read replicas listed in DATABASE_REPLICAS. Only
+the queries run while replica_reads is set, by ReplicaRoutingMiddleware for
+the safe requests of the library views, go to a replica, everything else
+uses the primary.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, Error, connections
+
+logger = logging.getLogger(__name__)
+
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def use_primary():
+    """
+    Runs the reads of the block on the primary, for the rows that must be
+    current like the access token of the request
+    """
+    token = replica_reads.set(False)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+# seconds the replica has not replayed the last transaction it received,
+# NULL on a server that is not a replica
+REPLICATION_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class ReplicaHealthCheck:
+    """
+    Checks every DATABASE_REPLICA_HEALTH_CHECK_INTERVAL seconds that a
+    replica accepts queries and lags less than DATABASE_REPLICA_MAX_LAG
+    seconds behind the primary, the threads asking in between get the last
+    result
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def is_healthy(self, alias):
+        healthy, checked_at = self.results.get(alias, (None, None))
+        now = time.monotonic()
+        if checked_at is not None and now - checked_at < settings.DATABASE_REPLICA_HEALTH_CHECK_INTERVAL:
+            return healthy
+
+        # a single thread checks, the rest keep using the last result
+        if not self.lock.acquire(blocking=healthy is None):
+            return healthy
+        try:
+            previous = self.results.get(alias, (None, None))[0]
+            healthy = self.check(alias)
+            if healthy != previous and (previous is not None or not healthy):
+                logger.warning('Replica %s is %s', alias, 'healthy' if healthy else 'unhealthy')
+            self.results[alias] = (healthy, time.monotonic())
+        finally:
+            self.lock.release()
+
+        return healthy
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            if connection.vendor != 'postgresql':
+                return True
+            with connection.cursor() as cursor:
+                cursor.execute(REPLICATION_LAG_SQL)
+                lag = cursor.fetchone()[0]
+        except Error:
+            logger.exception('Health check of replica %s failed', alias)
+            connection.close()
+            return False
+
+        return lag is None or lag <= settings.DATABASE_REPLICA_MAX_LAG
+
+    def reset(self, **kwargs):
+        self.results.clear()
+
+
+replica_health = ReplicaHealthCheck()
+
+
+class ReplicaRouter:
+    """
+    Sends the reads allowed by replica_reads to a random healthy replica, and
+    to the primary when none is healthy
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get():
+            return DEFAULT_DB_ALIAS
+
+        healthy = [alias for alias in settings.DATABASE_REPLICAS if replica_health.is_healthy(alias)]
+        if not healthy:
+            return DEFAULT_DB_ALIAS
+
+        return random.choice(healthy)
+
+    def db_for_write(self, model, **hints):
+        # also for the instances read from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 2 horas
+
+Prometheus metrics of the requests, recorded by MetricsMiddleware when
+METRICS_ENABLED and served by metrics_view. When the gunicorn workers run
+with PROMETHEUS_MULTIPROC_DIR set, every worker writes its metrics to files
+in that directory and the endpoint adds up the ones of all the workers.
+Only the addresses of METRICS_ALLOWED_IPS and the requests bearing
+METRICS_TOKEN can read them.
+"""
+
+import ipaddress
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+# seconds, from the cached detail requests to the exports
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = prometheus_client.Histogram(
+        'library_request_duration_seconds',
+        'Latency of the requests by URL name and method',
+        ['view', 'method'],
+        buckets=LATENCY_BUCKETS,
+    )
+    REQUESTS = prometheus_client.Counter(
+        'library_requests',
+        'Requests by URL name, method and status code',
+        ['view', 'method', 'status'],
+    )
+    # the gauges of the workers that exited are dropped by the child_exit
+    # hook of gunicorn.conf.py
+    REQUESTS_IN_PROGRESS = prometheus_client.Gauge(
+        'library_requests_in_progress',
+        'Requests being served',
+        multiprocess_mode='livesum',
+    )
+    DB_QUERIES = prometheus_client.Counter(
+        'library_db_queries',
+        'SQL queries run by the requests, by URL name',
+        ['view'],
+    )
+    DB_QUERY_SECONDS = prometheus_client.Counter(
+        'library_db_query_seconds',
+        'Seconds spent running the SQL queries of the requests, by URL name',
+        ['view'],
+    )
+    CACHE_LOOKUPS = prometheus_client.Counter(
+        'library_cache_lookups',
+        'Cache lookups by cache and result, hit or miss',
+        ['cache', 'result'],
+    )
+
+
+class QueryCounter:
+    """
+    Execute wrapper counting the queries of a request and their time
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - started
+
+
+def view_name(request):
+    """
+    Returns the URL name of the view that served the request, the label
+    of its metrics
+    """
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched'
+    return match.url_name or 'unnamed'
+
+
+def observe_request(request, response, seconds, queries):
+    view = view_name(request)
+    REQUEST_LATENCY.labels(view, request.method).observe(seconds)
+    REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+    DB_QUERIES.labels(view).inc(queries.queries)
+    DB_QUERY_SECONDS.labels(view).inc(queries.seconds)
+
+
+def record_cache_lookup(cache, hit):
+    """
+    Counts a lookup of cache, does nothing while the metrics are disabled
+    """
+    if settings.METRICS_ENABLED and prometheus_client is not None:
+        CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def can_read_metrics(request):
+    """
+    Returns whether the request comes from an allowed address or bears the
+    metrics token
+    """
+    if settings.METRICS_TOKEN:
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if constant_time_compare(authorization, f'Bearer {settings.METRICS_TOKEN}'):
+            return True
+
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+
+    return any(
+        address in ipaddress.ip_network(network.strip(), strict=False)
+        for network in settings.METRICS_ALLOWED_IPS
+    )
+
+
+def metrics_view(request):
+    """
+    Serves the metrics in the Prometheus text format, added up across the
+    workers in multiprocess mode
+    """
+    if not settings.METRICS_ENABLED or prometheus_client is None:
+        raise Http404
+
+    if not can_read_metrics(request):
+        raise PermissionDenied
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+
+    return HttpResponse(
+        prometheus_client.generate_latest(registry),
+        content_type=prometheus_client.CONTENT_TYPE_LATEST,
+    )
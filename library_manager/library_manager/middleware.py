@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 1 hora
+"""
+
+from contextlib import ExitStack
+import hashlib
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+
+from rest_framework.permissions import SAFE_METHODS
+
+from library_manager import metrics, server_timing
+from library_manager.db_routers import replica_reads
+
+logger = logging.getLogger('library_manager.server_timing')
+
+
+def wrap_queries(stack, wrapper):
+    """
+    Passes the queries of the database connections of the current thread
+    through wrapper until stack is closed. Under ASGI the queries of a
+    request run in its sync thread, so it must be called from there.
+    """
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets the safe requests of the views of DATABASE_REPLICA_APPS read from
+    the replicas. A successful write pins the client to the primary for
+    DATABASE_REPLICA_PIN_SECONDS, so it reads its own writes while the
+    replicas replay them. The client is pinned with a cookie and, since API
+    clients usually drop cookies, with an entry for its Authorization
+    header in the DATABASE_REPLICA_PIN_CACHE cache shared by the workers.
+
+    Not used when no replica is configured. Under ASGI it runs in the event
+    loop, without switching threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = replica_reads.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+
+        if self.pins_to_primary(request, response):
+            self.set_pin_cookie(response)
+            pin_key = self.get_pin_key(request)
+            if pin_key is not None:
+                caches[settings.DATABASE_REPLICA_PIN_CACHE].set(
+                    pin_key, True, settings.DATABASE_REPLICA_PIN_SECONDS
+                )
+
+        return response
+
+    async def __acall__(self, request):
+        token = replica_reads.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+
+        if self.pins_to_primary(request, response):
+            self.set_pin_cookie(response)
+            pin_key = self.get_pin_key(request)
+            if pin_key is not None:
+                await caches[settings.DATABASE_REPLICA_PIN_CACHE].aset(
+                    pin_key, True, settings.DATABASE_REPLICA_PIN_SECONDS
+                )
+
+        return response
+
+    def pins_to_primary(self, request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400
+
+    def set_pin_cookie(self, response):
+        response.set_cookie(
+            settings.DATABASE_REPLICA_PIN_COOKIE,
+            '1',
+            max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite='Lax',
+        )
+
+    def get_pin_key(self, request):
+        """
+        Returns the pin cache key of the credentials of the request, None
+        when it sends none or no pin cache is set
+        """
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization or not settings.DATABASE_REPLICA_PIN_CACHE:
+            return None
+
+        return 'primary_pin:' + hashlib.sha256(authorization.encode()).hexdigest()
+
+    def may_read_from_replica(self, request, view_func):
+        view = getattr(view_func, 'view_class', view_func)
+        return (
+            request.method in SAFE_METHODS
+            and settings.DATABASE_REPLICA_PIN_COOKIE not in request.COOKIES
+            and view.__module__.split('.')[0] in settings.DATABASE_REPLICA_APPS
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.may_read_from_replica(request, view_func):
+            return
+
+        pin_key = self.get_pin_key(request)
+        if pin_key is None or not caches[settings.DATABASE_REPLICA_PIN_CACHE].get(pin_key):
+            replica_reads.set(True)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if not self.may_read_from_replica(request, view_func):
+            return
+
+        pin_key = self.get_pin_key(request)
+        if pin_key is None or not await caches[settings.DATABASE_REPLICA_PIN_CACHE].aget(pin_key):
+            replica_reads.set(True)
+
+
+class ServerTimingMiddleware:
+    """
+    Measures the queries, database time, authentication, serialization and
+    rendering time of every request, and reports them in a Server-Timing
+    header and a log line of the library_manager.server_timing logger.
+
+    Not used unless SERVER_TIMING is set, the measured methods are only
+    wrapped once it is. Under ASGI it runs in the event loop, without
+    switching threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        server_timing.install()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = server_timing.RequestTimings()
+        token = server_timing.request_timings.set(timings)
+        try:
+            with ExitStack() as stack:
+                wrap_queries(stack, timings)
+                response = self.get_response(request)
+        finally:
+            server_timing.request_timings.reset(token)
+
+        return self.report(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = server_timing.RequestTimings()
+        token = server_timing.request_timings.set(timings)
+        stack = ExitStack()
+        try:
+            await sync_to_async(wrap_queries)(stack, timings)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            server_timing.request_timings.reset(token)
+
+        return self.report(request, response, timings)
+
+    def report(self, request, response, timings):
+        total = timings.total()
+        response['Server-Timing'] = timings.as_header(total)
+        measures = timings.as_dict(total)
+        logger.info(
+            'method=%s path=%s status=%s %s',
+            request.method,
+            request.path,
+            response.status_code,
+            ' '.join(f'{name}={value}' for name, value in measures.items()),
+            extra={'server_timing': {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                **measures,
+            }},
+        )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, status code and queries of every request in the
+    Prometheus metrics served at /metrics, labelled with the URL name of
+    the view, and the number of requests in progress.
+
+    Not used unless METRICS_ENABLED is set. Under ASGI it runs in the event
+    loop, without switching threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        if metrics.prometheus_client is None:
+            raise ImproperlyConfigured('METRICS_ENABLED requires prometheus_client to be installed')
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        queries = metrics.QueryCounter()
+        started = time.perf_counter()
+        with metrics.REQUESTS_IN_PROGRESS.track_inprogress(), ExitStack() as stack:
+            wrap_queries(stack, queries)
+            response = self.get_response(request)
+
+        metrics.observe_request(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = metrics.QueryCounter()
+        started = time.perf_counter()
+        stack = ExitStack()
+        with metrics.REQUESTS_IN_PROGRESS.track_inprogress():
+            await sync_to_async(wrap_queries)(stack, queries)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+
+        metrics.observe_request(request, response, time.perf_counter() - started, queries)
+        return response
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 3 horas
+
+PostgreSQL backend whose connections are taken from a pool shared by the
+threads of the process instead of being opened for every request. Enabled
+with DB_DRIVER=library_manager.postgresql_pool, the pool is configured with
+the POOL entry of the database settings:
+
+* MIN_SIZE: idle connections kept open
+* MAX_SIZE: connections open at the same time
+* TIMEOUT: seconds a thread waits for a free connection before failing
+"""
+
+import os
+import threading
+
+import psycopg2
+import psycopg2.extras
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+from django.db.backends.postgresql import base, creation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.utils.asyncio import async_unsafe
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool that waits for a connection to be returned when
+    every connection is in use, instead of failing right away
+    """
+
+    def __init__(self, minconn, maxconn, timeout, *args, **kwargs):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f'No database connection was free after {self.timeout} seconds')
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, pool_settings, conn_params):
+    """
+    Returns the pool of the database alias for this process, forked workers
+    never share the connections of their parent
+    """
+    key = (os.getpid(), alias, conn_params.get('dbname'))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = BlockingConnectionPool(
+                    pool_settings.get('MIN_SIZE', 1),
+                    pool_settings.get('MAX_SIZE', 10),
+                    pool_settings.get('TIMEOUT', 10),
+                    **conn_params
+                )
+    return pool
+
+
+def close_pools():
+    """
+    Closes every connection of the pools of this process
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # the pooled connections would keep the test database in use
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    creation_class = DatabaseCreation
+    connection_pool = None
+
+    def is_pooled_connection_usable(self, connection):
+        """
+        Checks that a connection taken from the pool still works, the server
+        may have closed it while it was idle
+        """
+        if connection.closed:
+            return False
+        if not self.settings_dict['CONN_HEALTH_CHECKS']:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        self.connection_pool = get_pool(self.alias, self.settings_dict.get('POOL', {}), conn_params)
+        connection = self.connection_pool.getconn()
+        if not self.is_pooled_connection_usable(connection):
+            self.connection_pool.putconn(connection, close=True)
+            connection = self.connection_pool.getconn()
+
+        # same connection setup as the postgresql backend
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        if isolation_level is None:
+            self.isolation_level = IsolationLevel.READ_COMMITTED
+        else:
+            self.isolation_level = IsolationLevel(isolation_level)
+            connection.isolation_level = self.isolation_level
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        # the connection goes back to the pool instead of being closed
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.connection_pool.putconn(self.connection, close=bool(self.connection.closed))
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 2 horas
+
+Measures where the time of a request goes, for ServerTimingMiddleware. The
+queries are timed with an execute wrapper, and authentication, serialization
+and rendering by wrapping the DRF methods running them. The wrappers are
+installed by the middleware, so nothing is wrapped while it is disabled.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import time
+
+# the timings of the request being served, None outside of one
+request_timings = ContextVar('request_timings', default=None)
+
+# (name, description) of the measures, in the order they are reported
+MEASURES = (
+    ('auth', 'Authentication'),
+    ('db', 'Database'),
+    ('serialize', 'Serialization'),
+    ('render', 'Rendering'),
+)
+
+
+class RequestTimings:
+    """
+    Seconds spent in every measure of a request and number of queries run.
+    The measures overlap, the queries run while authenticating or
+    serializing also count as database time
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = dict.fromkeys(name for name, _ in MEASURES)
+        self.queries = 0
+        self.active = set()
+
+    def add(self, name, seconds):
+        self.seconds[name] = (self.seconds[name] or 0) + seconds
+
+    @contextmanager
+    def measure(self, name):
+        # a serializer nested in another is part of the outer one's time
+        if name in self.active:
+            yield
+            return
+
+        self.active.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+            self.active.discard(name)
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Execute wrapper timing the queries of the request
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add('db', time.perf_counter() - started)
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def as_header(self, total):
+        """
+        Returns the value of the Server-Timing header, durations in
+        milliseconds as the header expects
+        """
+        metrics = [
+            f'{name};dur={seconds * 1000:.2f};desc="{description}"'
+            for name, description in MEASURES
+            for seconds in (self.seconds[name],) if seconds is not None
+        ]
+        metrics.append(f'queries;desc="{self.queries} queries"')
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(metrics)
+
+    def as_dict(self, total):
+        """
+        Returns the measures in milliseconds, for the log line
+        """
+        measures = {
+            f'{name}_ms': round(seconds * 1000, 2)
+            for name, seconds in self.seconds.items() if seconds is not None
+        }
+        return {'queries': self.queries, **measures, 'total_ms': round(total * 1000, 2)}
+
+
+def timed(name, function):
+    """
+    Wraps function so its calls count towards the name measure of the
+    request being served
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        timings = request_timings.get()
+        if timings is None:
+            return function(*args, **kwargs)
+        with timings.measure(name):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def timed_finalize_response(finalize_response):
+    """
+    Wraps APIView.finalize_response, which picks the renderer of the
+    response, to time the rendering that follows it
+    """
+    @wraps(finalize_response)
+    def wrapper(self, request, response, *args, **kwargs):
+        response = finalize_response(self, request, response, *args, **kwargs)
+        timings = request_timings.get()
+        if timings is not None and hasattr(response, 'add_post_render_callback') and not response.is_rendered:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timings.add('render', time.perf_counter() - started)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    return wrapper
+
+
+_installed = False
+
+
+def install():
+    """
+    Wraps the DRF methods measured, only once per process
+    """
+    global _installed
+    if _installed:
+        return
+
+    from rest_framework.serializers import BaseSerializer
+    from rest_framework.views import APIView
+
+    from library.fast_serializers import ValuesSerializer
+
+    APIView.perform_authentication = timed('auth', APIView.perform_authentication)
+    APIView.finalize_response = timed_finalize_response(APIView.finalize_response)
+    BaseSerializer.data = property(timed('serialize', BaseSerializer.data.fget))
+    ValuesSerializer.to_representation = timed('serialize', ValuesSerializer.to_representation)
+    _installed = True
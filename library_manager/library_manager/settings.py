@@ -42,15 +42,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'oauth2_provider',
     'library_users',
     'library',
+    'benchmark',
     'drf_yasg',
     'braces',
 ]
 
 MIDDLEWARE = [
+    'library_manager.middleware.MetricsMiddleware',
+    'library_manager.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +62,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'library_manager.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'library_manager.urls'
@@ -92,7 +97,77 @@ DATABASES = {
         'NAME': os.environ.get('PG_DB','library_db'),
         'PORT': os.environ.get('PG_PORT','5432'),
         'HOST': os.environ.get('PG_HOST','localhost'),
+        # seconds a connection is kept open between requests, 0 closes it
+        # at the end of every request
+        'CONN_MAX_AGE': int(os.environ.get('PG_CONN_MAX_AGE','60')),
+        # check that a reused connection works before running queries on it
+        'CONN_HEALTH_CHECKS': os.environ.get('PG_CONN_HEALTH_CHECKS','True') == 'True',
+        # only used with DB_DRIVER=library_manager.postgresql_pool
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('PG_POOL_MIN_SIZE','2')),
+            'MAX_SIZE': int(os.environ.get('PG_POOL_MAX_SIZE','4')),
+            'TIMEOUT': int(os.environ.get('PG_POOL_TIMEOUT','10')),
+        },
+    }
+}
+
+# Read replicas, comma separated hosts reached with the credentials of the
+# primary. The safe requests of the DATABASE_REPLICA_APPS views read from
+# them, see library_manager.db_routers
+DATABASE_REPLICAS = []
+for number, host in enumerate(filter(None, os.environ.get('PG_REPLICA_HOSTS','').split(',')), start=1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'PORT': os.environ.get('PG_REPLICA_PORT', DATABASES['default']['PORT']),
+        # seconds to wait for a replica before its health check fails
+        'OPTIONS': {'connect_timeout': int(os.environ.get('PG_REPLICA_CONNECT_TIMEOUT','2'))},
+        # the tests read and write the primary test database
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['library_manager.db_routers.ReplicaRouter']
+DATABASE_REPLICA_APPS = ('library',)
+# seconds a client reads from the primary after a write
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('PG_REPLICA_PIN_SECONDS','5'))
+DATABASE_REPLICA_PIN_COOKIE = 'primary_pin'
+# the pins of the clients that do not keep cookies are kept in this CACHES
+# alias, by Authorization header. It must be shared by every worker
+DATABASE_REPLICA_PIN_CACHE = os.environ.get('PG_REPLICA_PIN_CACHE', 'tokens')
+# replicas are checked every interval and skipped while down or lagging
+# more than DATABASE_REPLICA_MAX_LAG seconds
+DATABASE_REPLICA_HEALTH_CHECK_INTERVAL = int(os.environ.get('PG_REPLICA_HEALTH_CHECK_INTERVAL','10'))
+DATABASE_REPLICA_MAX_LAG = float(os.environ.get('PG_REPLICA_MAX_LAG','5'))
+
+# Reports the queries and the time spent in the database, authentication,
+# serialization and rendering of every request in a Server-Timing header
+# and a log line, see library_manager.middleware.ServerTimingMiddleware
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'False') == 'True'
+
+# Prometheus metrics of the requests served at /metrics, see
+# library_manager.metrics
+METRICS_ENABLED = os.environ.get('METRICS', 'False') == 'True'
+# /metrics is only served to these addresses or networks, comma separated,
+# and to requests with the METRICS_TOKEN bearer token when it is set
+METRICS_ALLOWED_IPS = list(filter(None, os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'library_manager.server_timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
 
 
@@ -143,20 +218,84 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
+        'library_users.authentication.CachedOAuth2Authentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
-    )
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'library.pagination.LibraryCursorPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', '100')),
 }
 
+# Upper bound for the page_size query parameter of the list endpoints
+LIBRARY_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', '1000'))
+
+# Rows fetched per round trip by the server-side cursor of the exports
+LIBRARY_EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '2000'))
+
+# Days a book is lent for, the due date of a lending is set from it
+LIBRARY_LOAN_PERIOD_DAYS = int(os.environ.get('LOAN_PERIOD_DAYS', '14'))
+
+# Partitions of the lendings created ahead by maintain_lending_partitions,
+# which archives the returned lendings lent more than
+# LIBRARY_LENDING_ARCHIVE_AFTER_DAYS ago
+LIBRARY_LENDING_PARTITION_MONTHS_AHEAD = int(os.environ.get('LENDING_PARTITION_MONTHS_AHEAD', '3'))
+LIBRARY_LENDING_ARCHIVE_AFTER_DAYS = int(os.environ.get('LENDING_ARCHIVE_AFTER_DAYS', '365'))
+
+# Serializes the pages of the list endpoints from values_list() rows and
+# renders them with orjson instead of the model serializers
+LIBRARY_FAST_LIST_SERIALIZATION = os.environ.get('FAST_LIST_SERIALIZATION', 'False') == 'True'
+
+# Limits of the bulk create endpoints, items per request and rows per INSERT
+LIBRARY_BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '100000'))
+LIBRARY_BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', '1000'))
+
+# Validated access tokens are cached by the authentication class for up to
+# OAUTH2_TOKEN_CACHE_TTL seconds. By default each worker keeps an LRU of
+# OAUTH2_TOKEN_CACHE_SIZE entries, where a revoked token is accepted by the
+# other workers until their entry expires. Setting OAUTH2_TOKEN_CACHE to a
+# CACHES alias shares the cache, so a revoked token is rejected by all of
+# them: 'tokens' for the workers of a host, or a redis or memcached alias
+# for several hosts
+OAUTH2_TOKEN_CACHE = os.environ.get('OAUTH2_TOKEN_CACHE', '')
+OAUTH2_TOKEN_CACHE_SIZE = int(os.environ.get('OAUTH2_TOKEN_CACHE_SIZE', '10000'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # the entries are pickles, so the directory must only be writable by
+    # the user of the workers. It is created with mode 0700
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('TOKEN_CACHE_DIR', str(BASE_DIR / 'cache' / 'tokens')),
+        'OPTIONS': {
+            'MAX_ENTRIES': OAUTH2_TOKEN_CACHE_SIZE,
+        },
+    },
+}
+OAUTH2_TOKEN_CACHE_TTL = int(os.environ.get('OAUTH2_TOKEN_CACHE_TTL', '30'))
+
+# Name of the application shared by every password grant user, each user
+# gets an application of its own when it is empty
+OAUTH2_SHARED_APPLICATION = os.environ.get('OAUTH2_SHARED_APPLICATION', '')
+
+# Expired and revoked tokens are purged in batches of OAUTH2_PURGE_BATCH_SIZE
+# rows, by every worker each OAUTH2_PURGE_INTERVAL seconds when it is not 0
+OAUTH2_PURGE_BATCH_SIZE = int(os.environ.get('OAUTH2_PURGE_BATCH_SIZE', '1000'))
+OAUTH2_PURGE_INTERVAL = int(os.environ.get('OAUTH2_PURGE_INTERVAL', '0'))
+
 # OAuth2 settings
 OAUTH2_PROVIDER = {
     # this is the list of available scopes
     'SCOPES': {
         'read': 'Read scope',
         'write': 'Write scope',
-    }
+    },
+    # a refresh token can renew its access token up to this long after it
+    # expired, then both are purged. Every login without a live token
+    # issues a new pair, the ones it replaces are purged this way
+    'REFRESH_TOKEN_EXPIRE_SECONDS': int(os.environ.get('OAUTH2_REFRESH_TOKEN_EXPIRE_SECONDS', '2592000')),
 }
 
 AUTH_USER_MODEL = 'library_users.User'
@@ -12,6 +12,8 @@ from rest_framework import permissions
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 
+from library_manager.metrics import metrics_view
+
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -28,6 +30,7 @@ urlpatterns = [
     path('o/authorize/', AuthorizationView.as_view(), name="authorize"),
     path('o/token/', TokenView.as_view(), name="token"),
     path('o/revoke_token/', RevokeTokenView.as_view(), name="revoke-token"),
+    path('metrics', metrics_view, name='metrics'),
     path('', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('', include('library.urls')),
     path('', include('library_users.urls')),
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 1 hora
+"""
+
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Concat
+
+from oauth2_provider.models import get_application_model
+from oauth2_provider.settings import oauth2_settings
+
+
+def shared_application_fields(name):
+    """
+    Fields of the application shared by every password grant user
+    """
+    Application = get_application_model()
+    return {
+        'name': name,
+        'user': None,
+        'client_type': Application.CLIENT_CONFIDENTIAL,
+        'authorization_grant_type': Application.GRANT_PASSWORD,
+    }
+
+
+_shared_application_ids = {}
+_shared_application_lock = threading.Lock()
+
+
+def get_shared_application_id():
+    """
+    Returns the id of the application named OAUTH2_SHARED_APPLICATION, which
+    is created on first use. Returns None when the setting is empty and
+    every user gets an application of its own
+    """
+    name = settings.OAUTH2_SHARED_APPLICATION
+    if not name:
+        return None
+
+    application_id = _shared_application_ids.get(name)
+    if application_id is None:
+        Application = get_application_model()
+        with _shared_application_lock:
+            application = (
+                Application.objects
+                .filter(name=name, user=None)
+                .order_by('id')
+                .only('id')
+                .first()
+            )
+            if application is None:
+                application = Application.objects.create(**shared_application_fields(name))
+            application_id = _shared_application_ids[name] = application.id
+    return application_id
+
+
+def reset_shared_application(**kwargs):
+    """
+    Forgets the cached id of the shared application
+    """
+    _shared_application_ids.clear()
+
+
+def get_user_application(user):
+    """
+    Returns the application the tokens of the user are issued for, the
+    shared one if configured or a new application of the user otherwise
+    """
+    Application = get_application_model()
+    application_id = get_shared_application_id()
+    if application_id is not None:
+        return Application(id=application_id)
+
+    application = Application(
+        name=user.username + '_app',
+        user=user,
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=Application.GRANT_PASSWORD,
+    )
+    application.save()
+    return application
+
+
+def consolidate_user_applications(name, get_model=apps.get_model):
+    """
+    Moves the tokens of the per user applications created by register and
+    token to the shared application named name, and deletes those
+    applications. get_model lets the migrations pass their historical
+    models. Returns the number of applications deleted
+    """
+    Application = get_model(oauth2_settings.APPLICATION_MODEL)
+    with transaction.atomic():
+        shared_application = (
+            Application.objects.filter(name=name, user=None).order_by('id').first()
+        )
+        if shared_application is None:
+            shared_application = Application.objects.create(
+                name=name,
+                user=None,
+                client_type='confidential',
+                authorization_grant_type='password',
+            )
+
+        user_applications = Application.objects.filter(
+            user__isnull=False,
+            authorization_grant_type='password',
+            name=Concat('user__username', Value('_app')),
+        )
+        for model_name in (
+            oauth2_settings.ACCESS_TOKEN_MODEL,
+            oauth2_settings.REFRESH_TOKEN_MODEL,
+            oauth2_settings.GRANT_MODEL,
+            oauth2_settings.ID_TOKEN_MODEL,
+        ):
+            get_model(model_name).objects.filter(
+                application__in=user_applications
+            ).update(application=shared_application)
+        deleted, by_model = user_applications.delete()
+
+    return by_model.get(Application._meta.label, 0)
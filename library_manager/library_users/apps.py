@@ -4,3 +4,37 @@ from django.apps import AppConfig
 class LibraryUsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'library_users'
+
+    def ready(self):
+        from django.core.signals import setting_changed
+        from django.db.models.signals import post_delete
+        from oauth2_provider.models import get_access_token_model
+
+        from library_users.applications import reset_shared_application
+        from library_users.authentication import (
+            invalidate_access_token,
+            reset_token_cache,
+        )
+        from library_users.purge import start_purge_scheduler
+
+        def access_token_deleted(sender, instance, **kwargs):
+            invalidate_access_token(instance.token)
+
+        def library_users_setting_changed(setting, **kwargs):
+            if setting.startswith('OAUTH2_TOKEN_CACHE'):
+                reset_token_cache()
+            elif setting == 'OAUTH2_SHARED_APPLICATION':
+                reset_shared_application()
+
+        post_delete.connect(
+            access_token_deleted,
+            sender=get_access_token_model(),
+            weak=False,
+            dispatch_uid='library_users_invalidate_access_token',
+        )
+        setting_changed.connect(
+            library_users_setting_changed,
+            weak=False,
+            dispatch_uid='library_users_setting_changed',
+        )
+        start_purge_scheduler()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 3 horas
+"""
+
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+
+from library_manager.db_routers import use_primary
+from library_manager.metrics import record_cache_lookup
+
+
+class LocalTokenCache:
+    """
+    Bounded LRU of validated access tokens kept in the memory of the worker,
+    every entry expires after its own timeout
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SharedTokenCache:
+    """
+    Stores the validated access tokens in one of the CACHES of the project,
+    so every worker using that backend sees the same entries
+    """
+
+    key_prefix = 'oauth2-token:'
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def make_key(self, key):
+        # tokens are hashed so they are never stored as plain cache keys
+        return self.key_prefix + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        return self.cache.get(self.make_key(key))
+
+    def set(self, key, value, timeout):
+        self.cache.set(self.make_key(key), value, timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+    def clear(self):
+        self.cache.clear()
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """
+    Returns the token cache configured with OAUTH2_TOKEN_CACHE, a local LRU
+    of OAUTH2_TOKEN_CACHE_SIZE entries when no cache alias is set
+    """
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                if settings.OAUTH2_TOKEN_CACHE:
+                    _token_cache = SharedTokenCache(settings.OAUTH2_TOKEN_CACHE)
+                else:
+                    _token_cache = LocalTokenCache(settings.OAUTH2_TOKEN_CACHE_SIZE)
+    return _token_cache
+
+
+def reset_token_cache(**kwargs):
+    """
+    Drops the token cache so it is built again from the current settings
+    """
+    global _token_cache
+    with _token_cache_lock:
+        _token_cache = None
+
+
+def invalidate_access_token(token):
+    """
+    Removes an access token from the cache, must be called whenever a
+    token is revoked or replaced so it is not accepted from the cache
+    """
+    if token:
+        get_token_cache().delete(token)
+
+
+def get_bearer_token(request):
+    """
+    Reads the token from the Authorization header the same way oauthlib does
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) == 2 and header[0].lower() == 'bearer':
+        return header[1]
+    return None
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    """
+    OAuth2Authentication that keeps the validated tokens and their users in
+    the token cache, so only the first request of a token reaches the
+    database during OAUTH2_TOKEN_CACHE_TTL seconds
+    """
+
+    def authenticate(self, request):
+        # tokens are read from the primary, a replica may not have replayed
+        # a token issued a moment ago
+        with use_primary():
+            return self.authenticate_token(request)
+
+    def authenticate_token(self, request):
+        token = get_bearer_token(request)
+        if token is None:
+            return super().authenticate(request)
+
+        cache = get_token_cache()
+        access_token = cache.get(token)
+        if access_token is not None and not access_token.is_expired():
+            record_cache_lookup('access_token', hit=True)
+            return access_token.user, access_token
+
+        record_cache_lookup('access_token', hit=False)
+
+        result = super().authenticate(request)
+        if result is not None:
+            user, access_token = result
+            remaining = (access_token.expires - timezone.now()).total_seconds()
+            timeout = min(settings.OAUTH2_TOKEN_CACHE_TTL, int(remaining))
+            if timeout > 0:
+                cache.set(token, access_token, timeout)
+        return result
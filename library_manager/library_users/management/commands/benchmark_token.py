@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 40 minutes
+"""
+
+import random
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from library_users.models import User
+
+PASSWORD = 'benchmark-password'
+
+# the password hash is the slowest part of a login on purpose, this hasher
+# leaves only the cost of the queries when --fast-hasher is given
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class Command(BaseCommand):
+    help = 'Measures the logins per second of the token endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=100,
+            help='Number of benchmark users logging in',
+        )
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=1000,
+            help='Number of logins measured',
+        )
+        parser.add_argument(
+            '--fast-hasher',
+            action='store_true',
+            help='Hashes the benchmark passwords with MD5 to measure only the database work',
+        )
+
+    def seed(self, amount):
+        usernames = [f'benchmark_{number}' for number in range(amount)]
+        existing = set(
+            User.objects.filter(username__in=usernames).values_list('username', flat=True)
+        )
+        password = make_password(PASSWORD)
+        User.objects.bulk_create([
+            User(username=username, password=password)
+            for username in usernames
+            if username not in existing
+        ])
+        # a stale hash from another hasher would be upgraded on every login
+        User.objects.filter(username__in=usernames).update(password=password)
+        return usernames
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['logins'] < 1:
+            raise CommandError('--users and --logins must be positive numbers')
+
+        if options['fast_hasher']:
+            with override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+                self.benchmark(options)
+        else:
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        usernames = self.seed(options['users'])
+        client = Client(HTTP_HOST='localhost')
+        url = reverse('user_token')
+
+        def login(username):
+            response = client.post(
+                url,
+                {'username': username, 'password': PASSWORD},
+                content_type='application/json'
+            )
+            if response.status_code != 200:
+                raise CommandError(f'Login of {username} failed: {response.content!r}')
+
+        # the first login of every user creates its application and token
+        for username in usernames:
+            login(username)
+
+        randomizer = random.Random(options['logins'])
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(options['logins']):
+                login_started = time.perf_counter()
+                login(randomizer.choice(usernames))
+                timings.append((time.perf_counter() - login_started) * 1000)
+            elapsed = time.perf_counter() - started
+
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f'{options["logins"]} logins of {len(usernames)} users: '
+            f'{options["logins"] / elapsed:.1f} logins/s, '
+            f'p50 {p50:.2f} ms, p95 {p95:.2f} ms, '
+            f'{len(queries.captured_queries) / options["logins"]:.1f} queries per login'
+        )
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 15 minutes
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from library_users.applications import consolidate_user_applications, reset_shared_application
+
+
+class Command(BaseCommand):
+    help = (
+        'Moves the tokens of the per user OAuth2 applications to the '
+        'OAUTH2_SHARED_APPLICATION one and deletes them'
+    )
+
+    def handle(self, *args, **options):
+        name = settings.OAUTH2_SHARED_APPLICATION
+        if not name:
+            raise CommandError('OAUTH2_SHARED_APPLICATION is not set')
+
+        deleted = consolidate_user_applications(name)
+        reset_shared_application()
+        self.stdout.write(self.style.SUCCESS(f'Moved the tokens of {deleted} applications to {name}'))
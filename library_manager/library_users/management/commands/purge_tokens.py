@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 15 minutes
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from library_users.purge import purge_tokens
+
+
+class Command(BaseCommand):
+    help = 'Deletes the expired and revoked OAuth2 tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.OAUTH2_PURGE_BATCH_SIZE,
+            help='Number of rows deleted per transaction',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive number')
+
+        started = time.perf_counter()
+        deleted = purge_tokens(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        summary = ', '.join(f'{amount} {name.replace("_", " ")}' for name, amount in deleted.items())
+        self.stdout.write(self.style.SUCCESS(f'Removed {summary} in {elapsed:.2f} s'))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index used by the token view to find the live token of a user for one
+    of its applications without scanning its expired tokens
+    """
+
+    dependencies = [
+        ('library_users', '0001_initial'),
+        ('oauth2_provider', '0007_application_post_logout_redirect_uris'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS library_users_accesstoken_live_idx '
+            'ON oauth2_provider_accesstoken (application_id, user_id, expires)',
+            'DROP INDEX IF EXISTS library_users_accesstoken_live_idx',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:55
+
+from django.conf import settings
+from django.db import migrations
+
+from library_users.applications import consolidate_user_applications as consolidate
+
+
+def consolidate_user_applications(apps, schema_editor):
+    """
+    Moves the tokens of the per user applications to the shared one when
+    OAUTH2_SHARED_APPLICATION is set. Enabling the setting later needs
+    python manage.py consolidate_user_applications
+    """
+    if settings.OAUTH2_SHARED_APPLICATION:
+        consolidate(settings.OAUTH2_SHARED_APPLICATION, get_model=apps.get_model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_users', '0002_accesstoken_live_token_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(consolidate_user_applications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 2 horas
+"""
+
+from datetime import timedelta
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from oauth2_provider.models import (
+    get_access_token_model,
+    get_grant_model,
+    get_refresh_token_model,
+)
+from oauth2_provider.settings import oauth2_settings
+
+logger = logging.getLogger(__name__)
+
+
+def delete_in_batches(queryset, batch_size):
+    """
+    Deletes the rows of the queryset batch_size at a time, every batch in its
+    own transaction. Rows locked by a running request are skipped and left
+    for the next purge. Returns the number of rows deleted
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                queryset
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if ids:
+                model.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            return deleted
+
+
+def purge_tokens(batch_size=None, now=None):
+    """
+    Deletes the tokens that can no longer be used:
+
+    * refresh tokens revoked before the grace period, or left without an
+      access token by a revocation
+    * refresh tokens whose access token expired more than
+      REFRESH_TOKEN_EXPIRE_SECONDS ago, when that setting is configured
+    * expired access tokens without a refresh token able to renew them
+    * expired grants
+
+    Returns the number of rows deleted of every model
+    """
+    batch_size = batch_size or settings.OAUTH2_PURGE_BATCH_SIZE
+    now = now or timezone.now()
+    AccessToken = get_access_token_model()
+    RefreshToken = get_refresh_token_model()
+    Grant = get_grant_model()
+
+    grace_period = timedelta(seconds=oauth2_settings.REFRESH_TOKEN_GRACE_PERIOD_SECONDS)
+    dead_refresh_tokens = (
+        Q(revoked__lt=now - grace_period)
+        | Q(revoked__isnull=True, access_token__isnull=True)
+    )
+    if oauth2_settings.REFRESH_TOKEN_EXPIRE_SECONDS:
+        refresh_expire_at = now - timedelta(seconds=oauth2_settings.REFRESH_TOKEN_EXPIRE_SECONDS)
+        dead_refresh_tokens |= Q(access_token__expires__lt=refresh_expire_at)
+
+    # refresh tokens go first so the access tokens they kept alive are
+    # purged in the same run
+    return {
+        'refresh_tokens': delete_in_batches(
+            RefreshToken.objects.filter(dead_refresh_tokens), batch_size
+        ),
+        'access_tokens': delete_in_batches(
+            AccessToken.objects.filter(expires__lt=now, refresh_token__isnull=True),
+            batch_size
+        ),
+        'grants': delete_in_batches(Grant.objects.filter(expires__lt=now), batch_size),
+    }
+
+
+class TokenPurgeScheduler(threading.Thread):
+    """
+    Daemon thread running purge_tokens every interval seconds, workers can
+    run one each since the purges skip the rows locked by each other
+    """
+
+    def __init__(self, interval):
+        super().__init__(name='token-purge', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            started = time.perf_counter()
+            try:
+                deleted = purge_tokens()
+            except Exception:
+                logger.exception('Token purge failed')
+            else:
+                logger.info(
+                    'Purged %s in %.2f s', deleted, time.perf_counter() - started
+                )
+            finally:
+                # the thread does not keep a connection open between purges
+                connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+
+
+_scheduler = None
+
+
+def start_purge_scheduler():
+    """
+    Starts the purge thread of this process when OAUTH2_PURGE_INTERVAL is set
+    """
+    global _scheduler
+    if settings.OAUTH2_PURGE_INTERVAL > 0 and _scheduler is None:
+        _scheduler = TokenPurgeScheduler(settings.OAUTH2_PURGE_INTERVAL)
+        _scheduler.start()
+    return _scheduler
@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+"""
+Author: Manuel Martinez
+github: @thriskel
+time taken: 1 hora
+"""
+
+from datetime import timedelta
+import os
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from oauth2_provider.models import (
+    get_access_token_model,
+    get_application_model,
+    get_refresh_token_model,
+)
+from oauth2_provider.settings import oauth2_settings
+
+from library_users.applications import reset_shared_application
+from library_users.authentication import (
+    LocalTokenCache,
+    SharedTokenCache,
+    get_token_cache,
+)
+from library_users.models import User
+from library_users.purge import purge_tokens
+from library_users.views import generate_token_for_user
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+
+class CachedAuthenticationTestCase(APITestCase):
+    """
+    The validated tokens are served from the cache until they are revoked,
+    replaced or expired
+    """
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = User.objects.create_user(
+            username='librarian',
+            password='1234abcd'
+        )
+        Application = get_application_model()
+        self.application = Application.objects.create(
+            name='librarian_app',
+            user=self.user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type='password',
+        )
+        self.access_token = generate_token_for_user(self.user, self.application)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token.token}')
+        self.url = reverse('author-list')
+
+    def test_cached_token_skips_the_token_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # only the query of the empty author list is left
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_revoked_token_is_rejected(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        response = self.client.post(
+            reverse('user_revoke_token'),
+            {'token': self.access_token.token},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_is_rejected(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        get_access_token_model().objects.filter(pk=self.access_token.pk).delete()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refreshed_token_replaces_the_old_one(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        response = self.client.post(
+            reverse('user_refresh_token'),
+            {'refresh_token': self.access_token.refresh_token.token},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        new_token = response.data['access_token']
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {new_token}')
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_expired_token_is_not_served_from_the_cache(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        cached = get_token_cache().get(self.access_token.token)
+        cached.expires = timezone.now() - timedelta(seconds=1)
+        get_token_cache().set(self.access_token.token, cached, 30)
+        get_access_token_model().objects.filter(pk=self.access_token.pk).update(
+            expires=cached.expires
+        )
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'tokens': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        },
+        OAUTH2_TOKEN_CACHE='tokens',
+    )
+    def test_shared_cache_backend(self):
+        self.assertIsInstance(get_token_cache(), SharedTokenCache)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        self.client.post(
+            reverse('user_revoke_token'),
+            {'token': self.access_token.token},
+            format='json'
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SharedTokenCacheTestCase(APITestCase):
+    """
+    The tokens cache alias is shared by the workers of the host
+    """
+    def test_shared_cache_is_opt_in(self):
+        self.assertIsInstance(get_token_cache(), LocalTokenCache)
+        with override_settings(OAUTH2_TOKEN_CACHE='tokens'):
+            self.assertIsInstance(get_token_cache(), SharedTokenCache)
+
+    def test_shared_cache_directory_is_private(self):
+        cache = caches['tokens']
+        cache.set('token', 'access token', 30)
+        self.addCleanup(cache.delete, 'token')
+        # its pickles are only readable and writable by the workers
+        self.assertEqual(os.stat(cache._dir).st_mode & 0o077, 0)
+
+    def test_token_invalidated_by_a_worker_is_dropped_for_all(self):
+        # every worker has its own instance of the cache backend
+        first, second = SharedTokenCache('tokens'), SharedTokenCache('tokens')
+        second.cache = caches.create_connection('tokens')
+        self.assertIsNot(first.cache, second.cache)
+
+        first.set('token', 'access token', 30)
+        self.assertEqual(second.get('token'), 'access token')
+
+        second.delete('token')
+        self.assertIsNone(first.get('token'))
+
+
+class LocalTokenCacheTestCase(APITestCase):
+    """
+    The local cache is bounded and its entries expire
+    """
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LocalTokenCache(max_size=2)
+        cache.set('a', 1, 60)
+        cache.set('b', 2, 60)
+        cache.get('a')
+        cache.set('c', 3, 60)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_entry_expires_after_its_timeout(self):
+        cache = LocalTokenCache(max_size=2)
+        with mock.patch('library_users.authentication.time.monotonic', return_value=100):
+            cache.set('a', 1, 30)
+        with mock.patch('library_users.authentication.time.monotonic', return_value=129):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('library_users.authentication.time.monotonic', return_value=130):
+            self.assertIsNone(cache.get('a'))
+
+
+class TokenViewTestCase(APITestCase):
+    """
+    Test module for the token view
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='librarian',
+            password='1234abcd'
+        )
+        self.url = reverse('user_token')
+        self.credentials = {'username': 'librarian', 'password': '1234abcd'}
+
+    def test_user_without_application_gets_one(self):
+        response = self.client.post(self.url, self.credentials, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_application_model().objects.filter(user=self.user).count(), 1)
+        self.assertTrue(
+            get_access_token_model().objects.filter(token=response.data['access_token']).exists()
+        )
+
+    def test_live_token_is_reused_in_one_query(self):
+        first = self.client.post(self.url, self.credentials, format='json')
+
+        # the user, its application and its token are read in one query
+        with self.assertNumQueries(1):
+            second = self.client.post(self.url, self.credentials, format='json')
+
+        self.assertEqual(second.data['access_token'], first.data['access_token'])
+        self.assertEqual(second.data['refresh_token'], first.data['refresh_token'])
+        self.assertLessEqual(second.data['expires_in'], first.data['expires_in'])
+
+    def test_expired_token_is_not_reused(self):
+        first = self.client.post(self.url, self.credentials, format='json')
+        get_access_token_model().objects.filter(token=first.data['access_token']).update(
+            expires=timezone.now() - timedelta(seconds=1)
+        )
+
+        second = self.client.post(self.url, self.credentials, format='json')
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(second.data['access_token'], first.data['access_token'])
+        self.assertEqual(get_application_model().objects.filter(user=self.user).count(), 1)
+
+    def test_wrong_credentials(self):
+        response = self.client.post(
+            self.url,
+            {'username': 'librarian', 'password': 'wrong'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(
+            self.url,
+            {'username': 'nobody', 'password': 'wrong'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PurgeTokensTestCase(APITestCase):
+    """
+    Test module for the purge_tokens command
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='librarian',
+            password='1234abcd'
+        )
+        Application = get_application_model()
+        self.application = Application.objects.create(
+            name='librarian_app',
+            user=self.user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type='password',
+        )
+
+    def create_token(self, expired=False):
+        access_token = generate_token_for_user(self.user, self.application)
+        if expired:
+            access_token.expires = timezone.now() - timedelta(seconds=1)
+            access_token.save()
+        return access_token
+
+    def test_purge_tokens(self):
+        AccessToken = get_access_token_model()
+        RefreshToken = get_refresh_token_model()
+
+        live = self.create_token()
+        renewable = self.create_token(expired=True)
+        revoked = self.create_token()
+        revoked.revoke()
+        # revoking the refresh token deletes its access token
+        refresh_revoked = self.create_token(expired=True)
+        refresh_revoked.refresh_token.revoke()
+        orphan = self.create_token(expired=True)
+        RefreshToken.objects.filter(access_token=orphan).delete()
+
+        out = StringIO()
+        call_command('purge_tokens', '--batch-size', '1', stdout=out)
+
+        self.assertIn('Removed 2 refresh tokens, 1 access tokens, 0 grants', out.getvalue())
+        self.assertEqual(
+            set(AccessToken.objects.values_list('id', flat=True)),
+            {live.id, renewable.id}
+        )
+        self.assertEqual(
+            set(RefreshToken.objects.values_list('access_token', flat=True)),
+            {live.id, renewable.id}
+        )
+
+    @override_settings(OAUTH2_PROVIDER={'REFRESH_TOKEN_EXPIRE_SECONDS': 60})
+    def test_purge_expired_refresh_tokens(self):
+        self.create_token()
+        renewable = self.create_token(expired=True)
+        abandoned = self.create_token(expired=True)
+        get_access_token_model().objects.filter(pk=abandoned.pk).update(
+            expires=timezone.now() - timedelta(seconds=61)
+        )
+
+        self.assertEqual(
+            purge_tokens(),
+            {'refresh_tokens': 1, 'access_tokens': 1, 'grants': 0}
+        )
+        self.assertTrue(get_access_token_model().objects.filter(pk=renewable.pk).exists())
+        self.assertFalse(get_access_token_model().objects.filter(pk=abandoned.pk).exists())
+
+
+    def test_pair_replaced_by_a_new_login_is_purged(self):
+        response = self.client.post(reverse('user_token'), {'username': 'librarian', 'password': '1234abcd'})
+        old_token = response.data['access_token']
+        expire_seconds = oauth2_settings.REFRESH_TOKEN_EXPIRE_SECONDS
+        get_access_token_model().objects.filter(token=old_token).update(
+            expires=timezone.now() - timedelta(seconds=expire_seconds + 1)
+        )
+
+        # the user logs in again after the expiration, getting a new pair
+        response = self.client.post(reverse('user_token'), {'username': 'librarian', 'password': '1234abcd'})
+        self.assertNotEqual(response.data['access_token'], old_token)
+
+        self.assertEqual(
+            purge_tokens(),
+            {'refresh_tokens': 1, 'access_tokens': 1, 'grants': 0}
+        )
+        self.assertEqual(
+            list(get_access_token_model().objects.values_list('token', flat=True)),
+            [response.data['access_token']]
+        )
+        self.assertEqual(get_refresh_token_model().objects.count(), 1)
+
+    def test_expired_refresh_token_is_rejected(self):
+        access_token = self.create_token()
+        get_access_token_model().objects.filter(pk=access_token.pk).update(
+            expires=timezone.now() - timedelta(seconds=oauth2_settings.REFRESH_TOKEN_EXPIRE_SECONDS + 1)
+        )
+        response = self.client.post(
+            reverse('user_refresh_token'),
+            {'refresh_token': access_token.refresh_token.token},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(OAUTH2_SHARED_APPLICATION='library_manager')
+class SharedApplicationTestCase(APITestCase):
+    """
+    Every password grant user shares one application when
+    OAUTH2_SHARED_APPLICATION is set
+    """
+    def setUp(self):
+        # the id cached by a previous test was rolled back with its data
+        reset_shared_application()
+        self.credentials = {'username': 'librarian', 'password': '1234abcd'}
+
+    def test_register_and_token_use_the_shared_application(self):
+        response = self.client.post(reverse('register_user'), self.credentials, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        Application = get_application_model()
+        shared_application = Application.objects.get(name='library_manager', user=None)
+        self.assertEqual(Application.objects.count(), 1)
+
+        # the live token is found without joining the applications
+        with self.assertNumQueries(1):
+            token = self.client.post(reverse('user_token'), self.credentials, format='json')
+        self.assertEqual(token.data['access_token'], response.data['access_token'])
+        self.assertEqual(
+            get_access_token_model().objects.get(token=token.data['access_token']).application,
+            shared_application
+        )
+
+    def test_consolidate_user_applications(self):
+        user = User.objects.create_user(**self.credentials)
+        Application = get_application_model()
+        user_application = Application.objects.create(
+            name='librarian_app',
+            user=user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+        )
+        access_token = generate_token_for_user(user, user_application)
+
+        out = StringIO()
+        call_command('consolidate_user_applications', stdout=out)
+        self.assertIn('Moved the tokens of 1 applications to library_manager', out.getvalue())
+
+        self.assertEqual(
+            list(Application.objects.values_list('name', 'user')),
+            [('library_manager', None)]
+        )
+        access_token.refresh_from_db()
+        self.assertEqual(access_token.application.name, 'library_manager')
+        self.assertEqual(access_token.refresh_token.application, access_token.application)
+
+        response = self.client.post(reverse('user_token'), self.credentials, format='json')
+        self.assertEqual(response.data['access_token'], access_token.token)
+
+    def test_migration_consolidates_only_when_enabled(self):
+        user = User.objects.create_user(**self.credentials)
+        Application = get_application_model()
+        Application.objects.create(
+            name='librarian_app',
+            user=user,
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+        )
+
+        migration = import_module('library_users.migrations.0003_consolidate_user_applications')
+        with override_settings(OAUTH2_SHARED_APPLICATION=''):
+            migration.consolidate_user_applications(django_apps, None)
+            self.assertEqual(Application.objects.get().name, 'librarian_app')
+            with self.assertRaises(CommandError):
+                call_command('consolidate_user_applications')
+
+        migration.consolidate_user_applications(django_apps, None)
+        self.assertEqual(Application.objects.get().name, 'library_manager')
@@ -8,6 +8,7 @@ time taken: 8 horas
 from datetime import timedelta
 import requests
 
+from django.db.models import F, FilteredRelation, Q, Value
 from django.utils import timezone
 
 from oauthlib.common import generate_token
@@ -22,9 +23,19 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from library_users.applications import get_shared_application_id, get_user_application
+from library_users.authentication import invalidate_access_token
 from library_users.models import User
 from library_users.serializers import RegisterUserSerializer
 
+# queries of a request to every view, the benchmark tests fail above them
+QUERY_BUDGETS = {
+    'register': 5,
+    'token': 1,
+    'refresh_token': 3,
+    'revoke_token': 3,
+}
+
 
 def generate_token_for_user(user, application):
     """
@@ -65,15 +76,8 @@ def register(request):
     if serializer.is_valid():
         new_user = serializer.save()
 
-        # create a new application for the user
-        Application = get_application_model()
-        app = Application(
-            name=serializer.data['username'] + '_app',
-            user=new_user,
-            client_type=Application.CLIENT_CONFIDENTIAL,
-            authorization_grant_type='password',
-        )
-        app.save()
+        # get the application the user tokens are issued for
+        app = get_user_application(new_user)
 
         # generate a token for the user
         user_token = generate_token_for_user(new_user, app)
@@ -99,38 +103,68 @@ def token(request):
     Gets tokens with username and password. Input should be in the format:
     {"username": "username", "password": "1234abcd"}
     '''
-    # get the user
-    token_user = User.objects.filter(username=request.data['username'])
-    if not token_user:
+    # get the user, its application and its live token in a single query
+    now = timezone.now()
+    shared_application_id = get_shared_application_id()
+    if shared_application_id is None:
+        token_user = User.objects.annotate(
+            live_token=FilteredRelation(
+                'oauth2_provider_application__accesstoken',
+                condition=Q(
+                    oauth2_provider_application__accesstoken__user=F('pk'),
+                    oauth2_provider_application__accesstoken__expires__gt=now,
+                ),
+            ),
+            application_id=F('oauth2_provider_application__id'),
+        )
+    else:
+        # every token belongs to the shared application, no join is needed
+        token_user = User.objects.annotate(
+            live_token=FilteredRelation(
+                'oauth2_provider_accesstoken',
+                condition=Q(
+                    oauth2_provider_accesstoken__application=shared_application_id,
+                    oauth2_provider_accesstoken__expires__gt=now,
+                ),
+            ),
+            application_id=Value(shared_application_id),
+        )
+    token_user = (
+        token_user
+        .filter(username=request.data['username'])
+        .annotate(
+            token_value=F('live_token__token'),
+            token_scope=F('live_token__scope'),
+            token_expires=F('live_token__expires'),
+            refresh_token_value=F('live_token__refresh_token__token'),
+        )
+        .order_by(F('live_token__expires').desc(nulls_last=True), 'application_id')
+        .first()
+    )
+    if token_user is None:
         return Response({'message': 'User not found'}, 400)
-    token_user = token_user[0]
 
     if not token_user.check_password(request.data['password']):
         return Response({'message': 'Wrong credentials'}, 400)
 
+    # reuse the live token if the user has one
+    if token_user.token_value and token_user.refresh_token_value:
+        data={
+            'access_token': token_user.token_value,
+            'refresh_token': token_user.refresh_token_value,
+            'expires_in': int((token_user.token_expires - now).total_seconds()),
+            'token_type': 'Bearer',
+            'scope': token_user.token_scope,
+        }
+        return Response(data, 200, content_type="application/json")
+
     # get the application
-    Application = get_application_model()
-    user_app = Application.objects.filter(user=token_user)
-    if not user_app:
-        user_app = Application(
-            name=token_user.username + '_app',
-            user=token_user,
-            client_type=Application.CLIENT_CONFIDENTIAL,
-            authorization_grant_type='password',
-        )
-        app.save()
+    if token_user.application_id is None:
+        user_app = get_user_application(token_user)
     else:
-        user_app = user_app[0]
+        user_app = get_application_model()(id=token_user.application_id)
 
-    # check if the user has a token
-    AccessToken = get_access_token_model()
-    user_token = AccessToken.objects.filter(user=token_user, application=user_app)
-    if user_token:
-        user_token = user_token[0]
-    else:
-        user_token = generate_token_for_user(
-            token_user, user_app
-        )
+    user_token = generate_token_for_user(token_user, user_app)
 
     data={
         'access_token': user_token.token,
@@ -159,13 +193,21 @@ def refresh_token(request):
         return Response({'message': 'Invalid refresh token'}, 400)
     refresh_token = refresh_token[0]
 
+    # expired refresh tokens are only kept until the next purge
+    refresh_expire_at = timezone.now() - timedelta(seconds=oauth2_settings.REFRESH_TOKEN_EXPIRE_SECONDS)
+    if refresh_token.access_token is None or refresh_token.access_token.expires < refresh_expire_at:
+        return Response({'message': 'Invalid refresh token'}, 400)
+
     expires = timezone.now() + timedelta(seconds=oauth2_settings.ACCESS_TOKEN_EXPIRE_SECONDS)
     token = generate_token()
 
     access_token = refresh_token.access_token
+    old_token = access_token.token
     access_token.token = token
     access_token.expires = expires
     access_token.save()
+    # the old token must stop working right away
+    invalidate_access_token(old_token)
 
     data={
         'access_token': access_token.token,
@@ -196,5 +238,6 @@ def revoke_token(request):
     access_token = access_token[0]
 
     access_token.revoke()
+    invalidate_access_token(token)
 
     return Response({'message': 'Token revoked'}, 200)